@@ -1,6 +1,6 @@
 import logging
-from typing import Dict, Any, Optional
-from orchestrator import LangGraphBrain, OrchestratorResult
+from typing import Dict, Any, Iterator, Optional, List, Union
+from orchestrator import LangGraphBrain, OrchestratorResult, OrchestratorEvent
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,17 +15,25 @@ class DifyLangGraphSystem:
     Main system class that combines Dify agents with LangGraph orchestration
     """
     
-    def __init__(self):
-        """Initialize the system with the LangGraph brain"""
+    def __init__(self, query_budget: Optional[float] = None):
+        """
+        Initialize the system with the LangGraph brain
+        
+        Args:
+            query_budget: Default time budget in seconds for each query
+                (defaults to QUERY_BUDGET; None is unbounded)
+        """
         logger.info("Initializing Dify-LangGraph System...")
-        self.brain = LangGraphBrain()
+        self.brain = LangGraphBrain(query_budget=query_budget)
         logger.info("System initialized successfully")
     
     def process_query(
         self, 
         query: str, 
         context: Optional[Dict[str, Any]] = None,
-        verbose: bool = True
+        verbose: bool = True,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Process a user query through the agent system
@@ -34,6 +42,12 @@ class DifyLangGraphSystem:
             query: User's question or request
             context: Optional additional context
             verbose: Whether to print detailed information
+            timeout: Optional overall time budget in seconds (defaults to the
+                system's query_budget); agents still running when it expires
+                return their partial answers, and agents that could not start
+                in time are dropped and listed under dropped_agents
+            session_id: Optional chat session ID; follow-up turns continue each
+                agent's Dify conversation instead of starting a new one
             
         Returns:
             Dictionary with response, agents used, and metadata
@@ -44,35 +58,135 @@ class DifyLangGraphSystem:
             print(f"{'='*60}\n")
         
         # Process through the brain
-        result = self.brain.process_query(query, context)
+        result = self.brain.process_query(query, context, timeout=timeout, session_id=session_id)
         
-        if not result.success:
-            if verbose:
+        if verbose:
+            if result.success:
+                print(f"🤖 Agents Used: {' → '.join(result.agents_used)}")
+                if result.dropped_agents:
+                    print(f"⏱️  Dropped (time budget): {', '.join(result.dropped_agents)}")
+                print(f"\n{'─'*60}\n")
+                print(f"Response:\n{result.response}")
+                print(f"\n{'='*60}\n")
+            else:
                 print(f"❌ Error: {result.error}\n")
+        
+        return self.to_dict(result)
+    
+    def process_query_stream(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None
+    ) -> Iterator[OrchestratorEvent]:
+        """
+        Process a user query, yielding events while the agents work
+        
+        Args:
+            query: User's question or request
+            context: Optional additional context
+            timeout: Optional overall time budget in seconds (defaults to the
+                system's query_budget)
+            session_id: Optional chat session ID whose Dify conversations to continue
+            
+        Yields:
+            AgentsSelected, AgentStarted, AgentToken and AgentFinished events,
+            then a FinalResult carrying the OrchestratorResult
+        """
+        yield from self.brain.process_query_stream(query, context, timeout=timeout, session_id=session_id)
+    
+    def resume(self, run_id: str, timeout: Optional[float] = None, verbose: bool = True) -> Dict[str, Any]:
+        """
+        Finish a checkpointed run without re-running the agents that already succeeded
+        
+        Args:
+            run_id: The run_id returned by process_query (requires CHECKPOINT_PATH)
+            timeout: Optional time budget in seconds for the resumed part
+            verbose: Whether to print detailed information
+            
+        Returns:
+            Dictionary with response, agents used, and metadata
+        """
+        result = self.brain.resume(run_id, timeout=timeout)
+        
+        if verbose:
+            if result.success:
+                print(f"🤖 Agents Used: {' → '.join(result.agents_used)}")
+                print(f"\n{'─'*60}\n")
+                print(f"Response:\n{result.response}")
+            else:
+                print(f"❌ Error: {result.error}\n")
+        
+        return self.to_dict(result)
+    
+    def process_many(
+        self,
+        queries: List[str],
+        max_concurrency: int = 4,
+        per_agent_limit: Optional[Union[int, Dict[str, int]]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Process a batch of queries concurrently
+        
+        Args:
+            queries: Queries to process
+            max_concurrency: Number of queries in flight at once
+            per_agent_limit: Max concurrent calls per agent (one cap for all, or per agent key)
+            context: Optional additional context shared by every query
+            timeout: Optional time budget in seconds for each query
+            
+        Returns:
+            One result dictionary per query, in input order; failed items have
+            success=False and an error instead of failing the batch
+        """
+        results = self.brain.process_many(
+            queries,
+            max_concurrency=max_concurrency,
+            per_agent_limit=per_agent_limit,
+            context=context,
+            timeout=timeout
+        )
+        return [self.to_dict(result) for result in results]
+    
+    @staticmethod
+    def to_dict(result: OrchestratorResult) -> Dict[str, Any]:
+        """Convert an OrchestratorResult into the dictionary returned to callers"""
+        if not result.success:
             return {
                 "response": result.response,
                 "agents_used": [],
                 "success": False,
-                "error": result.error
+                "error": result.error,
+                "dropped_agents": result.dropped_agents,
+                "trace_id": result.trace_id,
+                "run_id": result.run_id
             }
         
         # Format agent information
         agents_used_str = " → ".join(result.agents_used)
         
-        if verbose:
-            print(f"🤖 Agents Used: {agents_used_str}")
-            print(f"\n{'─'*60}\n")
-            print(f"Response:\n{result.response}")
-            print(f"\n{'='*60}\n")
-        
         return {
             "response": result.response,
             "agents_used": result.agents_used,
             "agents_used_display": agents_used_str,
             "agent_details": result.agent_details,
-            "success": True
+            "dropped_agents": result.dropped_agents,
+            "success": True,
+            "trace_id": result.trace_id,
+            "run_id": result.run_id
         }
     
+    def get_speculation_stats(self) -> Dict[str, Any]:
+        """Hit rate and wasted output of speculative agent starts"""
+        return self.brain.speculation_stats.to_dict()
+    
+    def get_routing_stats(self) -> Dict[str, Any]:
+        """Hit rate of the LLM routing decision cache"""
+        return self.brain.selector.routing_stats()
+    
     def get_available_agents(self) -> Dict[str, Dict[str, str]]:
         """Get information about available agents"""
         agents_info = {}
@@ -1,4 +1,5 @@
 from .base_agent import BaseDifyAgent, AgentResponse
+from .streaming import StreamEvent, TokenDelta, MessageEnd, StreamError
 from .research_agent import ResearchAgent
 from .analysis_agent import AnalysisAgent
 from .creative_agent import CreativeAgent
@@ -6,6 +7,10 @@ from .creative_agent import CreativeAgent
 __all__ = [
     'BaseDifyAgent',
     'AgentResponse',
+    'StreamEvent',
+    'TokenDelta',
+    'MessageEnd',
+    'StreamError',
     'ResearchAgent',
     'AnalysisAgent',
     'CreativeAgent'
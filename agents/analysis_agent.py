@@ -19,7 +19,8 @@ class AnalysisAgent(BaseDifyAgent):
             agent_id=config.analysis_agent.agent_id,
             agent_name=config.analysis_agent.name,
             dify_api_key=config.dify_api_key,
-            dify_base_url=config.dify_base_url
+            dify_base_url=config.dify_base_url,
+            timeouts=config.analysis_agent.timeouts
         )
         self.keywords = config.analysis_agent.keywords
         self.description = config.analysis_agent.description
@@ -1,9 +1,21 @@
 import requests
+import httpx
+import asyncio
 import logging
-import json
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, Optional, Iterator, AsyncIterator, Iterable, List, Tuple, Callable
 from dataclasses import dataclass
 
+from config import config, TimeoutConfig
+from tracing import annotate, increment
+from .cache import ResponseCache, get_response_cache
+from .coalescing import single_flight, async_single_flight
+from .resilience import RetryPolicy, CircuitBreaker, classify_error
+from .sse import SSEParser
+from .streaming import StreamEvent, TokenDelta, MessageEnd, StreamError
+from .timeouts import StreamTimeout, deadline_after, remaining, earliest, is_read_timeout, set_read_timeout
+from .transport import get_session, get_async_client, host_slot, blocking_host_slot
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,94 +29,443 @@ class AgentResponse:
     error: Optional[str] = None
 
 
+class _StreamBuffer:
+    """Collects stream events into an AgentResponse in linear time"""
+    
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.end: Optional[MessageEnd] = None
+        self.error: Optional[str] = None
+        self.timed_out = False
+        self.conversation_rejected = False
+    
+    def add(self, event: StreamEvent):
+        if isinstance(event, TokenDelta):
+            self.chunks.append(event.text)
+        elif isinstance(event, MessageEnd):
+            self.end = event
+        elif isinstance(event, StreamError):
+            self.error = event.error
+            self.timed_out = event.timed_out
+            self.conversation_rejected = event.conversation_rejected
+    
+    def to_response(self, agent: "BaseDifyAgent") -> AgentResponse:
+        if self.error is not None:
+            return AgentResponse(
+                content="",
+                agent_name=agent.agent_name,
+                success=False,
+                error=self.error,
+                metadata={
+                    'agent_id': agent.agent_id,
+                    'timed_out': self.timed_out,
+                    'conversation_rejected': self.conversation_rejected
+                }
+            )
+        
+        end = self.end or MessageEnd()
+        return AgentResponse(
+            content="".join(self.chunks),
+            agent_name=agent.agent_name,
+            success=True,
+            metadata={
+                'conversation_id': end.conversation_id,
+                'message_id': end.message_id,
+                'agent_id': agent.agent_id,
+                'cached': end.cached,
+                'truncated': end.truncated
+            }
+        )
+
+
 class BaseDifyAgent:
     """Base class for Dify-powered agents"""
     
-    def __init__(self, agent_id: str, agent_name: str, dify_api_key: str, dify_base_url: str):
+    # Bytes per read from the streaming response; chunked replies yield sooner
+    READ_CHUNK_SIZE = 1024
+    
+    def __init__(
+        self,
+        agent_id: str,
+        agent_name: str,
+        dify_api_key: str,
+        dify_base_url: str,
+        cache: Optional[ResponseCache] = None,
+        timeouts: Optional[TimeoutConfig] = None
+    ):
         self.agent_id = agent_id
         self.agent_name = agent_name
         self.dify_api_key = dify_api_key
         self.dify_base_url = dify_base_url.rstrip('/')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Authorization': f'Bearer {dify_api_key}',
+        self.session = get_session()
+        self.cache = cache if cache is not None else get_response_cache()
+        self.timeouts = timeouts or TimeoutConfig()
+        self.coalesce = config.coalesce_requests
+        
+        resilience = config.resilience
+        self.retry_policy = RetryPolicy(
+            max_attempts=resilience.retry_max_attempts,
+            base_delay=resilience.retry_base_delay,
+            max_delay=resilience.retry_max_delay
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=resilience.breaker_failure_threshold,
+            recovery_timeout=resilience.breaker_recovery_timeout
+        )
+    
+    def _headers(self) -> Dict[str, str]:
+        """HTTP headers for Dify API calls"""
+        return {
+            'Authorization': f'Bearer {self.dify_api_key}',
             'Content-Type': 'application/json'
-        })
+        }
     
-    def execute(
-        self, 
-        query: str, 
+    def _build_payload(
+        self,
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Build the /chat-messages request body"""
+        payload = {
+            "inputs": context or {},
+            "query": query,
+            "response_mode": "streaming",
+            "user": user_id
+        }
+        
+        if conversation_id:
+            payload["conversation_id"] = conversation_id
+        
+        return payload
+    
+    @staticmethod
+    def _iter_sse(chunks: Iterable[bytes]) -> Iterator[Dict[str, Any]]:
+        """Decode the Dify events the agent needs from raw response bytes"""
+        parser = SSEParser()
+        for chunk in chunks:
+            yield from parser.feed(chunk)
+        yield from parser.close()
+    
+    @staticmethod
+    def _api_error(error: Exception) -> StreamError:
+        """Build a StreamError that records whether the failure is retryable"""
+        retryable, retry_after, status_code = classify_error(error)
+        return StreamError(
+            error=f"API error: {str(error)}",
+            retryable=retryable,
+            retry_after=retry_after,
+            status_code=status_code,
+            conversation_rejected=BaseDifyAgent._rejects_conversation(error)
+        )
+    
+    @staticmethod
+    def _rejects_conversation(error: Exception) -> bool:
+        """Whether Dify refused the call because it does not know its conversation_id"""
+        response = getattr(error, "response", None)
+        if getattr(response, "status_code", None) not in (400, 404):
+            return False
+        try:
+            body = response.json()
+        except ValueError:
+            return False
+        return isinstance(body, dict) and "conversation" in str(body.get("message", "")).lower()
+    
+    def _timeout_error(self, error: StreamTimeout) -> StreamError:
+        logger.error(f"{self.agent_name} {error}")
+        return StreamError(error=f"Timeout: {error}", retryable=error.retryable, timed_out=True)
+    
+    @staticmethod
+    def _limit(phase: str, seconds: float, deadline: Optional[float]) -> Tuple[float, str]:
+        """
+        Cap a phase timeout by the call deadline
+        
+        Returns:
+            (seconds to allow, phase to report if it fires)
+        """
+        left = remaining(deadline)
+        if left is not None and left <= seconds:
+            return max(left, 0.0), StreamTimeout.TOTAL
+        return seconds, phase
+    
+    @staticmethod
+    def _out_of_time(deadline: Optional[float]) -> bool:
+        """The deadline passed before a call could start; not the agent's fault, so kept off the breaker"""
+        left = remaining(deadline)
+        return left is not None and left <= 0
+    
+    def _circuit_open_error(self) -> StreamError:
+        logger.warning(f"{self.agent_name} circuit open, skipping call")
+        return StreamError(error=f"Circuit open: {self.agent_name} is temporarily unavailable")
+    
+    def _settle(
+        self,
+        event: StreamEvent,
+        streamed: bool,
+        attempt: int,
+        deadline: Optional[float]
+    ) -> Optional[float]:
+        """
+        Update the breaker for a terminal event and decide on a retry
+        
+        Phase timeouts (connect, first byte, inter-chunk) count against the
+        breaker. Running out of the overall budget, which is usually the
+        caller's query deadline, is neutral: it says nothing about the agent,
+        and one caller's tight budget must not open a breaker shared by all.
+        
+        Returns:
+            Seconds to wait before retrying, or None to pass the event on
+        """
+        if isinstance(event, StreamError) and event.timed_out and not event.retryable:
+            self.breaker.release_trial()
+            return None
+        
+        if isinstance(event, StreamError) and event.retryable:
+            self.breaker.record_failure()
+            # Tokens already reached the caller, so the call cannot be replayed
+            if streamed:
+                return None
+            delay = self.retry_policy.delay_for(attempt, event.retry_after)
+            left = remaining(deadline)
+            if delay is not None and left is not None and delay >= left:
+                delay = None
+            if delay is not None:
+                logger.warning(f"{self.agent_name} attempt {attempt} failed ({event.error}), "
+                               f"retrying in {delay:.2f}s")
+            return delay
+        
+        # Completed streams and client-side errors both mean Dify is reachable
+        self.breaker.record_success()
+        return None
+    
+    @staticmethod
+    def _to_stream_event(data: Dict[str, Any]) -> Optional[StreamEvent]:
+        """Map a decoded Dify event to a typed stream event, or None to drop it"""
+        event = data.get('event')
+        
+        if event in ('message', 'agent_message'):
+            text = data.get('answer', '')
+            return TokenDelta(text=text) if text else None
+        if event == 'message_end':
+            return MessageEnd(
+                conversation_id=data.get('conversation_id'),
+                message_id=data.get('id')
+            )
+        if event == 'error':
+            return StreamError(error=f"Dify error: {data.get('message', 'Unknown error')}")
+        return None
+    
+    @staticmethod
+    def _is_complete(end: MessageEnd) -> bool:
+        """Whether an answer is whole, so safe to cache for the full TTL"""
+        return not (end.truncated or end.unterminated)
+    
+    def _cache_for(self, conversation_id: Optional[str]) -> Optional[ResponseCache]:
+        """Answers inside an existing conversation depend on its history, so are never cached"""
+        return self.cache if conversation_id is None else None
+    
+    def _cached_events(
+        self,
+        cache: Optional[ResponseCache],
+        query: str,
+        context: Optional[Dict[str, Any]]
+    ) -> Optional[List[StreamEvent]]:
+        """Replay a cached answer as stream events, or None on a miss"""
+        if cache is None:
+            return None
+        
+        hit = cache.get(self.agent_id, query, context)
+        if hit is None:
+            return None
+        
+        logger.info(f"{self.agent_name} served from cache")
+        events = [TokenDelta(text=hit["content"])] if hit["content"] else []
+        events.append(MessageEnd(cached=True))
+        return events
+    
+    def execute_stream(
+        self,
+        query: str,
         conversation_id: Optional[str] = None,
         user_id: str = "default",
-        context: Optional[Dict[str, Any]] = None
-    ) -> AgentResponse:
+        context: Optional[Dict[str, Any]] = None,
+        bypass_cache: bool = False,
+        deadline: Optional[float] = None,
+        coalesce: Optional[bool] = None
+    ) -> Iterator[StreamEvent]:
         """
-        Execute the agent with a query
+        Execute the agent and yield events as the Dify stream is parsed
+        
+        The stream always ends with exactly one MessageEnd or StreamError.
+        If time runs out after tokens have arrived, the stream ends with
+        MessageEnd(truncated=True) so the partial answer is kept.
         
         Args:
             query: User query
             conversation_id: Optional conversation ID for context
             user_id: User identifier
             context: Additional context
+            bypass_cache: Skip the response cache lookup (the fresh answer is still stored)
+            deadline: Optional time.monotonic() deadline for the whole call
+            coalesce: Share the stream with identical concurrent calls (None = agent setting)
             
-        Returns:
-            AgentResponse with the result
+        Yields:
+            TokenDelta for each answer chunk, then MessageEnd or StreamError
         """
+        cache = self._cache_for(conversation_id)
+        
+        cached = None if bypass_cache else self._cached_events(cache, query, context)
+        if cached is not None:
+            yield from cached
+            return
+        
+        deadline = earliest(deadline_after(self.timeouts.total), deadline)
+        
+        def produce() -> Iterator[StreamEvent]:
+            return self._fresh_stream(cache, query, conversation_id, user_id, context, deadline)
+        
+        # Identical concurrent calls share one Dify stream
+        if (self.coalesce if coalesce is None else coalesce) and conversation_id is None:
+            yield from single_flight.stream(self._flight_key(query, user_id, context), produce, deadline)
+        else:
+            yield from produce()
+    
+    def _flight_key(self, query: str, user_id: str, context: Optional[Dict[str, Any]]) -> str:
+        """Single-flight key; only the same user's identical calls share a stream"""
+        return f"{user_id}\x1f{ResponseCache.make_key(self.agent_id, query, context)}"
+    
+    def _fresh_stream(
+        self,
+        cache: Optional[ResponseCache],
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> Iterator[StreamEvent]:
+        """Call Dify and store the answer in the cache if Dify ended it with message_end"""
+        chunks = []
+        for event in self._resilient_stream(query, conversation_id, user_id, context, deadline):
+            if isinstance(event, TokenDelta):
+                chunks.append(event.text)
+            elif isinstance(event, MessageEnd) and cache is not None and self._is_complete(event):
+                cache.set(self.agent_id, query, context, "".join(chunks))
+            yield event
+    
+    def _resilient_stream(
+        self,
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> Iterator[StreamEvent]:
+        """Run the Dify call behind the circuit breaker, retrying retryable failures"""
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            annotate(attempts=attempt)
+            if self._out_of_time(deadline):
+                yield self._timeout_error(StreamTimeout(StreamTimeout.TOTAL, 0))
+                return
+            if not self.breaker.allow_request():
+                yield self._circuit_open_error()
+                return
+            
+            streamed = False
+            settled = False
+            retry_delay = None
+            
+            try:
+                for event in self._stream_from_dify(query, conversation_id, user_id, context, deadline):
+                    if isinstance(event, TokenDelta):
+                        streamed = True
+                    else:
+                        settled = True
+                        retry_delay = self._settle(event, streamed, attempt, deadline)
+                        if retry_delay is not None:
+                            # Terminal event: swallow it and let the stream finish
+                            continue
+                    yield event
+            finally:
+                # Closed or cancelled mid-stream: don't leave a half-open trial claimed forever
+                if not settled:
+                    self.breaker.release_trial()
+            
+            if retry_delay is None:
+                return
+            time.sleep(retry_delay)
+    
+    def _stream_from_dify(
+        self,
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> Iterator[StreamEvent]:
+        """Run one /chat-messages call and yield its parsed stream events"""
+        streamed = False
+        
         try:
             logger.info(f"{self.agent_name} processing query: {query[:100]}...")
             
             url = f"{self.dify_base_url}/chat-messages"
+            payload = self._build_payload(query, conversation_id, user_id, context)
             
-            payload = {
-                "inputs": context or {},
-                "query": query,
-                "response_mode": "streaming",
-                "user": user_id
-            }
+            with blocking_host_slot(url, remaining(deadline)) as acquired:
+                if not acquired:
+                    raise StreamTimeout(StreamTimeout.TOTAL, 0)
+                connect, connect_phase = self._limit(StreamTimeout.CONNECT, self.timeouts.connect, deadline)
+                first_byte, first_byte_phase = self._limit(StreamTimeout.FIRST_BYTE, self.timeouts.first_byte, deadline)
+                if connect <= 0:
+                    raise StreamTimeout(StreamTimeout.TOTAL, 0)
             
-            if conversation_id:
-                payload["conversation_id"] = conversation_id
-            
-            response = self.session.post(url, json=payload, timeout=30, stream=True)
-            response.raise_for_status()
-            
-            # Parse streaming response
-            answer = ""
-            conv_id = None
-            msg_id = None
-            
-            for line in response.iter_lines():
-                if line:
-                    line_text = line.decode('utf-8')
-                    if line_text.startswith('data: '):
-                        try:
-                            data = json.loads(line_text[6:])
-                            event = data.get('event')
-                            
-                            if event == 'message':
-                                # Accumulate answer chunks
-                                answer += data.get('answer', '')
-                            elif event == 'agent_message':
-                                answer += data.get('answer', '')
-                            elif event == 'message_end':
-                                conv_id = data.get('conversation_id')
-                                msg_id = data.get('id')
-                        except json.JSONDecodeError:
+                started = time.monotonic()
+                try:
+                    response = self.session.post(
+                        url,
+                        json=payload,
+                        headers=self._headers(),
+                        timeout=(connect, first_byte),
+                        stream=True
+                    )
+                except requests.exceptions.ConnectTimeout:
+                    raise StreamTimeout(connect_phase, connect)
+                except requests.exceptions.ReadTimeout:
+                    raise StreamTimeout(first_byte_phase, first_byte)
+                annotate(first_byte_ms=round((time.monotonic() - started) * 1000, 1), http_status=response.status_code)
+            
+                with response:
+                    if not response.ok:
+                        # Read the error body while the connection is open; it says why Dify refused
+                        response.content
+                    response.raise_for_status()
+                
+                    for data in self._iter_sse(self._timed_chunks(response, deadline)):
+                        event = self._to_stream_event(data)
+                        if event is None:
                             continue
+                    
+                        streamed = streamed or isinstance(event, TokenDelta)
+                        yield event
+                        if not isinstance(event, TokenDelta):
+                            if isinstance(event, MessageEnd):
+                                logger.info(f"{self.agent_name} completed successfully")
+                            return
             
+            # Stream closed without message_end
             logger.info(f"{self.agent_name} completed successfully")
+            yield MessageEnd(unterminated=True)
             
-            return AgentResponse(
-                content=answer,
-                agent_name=self.agent_name,
-                success=True,
-                metadata={
-                    'conversation_id': conv_id,
-                    'message_id': msg_id,
-                    'agent_id': self.agent_id
-                }
-            )
-            
+        except StreamTimeout as e:
+            if streamed:
+                logger.warning(f"{self.agent_name} {e}, returning partial answer")
+                yield MessageEnd(truncated=True)
+            else:
+                yield self._timeout_error(e)
         except requests.exceptions.RequestException as e:
             error_msg = str(e)
             logger.error(f"{self.agent_name} API error: {error_msg}")
@@ -117,21 +478,385 @@ class BaseDifyAgent:
                 except:
                     pass
             
-            return AgentResponse(
-                content="",
-                agent_name=self.agent_name,
-                success=False,
-                error=f"API error: {error_msg}"
-            )
+            yield self._api_error(e)
         except Exception as e:
             logger.error(f"{self.agent_name} unexpected error: {str(e)}")
-            return AgentResponse(
-                content="",
-                agent_name=self.agent_name,
-                success=False,
-                error=f"Unexpected error: {str(e)}"
+            yield StreamError(error=f"Unexpected error: {str(e)}")
+    
+    def _timed_chunks(self, response: requests.Response, deadline: Optional[float]) -> Iterator[bytes]:
+        """Read the response body, enforcing the inter-chunk timeout and the call deadline"""
+        chunks = response.iter_content(chunk_size=self.READ_CHUNK_SIZE)
+        received = 0
+        
+        try:
+            while True:
+                limit, phase = self._limit(StreamTimeout.INTER_CHUNK, self.timeouts.inter_chunk, deadline)
+                if limit <= 0:
+                    raise StreamTimeout(phase, limit)
+                set_read_timeout(response, limit)
+                
+                try:
+                    chunk = next(chunks)
+                except StopIteration:
+                    return
+                except requests.exceptions.RequestException as e:
+                    if is_read_timeout(e):
+                        raise StreamTimeout(phase, limit)
+                    raise
+                
+                received += len(chunk)
+                yield chunk
+        finally:
+            increment("bytes", received)
+    
+    def execute(
+        self, 
+        query: str, 
+        conversation_id: Optional[str] = None,
+        user_id: str = "default",
+        context: Optional[Dict[str, Any]] = None,
+        bypass_cache: bool = False,
+        deadline: Optional[float] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        coalesce: Optional[bool] = None
+    ) -> AgentResponse:
+        """
+        Execute the agent with a query
+        
+        Args:
+            query: User query
+            conversation_id: Optional conversation ID for context
+            user_id: User identifier
+            context: Additional context
+            bypass_cache: Skip the response cache lookup (the fresh answer is still stored)
+            deadline: Optional time.monotonic() deadline for the whole call
+            on_token: Optional callback receiving each answer chunk as it arrives
+            coalesce: Share the stream with identical concurrent calls (None = agent setting)
+            
+        Returns:
+            AgentResponse with the result (metadata['truncated'] marks a partial answer)
+        """
+        return self.collect_response(
+            self.execute_stream(query, conversation_id, user_id, context, bypass_cache, deadline, coalesce),
+            on_token
+        )
+    
+    def collect_response(
+        self,
+        events: Iterable[StreamEvent],
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> AgentResponse:
+        """
+        Build an AgentResponse from this agent's stream events
+        
+        Args:
+            events: Events from execute_stream() (or a replay of them)
+            on_token: Optional callback receiving each answer chunk
+            
+        Returns:
+            AgentResponse with the result
+        """
+        buffer = _StreamBuffer()
+        for event in events:
+            buffer.add(event)
+            if on_token is not None and isinstance(event, TokenDelta):
+                on_token(event.text)
+        return buffer.to_response(self)
+    
+    async def _aiter_events(
+        self,
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream decoded Dify events over the shared async connection pool"""
+        url = f"{self.dify_base_url}/chat-messages"
+        payload = self._build_payload(query, conversation_id, user_id, context)
+        client = get_async_client()
+        
+        async with host_slot(url, remaining(deadline)) as acquired:
+            if not acquired:
+                raise StreamTimeout(StreamTimeout.TOTAL, 0)
+            connect, connect_phase = self._limit(StreamTimeout.CONNECT, self.timeouts.connect, deadline)
+            first_byte, first_byte_phase = self._limit(
+                StreamTimeout.FIRST_BYTE, self.timeouts.connect + self.timeouts.first_byte, deadline
             )
+            if connect <= 0:
+                raise StreamTimeout(StreamTimeout.TOTAL, 0)
+            
+            started = time.monotonic()
+            request = client.build_request(
+                "POST", url, json=payload, headers=self._headers(),
+                timeout=httpx.Timeout(None, connect=connect)
+            )
+            try:
+                response = await asyncio.wait_for(client.send(request, stream=True), first_byte)
+            except httpx.ConnectTimeout:
+                raise StreamTimeout(connect_phase, connect)
+            except asyncio.TimeoutError:
+                raise StreamTimeout(first_byte_phase, first_byte)
+            annotate(first_byte_ms=round((time.monotonic() - started) * 1000, 1), http_status=response.status_code)
+            
+            parser = SSEParser()
+            try:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+                
+                chunks = response.aiter_bytes()
+                while True:
+                    limit, phase = self._limit(StreamTimeout.INTER_CHUNK, self.timeouts.inter_chunk, deadline)
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), limit)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        raise StreamTimeout(phase, limit)
+                    for data in parser.feed(chunk):
+                        yield data
+                for data in parser.close():
+                    yield data
+            finally:
+                increment("bytes", parser.bytes_received)
+                await response.aclose()
+    
+    async def aexecute_stream(
+        self,
+        query: str,
+        conversation_id: Optional[str] = None,
+        user_id: str = "default",
+        context: Optional[Dict[str, Any]] = None,
+        bypass_cache: bool = False,
+        deadline: Optional[float] = None,
+        coalesce: Optional[bool] = None
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Async counterpart of execute_stream(), without blocking a thread
+        
+        Args:
+            query: User query
+            conversation_id: Optional conversation ID for context
+            user_id: User identifier
+            context: Additional context
+            bypass_cache: Skip the response cache lookup (the fresh answer is still stored)
+            deadline: Optional time.monotonic() deadline for the whole call
+            coalesce: Share the stream with identical concurrent calls (None = agent setting)
+            
+        Yields:
+            TokenDelta for each answer chunk, then MessageEnd or StreamError
+        """
+        cache = self._cache_for(conversation_id)
+        
+        cached = None if bypass_cache else self._cached_events(cache, query, context)
+        if cached is not None:
+            for event in cached:
+                yield event
+            return
+        
+        deadline = earliest(deadline_after(self.timeouts.total), deadline)
+        
+        def produce() -> AsyncIterator[StreamEvent]:
+            return self._afresh_stream(cache, query, conversation_id, user_id, context, deadline)
+        
+        if (self.coalesce if coalesce is None else coalesce) and conversation_id is None:
+            stream = async_single_flight.stream(self._flight_key(query, user_id, context), produce, deadline)
+        else:
+            stream = produce()
+        
+        async for event in stream:
+            yield event
+    
+    async def _afresh_stream(
+        self,
+        cache: Optional[ResponseCache],
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> AsyncIterator[StreamEvent]:
+        """Async counterpart of _fresh_stream()"""
+        chunks = []
+        async for event in self._aresilient_stream(query, conversation_id, user_id, context, deadline):
+            if isinstance(event, TokenDelta):
+                chunks.append(event.text)
+            elif isinstance(event, MessageEnd) and cache is not None and self._is_complete(event):
+                cache.set(self.agent_id, query, context, "".join(chunks))
+            yield event
+    
+    async def _aresilient_stream(
+        self,
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> AsyncIterator[StreamEvent]:
+        """Async counterpart of _resilient_stream()"""
+        attempt = 0
+        
+        while True:
+            attempt += 1
+            annotate(attempts=attempt)
+            if self._out_of_time(deadline):
+                yield self._timeout_error(StreamTimeout(StreamTimeout.TOTAL, 0))
+                return
+            if not self.breaker.allow_request():
+                yield self._circuit_open_error()
+                return
+            
+            streamed = False
+            settled = False
+            retry_delay = None
+            
+            try:
+                async for event in self._astream_from_dify(query, conversation_id, user_id, context, deadline):
+                    if isinstance(event, TokenDelta):
+                        streamed = True
+                    else:
+                        settled = True
+                        retry_delay = self._settle(event, streamed, attempt, deadline)
+                        if retry_delay is not None:
+                            # Terminal event: swallow it and let the stream finish
+                            continue
+                    yield event
+            finally:
+                # Closed or cancelled mid-stream: don't leave a half-open trial claimed forever
+                if not settled:
+                    self.breaker.release_trial()
+            
+            if retry_delay is None:
+                return
+            await asyncio.sleep(retry_delay)
+    
+    async def _astream_from_dify(
+        self,
+        query: str,
+        conversation_id: Optional[str],
+        user_id: str,
+        context: Optional[Dict[str, Any]],
+        deadline: Optional[float]
+    ) -> AsyncIterator[StreamEvent]:
+        """Async counterpart of _stream_from_dify()"""
+        streamed = False
+        
+        try:
+            logger.info(f"{self.agent_name} processing query (async): {query[:100]}...")
+            
+            async for data in self._aiter_events(query, conversation_id, user_id, context, deadline):
+                event = self._to_stream_event(data)
+                if event is None:
+                    continue
+                
+                streamed = streamed or isinstance(event, TokenDelta)
+                yield event
+                if not isinstance(event, TokenDelta):
+                    if isinstance(event, MessageEnd):
+                        logger.info(f"{self.agent_name} completed successfully")
+                    return
+            
+            logger.info(f"{self.agent_name} completed successfully")
+            yield MessageEnd(unterminated=True)
+            
+        except StreamTimeout as e:
+            if streamed:
+                logger.warning(f"{self.agent_name} {e}, returning partial answer")
+                yield MessageEnd(truncated=True)
+            else:
+                yield self._timeout_error(e)
+        except httpx.HTTPError as e:
+            error_msg = str(e)
+            logger.error(f"{self.agent_name} API error: {error_msg}")
+            
+            if isinstance(e, httpx.HTTPStatusError):
+                logger.error(f"{self.agent_name} Error details: {e.response.text[:500]}")
+            
+            yield self._api_error(e)
+        except Exception as e:
+            logger.error(f"{self.agent_name} unexpected error: {str(e)}")
+            yield StreamError(error=f"Unexpected error: {str(e)}")
+    
+    async def aexecute(
+        self,
+        query: str,
+        conversation_id: Optional[str] = None,
+        user_id: str = "default",
+        context: Optional[Dict[str, Any]] = None,
+        bypass_cache: bool = False,
+        deadline: Optional[float] = None,
+        coalesce: Optional[bool] = None
+    ) -> AgentResponse:
+        """
+        Async counterpart of execute()
+        
+        Args:
+            query: User query
+            conversation_id: Optional conversation ID for context
+            user_id: User identifier
+            context: Additional context
+            bypass_cache: Skip the response cache lookup (the fresh answer is still stored)
+            deadline: Optional time.monotonic() deadline for the whole call
+            coalesce: Share the stream with identical concurrent calls (None = agent setting)
+            
+        Returns:
+            AgentResponse with the result (metadata['truncated'] marks a partial answer)
+        """
+        buffer = _StreamBuffer()
+        async for event in self.aexecute_stream(
+            query, conversation_id, user_id, context, bypass_cache, deadline, coalesce
+        ):
+            buffer.add(event)
+        return buffer.to_response(self)
+    
+    async def aexecute_many(
+        self,
+        queries: List[str],
+        max_concurrency: int = 16,
+        user_id: str = "default",
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> List[AgentResponse]:
+        """
+        Run a batch of queries against this agent on the running event loop
+        
+        Args:
+            queries: Queries to run
+            max_concurrency: Number of calls in flight at once
+            user_id: User identifier for every call
+            context: Additional context shared by every call
+            timeout: Optional time budget in seconds for each call
+            
+        Returns:
+            One AgentResponse per query, in input order; a failed item is an
+            unsuccessful response rather than an exception
+        """
+        slots = asyncio.Semaphore(max(1, max_concurrency))
+        
+        async def run(query: str) -> AgentResponse:
+            async with slots:
+                try:
+                    return await self.aexecute(query, user_id=user_id, context=context,
+                                               deadline=deadline_after(timeout))
+                except Exception as e:
+                    logger.error(f"{self.agent_name} batch item failed: {str(e)}")
+                    buffer = _StreamBuffer()
+                    buffer.add(StreamError(error=f"Unexpected error: {str(e)}"))
+                    return buffer.to_response(self)
+        
+        logger.info(f"{self.agent_name} running batch of {len(queries)} queries (concurrency={max_concurrency})")
+        return list(await asyncio.gather(*(run(query) for query in queries)))
+    
+    def execute_many(self, queries: List[str], max_concurrency: int = 16, **kwargs) -> List[AgentResponse]:
+        """
+        Blocking wrapper around aexecute_many() for callers without an event loop
+        
+        Takes the same arguments and returns the same responses; must not be
+        called from inside a running event loop.
+        """
+        return asyncio.run(self.aexecute_many(queries, max_concurrency, **kwargs))
     
     def is_available(self) -> bool:
-        """Check if the agent is properly configured"""
-        return bool(self.agent_id and self.dify_api_key)
+        """Check if the agent is properly configured and its circuit is not open"""
+        return bool(self.agent_id and self.dify_api_key) and not self.breaker.is_open
@@ -0,0 +1,279 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Tuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Counters for a cache"""
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "hit_rate": self.hit_rate}
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL"""
+
+    def __init__(self, max_size: int = 512, ttl: Optional[float] = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else float("inf")
+
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """Persistent key/value cache storing JSON values with a TTL"""
+
+    # Expired rows are purged every this many writes
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str, ttl: Optional[float] = 3600.0, table: str = "cache"):
+        self.path = path
+        self.ttl = ttl
+        self.table = table
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """
+        Look up a value together with the seconds it has left
+
+        Returns:
+            (value, remaining TTL); value is None on a miss and the TTL is None
+            for entries that never expire
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.stats.misses += 1
+                return None, None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at < time.time():
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.expirations += 1
+                self.stats.misses += 1
+                return None, None
+
+            self.stats.hits += 1
+            return json.loads(value), (expires_at - time.time() if expires_at is not None else None)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                cursor = self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at < ?",
+                    (time.time(),)
+                )
+                self.stats.expirations += cursor.rowcount
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+
+class TieredCache:
+    """In-memory LRU in front of an optional persistent SQLite tier"""
+
+    def __init__(self, memory: LRUCache, persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+
+        if value is None and self.persistent is not None:
+            value, ttl = self.persistent.get_with_ttl(key)
+            if value is not None:
+                # Keep the entry's original expiry rather than starting a fresh TTL
+                self.memory.set(key, value, ttl if ttl is not None else float("inf"))
+
+        with self._lock:
+            if value is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+            self.stats.evictions = self.memory.stats.evictions
+            self.stats.expirations = self.memory.stats.expirations + (
+                self.persistent.stats.expirations if self.persistent is not None else 0
+            )
+
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.memory.set(key, value, ttl)
+        if self.persistent is not None:
+            self.persistent.set(key, value, ttl)
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.persistent is not None:
+            self.persistent.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold and collapse whitespace so trivially different queries share an entry"""
+    return " ".join(query.split()).casefold()
+
+
+def hash_context(context: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of an agent's `inputs` context"""
+    canonical = json.dumps(context or {}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Cache of agent answers keyed on (agent_id, normalized query, context hash)
+
+    The backing store is pluggable: anything with get(key) / set(key, value)
+    works, e.g. LRUCache, SQLiteCache or TieredCache.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def make_key(agent_id: str, query: str, context: Optional[Dict[str, Any]]) -> str:
+        raw = f"{agent_id}\x1f{normalize_query(query)}\x1f{hash_context(context)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, agent_id: str, query: str, context: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return self.store.get(self.make_key(agent_id, query, context))
+
+    def set(self, agent_id: str, query: str, context: Optional[Dict[str, Any]], content: str):
+        self.store.set(self.make_key(agent_id, query, context), {"content": content})
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """
+    Get the process-wide response cache built from config
+
+    Returns:
+        ResponseCache, or None when RESPONSE_CACHE_ENABLED is false
+    """
+    global _response_cache
+
+    settings = config.response_cache
+    if not settings.enabled:
+        return None
+
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                persistent = None
+                if settings.sqlite_path:
+                    persistent = SQLiteCache(settings.sqlite_path, ttl=settings.ttl, table="agent_responses")
+                _response_cache = ResponseCache(TieredCache(
+                    LRUCache(max_size=settings.max_size, ttl=settings.ttl),
+                    persistent
+                ))
+                logger.info(f"Response cache enabled (size={settings.max_size}, ttl={settings.ttl}s, "
+                            f"sqlite={settings.sqlite_path or 'off'})")
+
+    return _response_cache
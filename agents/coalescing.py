@@ -0,0 +1,313 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from .streaming import MessageEnd, StreamEvent, TokenDelta, StreamError
+from .timeouts import StreamTimeout, remaining
+
+logger = logging.getLogger(__name__)
+
+ABANDONED = StreamError(error="Coalesced request was abandoned before it finished", retryable=True)
+
+# Budgets this close count as equal (callers arriving together compute them moments apart)
+BUDGET_TOLERANCE = 0.1
+
+
+@dataclass
+class FlightStats:
+    """Counters for request coalescing"""
+    leaders: int = 0
+    joined: int = 0
+    handoffs: int = 0
+
+
+def _budget(deadline: Optional[float]) -> Optional[float]:
+    return deadline - time.monotonic() if deadline is not None else None
+
+
+def _covers(leader_budget: Optional[float], budget: Optional[float]) -> bool:
+    """Whether a flight running with leader_budget can serve a caller allowed budget"""
+    if leader_budget is None:
+        return True
+    return budget is not None and budget <= leader_budget + BUDGET_TOLERANCE
+
+
+def _out_of_time(streamed: bool) -> StreamEvent:
+    """End of a follower's stream when its own deadline passes before the flight finishes"""
+    if streamed:
+        return MessageEnd(truncated=True)
+    return StreamError(error=f"Timeout: {StreamTimeout(StreamTimeout.TOTAL, 0)}", timed_out=True)
+
+
+def _close(events: Iterator[StreamEvent]):
+    # produce() may return a plain iterator rather than a generator
+    close = getattr(events, "close", None)
+    if close is not None:
+        close()
+
+
+async def _aclose(events: AsyncIterator[StreamEvent]):
+    aclose = getattr(events, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+class EventReplay:
+    """Events of one in-flight execution, replayable by late joiners"""
+
+    def __init__(self, budget: Optional[float] = None):
+        self.events: List[StreamEvent] = []
+        self.done = False
+        self.cond = threading.Condition()
+        # Seconds the execution was allowed when it started (None = unbounded)
+        self.budget = budget
+        # Callers following besides the one driving the execution
+        self.followers = 0
+
+    def publish(self, event: StreamEvent):
+        with self.cond:
+            self.events.append(event)
+            self.cond.notify_all()
+
+    def finish(self):
+        with self.cond:
+            self.done = True
+            self.cond.notify_all()
+
+    def follow(self, deadline: Optional[float] = None) -> Iterator[StreamEvent]:
+        """Replay and then follow the events, giving up at this follower's own deadline"""
+        index = 0
+        while True:
+            with self.cond:
+                while index >= len(self.events) and not self.done:
+                    left = remaining(deadline)
+                    if left is not None and left <= 0:
+                        break
+                    self.cond.wait(left)
+                pending = self.events[index:]
+                done = self.done
+            index += len(pending)
+            yield from pending
+            if done and index >= len(self.events):
+                break
+            if not pending:
+                yield _out_of_time(index > 0)
+                return
+
+        if not self.events or isinstance(self.events[-1], TokenDelta):
+            yield ABANDONED
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent streams into one execution
+
+    The first caller for a key runs the stream; callers arriving while it is
+    in flight replay the events so far and then follow it live. Callers only
+    join a flight whose time budget covers theirs. If the first caller stops
+    reading while others follow, the execution continues in a background
+    thread until it finishes or nobody follows any more.
+    """
+
+    def __init__(self):
+        self.stats = FlightStats()
+        self._flights: Dict[str, EventReplay] = {}
+        self._lock = threading.Lock()
+
+    def stream(
+        self,
+        key: str,
+        produce: Callable[[], Iterator[StreamEvent]],
+        deadline: Optional[float] = None
+    ) -> Iterator[StreamEvent]:
+        budget = _budget(deadline)
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None or not _covers(flight.budget, budget)
+            if leader:
+                # A flight that would stop sooner than this caller may is left to its own followers
+                flight = self._flights[key] = EventReplay(budget)
+                self.stats.leaders += 1
+            else:
+                flight.followers += 1
+                self.stats.joined += 1
+
+        if not leader:
+            yield from self._follow(key, flight, deadline)
+            return
+
+        events = produce()
+        handed_off = False
+        try:
+            for event in events:
+                flight.publish(event)
+                yield event
+        except GeneratorExit:
+            handed_off = self._hand_off(key, flight, events)
+            raise
+        finally:
+            if not handed_off:
+                _close(events)
+                self._land(key, flight)
+
+    def _follow(self, key: str, flight: EventReplay, deadline: Optional[float]) -> Iterator[StreamEvent]:
+        logger.info("Joining in-flight request")
+        try:
+            yield from flight.follow(deadline)
+        finally:
+            with self._lock:
+                flight.followers -= 1
+
+    def _hand_off(self, key: str, flight: EventReplay, events: Iterator[StreamEvent]) -> bool:
+        """Keep the execution going for the followers after its first caller left"""
+        with self._lock:
+            if flight.followers == 0 or flight.done:
+                return False
+            self.stats.handoffs += 1
+
+        logger.info("Caller left a coalesced request, continuing it for the callers that joined")
+        threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._pump, key, flight, events),
+            name="single-flight",
+            daemon=True
+        ).start()
+        return True
+
+    def _pump(self, key: str, flight: EventReplay, events: Iterator[StreamEvent]):
+        try:
+            for event in events:
+                flight.publish(event)
+                with self._lock:
+                    if flight.followers == 0:
+                        break
+        except Exception as e:
+            logger.error(f"Coalesced request failed after hand-off: {e}")
+        finally:
+            _close(events)
+            self._land(key, flight)
+
+    def _land(self, key: str, flight: EventReplay):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.finish()
+
+
+class _AsyncFlight:
+    """asyncio counterpart of EventReplay"""
+
+    def __init__(self, budget: Optional[float] = None):
+        self.events: List[StreamEvent] = []
+        self.done = False
+        self.changed = asyncio.Event()
+        self.budget = budget
+        # Every caller reading the flight, including the one that started it
+        self.followers = 0
+        # Task reading the upstream stream
+        self.pump: Optional["asyncio.Task"] = None
+
+    def publish(self, event: StreamEvent):
+        self.events.append(event)
+        self.changed.set()
+
+    def finish(self):
+        self.done = True
+        self.changed.set()
+
+    async def follow(self, deadline: Optional[float] = None) -> AsyncIterator[StreamEvent]:
+        """Replay and then follow the events, giving up at this follower's own deadline"""
+        index = 0
+        while True:
+            while index < len(self.events):
+                yield self.events[index]
+                index += 1
+            if self.done:
+                break
+            self.changed.clear()
+            try:
+                await asyncio.wait_for(self.changed.wait(), remaining(deadline))
+            except asyncio.TimeoutError:
+                if index >= len(self.events) and not self.done:
+                    yield _out_of_time(index > 0)
+                    return
+
+        if not self.events or isinstance(self.events[-1], TokenDelta):
+            yield ABANDONED
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight for coroutines; flights are tracked per event loop
+
+    Each flight reads its upstream stream in a task of its own, so the
+    stream survives its first caller leaving or being cancelled while
+    others follow, and is cancelled once nobody follows.
+    """
+
+    def __init__(self):
+        self.stats = FlightStats()
+        self._flights: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _AsyncFlight]]" = \
+            weakref.WeakKeyDictionary()
+
+    async def stream(
+        self,
+        key: str,
+        produce: Callable[[], AsyncIterator[StreamEvent]],
+        deadline: Optional[float] = None
+    ) -> AsyncIterator[StreamEvent]:
+        flights = self._flights.setdefault(asyncio.get_running_loop(), {})
+        flight = flights.get(key)
+        budget = _budget(deadline)
+
+        leader = flight is None or not _covers(flight.budget, budget)
+        if not leader:
+            self.stats.joined += 1
+            logger.info("Joining in-flight request")
+        else:
+            flight = flights[key] = _AsyncFlight(budget)
+            self.stats.leaders += 1
+            # The upstream stream runs in its own task, so cancelling the first caller's task
+            # does not cancel the stream the other callers are following
+            flight.pump = asyncio.get_running_loop().create_task(self._pump(flights, key, flight, produce()))
+
+        flight.followers += 1
+        try:
+            async for event in flight.follow(deadline):
+                yield event
+        finally:
+            flight.followers -= 1
+            if not flight.done:
+                if flight.followers == 0:
+                    flight.pump.cancel()
+                elif leader:
+                    self.stats.handoffs += 1
+                    logger.info("Caller left a coalesced request, continuing it for the callers that joined")
+
+    async def _pump(self, flights: Dict[str, _AsyncFlight], key: str, flight: _AsyncFlight,
+                    events: AsyncIterator[StreamEvent]):
+        try:
+            async for event in events:
+                flight.publish(event)
+                if flight.followers == 0:
+                    break
+        except Exception as e:
+            logger.error(f"Coalesced request failed: {e}")
+        finally:
+            await _aclose(events)
+            self._land(flights, key, flight)
+
+    @staticmethod
+    def _land(flights: Dict[str, _AsyncFlight], key: str, flight: _AsyncFlight):
+        if flights.get(key) is flight:
+            del flights[key]
+        flight.finish()
+
+
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
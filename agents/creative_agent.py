@@ -19,7 +19,8 @@ class CreativeAgent(BaseDifyAgent):
             agent_id=config.creative_agent.agent_id,
             agent_name=config.creative_agent.name,
             dify_api_key=config.dify_api_key,
-            dify_base_url=config.dify_base_url
+            dify_base_url=config.dify_base_url,
+            timeouts=config.creative_agent.timeouts
         )
         self.keywords = config.creative_agent.keywords
         self.description = config.creative_agent.description
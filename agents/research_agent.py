@@ -19,7 +19,8 @@ class ResearchAgent(BaseDifyAgent):
             agent_id=config.research_agent.agent_id,
             agent_name=config.research_agent.name,
             dify_api_key=config.dify_api_key,
-            dify_base_url=config.dify_base_url
+            dify_base_url=config.dify_base_url,
+            timeouts=config.research_agent.timeouts
         )
         self.keywords = config.research_agent.keywords
         self.description = config.research_agent.description
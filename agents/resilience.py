@@ -0,0 +1,146 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+import httpx
+import requests
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+@dataclass
+class RetryPolicy:
+    """Bounded retries with exponential backoff and full jitter"""
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+
+    def delay_for(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt
+
+        Args:
+            attempt: Number of the attempt that just failed (1-based)
+            retry_after: Server-requested delay from a Retry-After header;
+                longer than max_delay waits max_delay
+
+        Returns:
+            Delay in seconds, or None if no further attempt should be made
+        """
+        if attempt >= self.max_attempts:
+            return None
+        if retry_after is not None:
+            # Honour the server, but don't sit on a request longer than our own cap
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Per-agent circuit breaker
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    requests are rejected for `recovery_timeout` seconds. Then one trial
+    request is let through (half-open); its outcome closes or re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """True while requests are being rejected"""
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        """Check whether a request may be sent now, claiming the half-open trial if needed"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def release_trial(self):
+        """Give back a half-open trial whose outcome will never be recorded (the call was abandoned)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: Exception) -> Tuple[bool, Optional[float], Optional[int]]:
+    """
+    Decide whether a requests/httpx failure is worth retrying
+
+    Returns:
+        (retryable, retry_after seconds, HTTP status code)
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+
+    if status is not None and isinstance(error, (requests.exceptions.HTTPError, httpx.HTTPStatusError)):
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        return status in RETRYABLE_STATUS, retry_after, status
+
+    if isinstance(error, (requests.exceptions.ConnectionError,
+                          requests.exceptions.Timeout,
+                          requests.exceptions.ChunkedEncodingError,
+                          httpx.TransportError)):
+        return True, None, None
+
+    return False, None, status
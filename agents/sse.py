@@ -0,0 +1,199 @@
+import json
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+    _fast_loads: Optional[Callable[[bytes], Any]] = orjson.loads
+except ImportError:  # pragma: no cover - optional backend
+    _fast_loads = None
+
+# Event type and answer keys of a payload, read without decoding it. A match is
+# only a top-level key when _is_flat_head() holds for the text before it.
+_EVENT_TYPE_RE = re.compile(r'"event"\s*:\s*"([A-Za-z_]+)"')
+_ANSWER_KEY_RE = re.compile(r'"answer"\s*:\s*"')
+
+DIFY_ANSWER_EVENTS = frozenset({'message', 'agent_message', 'message_end', 'error'})
+# Events where only the answer text is needed, so the rest of the JSON is not decoded
+DIFY_TOKEN_EVENTS = frozenset({'message', 'agent_message'})
+
+_json_decoder = json.JSONDecoder()
+_scanstring = json.decoder.scanstring
+
+
+def _is_flat_head(text: str, start: int, end: int) -> bool:
+    """
+    Check that text[start:end] opens a JSON object and holds only flat pairs
+
+    A nested object (on its own or inside an array) may hold a key of the
+    same name, and an escaped quote may fake one inside a string, so keys
+    found after either are not trusted and the payload is decoded instead.
+    """
+    opening = text.find("{", start, end)
+    return (
+        opening >= 0
+        and text.find("{", opening + 1, end) < 0
+        and text.find("\\", opening + 1, end) < 0
+        and (opening == start or text[start:opening].isspace())
+    )
+
+
+def _stdlib_loads(data: bytes) -> Any:
+    return _json_decoder.decode(data.decode('utf-8'))
+
+
+def get_json_loads(prefer_fast: bool = True) -> Callable[[bytes], Any]:
+    """Return orjson.loads when installed (and preferred), else the stdlib decoder"""
+    if prefer_fast and _fast_loads is not None:
+        return _fast_loads
+    return _stdlib_loads
+
+
+class SSEParser:
+    """
+    Incremental Server-Sent Events parser working on raw bytes
+
+    Feed network chunks as they arrive; complete events come back as decoded
+    JSON objects. Events whose type is not in `wanted_events` are dropped
+    before the JSON is decoded, and events in `token_events` are reduced to
+    {"event", "answer"} without decoding the rest of the payload.
+    """
+
+    def __init__(
+        self,
+        wanted_events: Optional[Iterable[str]] = DIFY_ANSWER_EVENTS,
+        loads: Optional[Callable[[bytes], Any]] = None,
+        token_events: Iterable[str] = DIFY_TOKEN_EVENTS
+    ):
+        self.wanted = frozenset(wanted_events) if wanted_events is not None else None
+        self.token_events = frozenset(token_events)
+        self.loads = loads or get_json_loads()
+        self._buffer = bytearray()
+        self._pending_cr = False
+        self.bytes_received = 0
+        self.events_skipped = 0
+
+    def feed(self, chunk: bytes) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk of the stream
+
+        Args:
+            chunk: Raw bytes as read from the socket
+
+        Returns:
+            Decoded events completed by this chunk
+        """
+        if not chunk:
+            return []
+
+        self.bytes_received += len(chunk)
+
+        # Normalise CRLF / CR line endings; a trailing CR may pair with a LF in the next chunk
+        if self._pending_cr:
+            chunk = b"\r" + chunk
+            self._pending_cr = False
+        if b"\r" in chunk:
+            if chunk.endswith(b"\r"):
+                chunk = chunk[:-1]
+                self._pending_cr = True
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+        # Append in place and only search the new bytes (plus one, for a "\n\n" split across chunks)
+        buffer = self._buffer
+        scan_from = max(len(buffer) - 1, 0)
+        buffer += chunk
+        end = buffer.rfind(b"\n\n", scan_from)
+        if end < 0:
+            return []
+
+        # Blocks end at a blank line, so no UTF-8 sequence is cut; decode them all at once
+        text = buffer[:end].decode("utf-8", "replace")
+        del buffer[:end + 2]
+
+        events = []
+        token_events = self.token_events
+        for block in text.split("\n\n"):
+            # Fast path: a token event on a single "data:" line with the answer after the
+            # event type, which is most of a Dify stream
+            if block.startswith("data:") and "\n" not in block:
+                match = _EVENT_TYPE_RE.search(block, 5)
+                if match is not None and match.group(1) in token_events:
+                    answer = _ANSWER_KEY_RE.search(block, match.end())
+                    if answer is not None and _is_flat_head(block, 5, answer.start()):
+                        try:
+                            events.append({'event': match.group(1), 'answer': _scanstring(block, answer.end())[0]})
+                            continue
+                        except ValueError:
+                            pass
+            if block:
+                event = self._parse_block(block)
+                if event is not None:
+                    events.append(event)
+        return events
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Flush a final event that was not followed by a blank line"""
+        block = self._buffer.decode("utf-8", "replace").strip("\n")
+        self._buffer = bytearray()
+        self._pending_cr = False
+        if not block:
+            return []
+        event = self._parse_block(block)
+        return [event] if event is not None else []
+
+    def _parse_block(self, block: str) -> Optional[Dict[str, Any]]:
+        """Parse one event block (the lines between blank lines)"""
+        event_type = None
+
+        if block.startswith("data:") and "\n" not in block:
+            data = block[5:]
+        else:
+            data_lines = []
+            for line in block.split("\n"):
+                if not line or line.startswith(":"):
+                    continue
+                field, _, value = line.partition(":")
+                if value.startswith(" "):
+                    value = value[1:]
+                if field == "data":
+                    data_lines.append(value)
+                elif field == "event":
+                    event_type = value
+            if not data_lines:
+                return None
+            data = "\n".join(data_lines)
+
+        if event_type is None and (self.wanted is not None or self.token_events):
+            match = _EVENT_TYPE_RE.search(data)
+            if match is not None and _is_flat_head(data, 0, match.start()):
+                event_type = match.group(1)
+
+        if self.wanted is not None and event_type is not None and event_type not in self.wanted:
+            self.events_skipped += 1
+            return None
+
+        # Token events: read the answer string in place instead of decoding the whole payload
+        if event_type in self.token_events:
+            match = _ANSWER_KEY_RE.search(data)
+            if match is not None and _is_flat_head(data, 0, match.start()):
+                try:
+                    return {'event': event_type, 'answer': _scanstring(data, match.end())[0]}
+                except ValueError:
+                    pass
+
+        try:
+            decoded = self.loads(data.encode("utf-8"))
+        except ValueError:
+            return None
+
+        if not isinstance(decoded, dict):
+            return None
+
+        # The type could not be read from the payload text; filter on the decoded value
+        if self.wanted is not None and event_type is None:
+            name = decoded.get('event')
+            if isinstance(name, str) and name not in self.wanted:
+                self.events_skipped += 1
+                return None
+
+        return decoded
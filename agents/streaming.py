@@ -0,0 +1,34 @@
+from dataclasses import dataclass
+from typing import Optional, Union
+
+
+@dataclass
+class TokenDelta:
+    """Incremental answer text as it arrives from Dify"""
+    text: str
+
+
+@dataclass
+class MessageEnd:
+    """End of a successful agent stream"""
+    conversation_id: Optional[str] = None
+    message_id: Optional[str] = None
+    cached: bool = False
+    truncated: bool = False
+    # The stream closed without Dify's message_end, so the answer may be incomplete
+    unterminated: bool = False
+
+
+@dataclass
+class StreamError:
+    """Terminal error in an agent stream"""
+    error: str
+    retryable: bool = False
+    retry_after: Optional[float] = None
+    status_code: Optional[int] = None
+    timed_out: bool = False
+    # Dify no longer knows the conversation the call continued
+    conversation_rejected: bool = False
+
+
+StreamEvent = Union[TokenDelta, MessageEnd, StreamError]
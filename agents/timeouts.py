@@ -0,0 +1,60 @@
+import time
+from typing import Optional
+
+import requests
+from urllib3.exceptions import ReadTimeoutError
+
+
+class StreamTimeout(Exception):
+    """An agent call ran out of time in the given phase"""
+
+    CONNECT = "connect"
+    FIRST_BYTE = "first_byte"
+    INTER_CHUNK = "inter_chunk"
+    TOTAL = "total"
+
+    def __init__(self, phase: str, seconds: float):
+        if phase == self.TOTAL:
+            message = "time budget exhausted"
+        else:
+            message = f"{phase.replace('_', ' ')} timeout after {seconds:.1f}s"
+        super().__init__(message)
+        self.phase = phase
+        self.seconds = seconds
+
+    @property
+    def retryable(self) -> bool:
+        # Once the overall budget is gone there is nothing left to retry with
+        return self.phase != self.TOTAL
+
+
+def deadline_after(seconds: Optional[float]) -> Optional[float]:
+    """Turn a relative timeout into an absolute time.monotonic() deadline"""
+    return time.monotonic() + seconds if seconds is not None else None
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before a time.monotonic() deadline, or None when unbounded"""
+    return deadline - time.monotonic() if deadline is not None else None
+
+
+def earliest(*deadlines: Optional[float]) -> Optional[float]:
+    """The soonest of several optional deadlines"""
+    bounded = [d for d in deadlines if d is not None]
+    return min(bounded) if bounded else None
+
+
+def is_read_timeout(error: Exception) -> bool:
+    """requests reports socket read timeouts during iter_content as ConnectionError"""
+    if isinstance(error, requests.exceptions.ReadTimeout):
+        return True
+    return bool(error.args) and isinstance(error.args[0], ReadTimeoutError)
+
+
+def set_read_timeout(response: requests.Response, seconds: float):
+    """Change the socket read timeout of a streaming response mid-body"""
+    raw = response.raw
+    connection = getattr(raw, "connection", None) or getattr(raw, "_connection", None)
+    sock = getattr(connection, "sock", None)
+    if sock is not None:
+        sock.settimeout(max(seconds, 0.001))
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Dict, Iterator, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Process-wide requests.Session shared by every agent and every brain
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+# Per-host caps on concurrent calls through the shared session
+_blocking_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+# One AsyncClient per running event loop. httpx connections are bound to the
+# loop that opened them, so the pool is shared by every agent on that loop.
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_host_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_async_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Get the shared requests.Session
+
+    Connections are pooled per host (up to HTTPConfig.max_per_host) and kept
+    alive between calls, so TLS handshakes to Dify are paid once per connection
+    rather than once per agent. Auth headers are sent per request. The pool
+    does not cap concurrent calls itself; callers hold a blocking_host_slot()
+    for that.
+
+    Returns:
+        requests.Session shared by the whole process
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                http = config.http
+                adapter = HTTPAdapter(
+                    pool_connections=http.pool_connections,
+                    pool_maxsize=http.max_per_host
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+                logger.debug("Created shared HTTP session")
+
+    return _session
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Get the shared AsyncClient for the running event loop
+
+    Returns:
+        httpx.AsyncClient shared by all agents on the current loop
+    """
+    loop = asyncio.get_running_loop()
+
+    with _async_lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            http = config.http
+            client = httpx.AsyncClient(limits=httpx.Limits(
+                max_connections=http.max_connections,
+                max_keepalive_connections=http.max_keepalive_connections,
+                keepalive_expiry=http.keepalive_expiry
+            ))
+            _async_clients[loop] = client
+            logger.debug("Created shared async HTTP client")
+
+    return client
+
+
+@asynccontextmanager
+async def host_slot(url: str, timeout: Optional[float] = None) -> AsyncIterator[bool]:
+    """
+    Hold one of the per-host connection slots for the running event loop
+
+    Args:
+        url: URL of the call
+        timeout: Longest wait for a slot in seconds (None = no limit)
+
+    Yields:
+        True if a slot is held, False if none freed up in time
+    """
+    loop = asyncio.get_running_loop()
+    host = urlsplit(url).netloc
+
+    with _async_lock:
+        slots = _host_slots.setdefault(loop, {})
+        semaphore = slots.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(config.http.max_per_host)
+            slots[host] = semaphore
+
+    try:
+        await asyncio.wait_for(semaphore.acquire(), max(timeout, 0.0) if timeout is not None else None)
+    except asyncio.TimeoutError:
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        semaphore.release()
+
+
+@contextmanager
+def blocking_host_slot(url: str, timeout: Optional[float]) -> Iterator[bool]:
+    """
+    Hold one of the per-host connection slots for a call on the shared session
+
+    Thread counterpart of host_slot(). Waiting is bounded, unlike urllib3's
+    pool_block, so a call past max_per_host cannot outlive its deadline.
+
+    Args:
+        url: URL of the call
+        timeout: Longest wait for a slot in seconds (None = no limit)
+
+    Yields:
+        True if a slot is held, False if none freed up in time
+    """
+    host = urlsplit(url).netloc
+
+    with _session_lock:
+        semaphore = _blocking_slots.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(config.http.max_per_host)
+            _blocking_slots[host] = semaphore
+
+    acquired = semaphore.acquire(timeout=max(timeout, 0.0) if timeout is not None else None)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            semaphore.release()
+
+
+async def aclose_async_client():
+    """Close the shared AsyncClient for the running event loop, if any"""
+    loop = asyncio.get_running_loop()
+
+    with _async_lock:
+        client = _async_clients.pop(loop, None)
+        _host_slots.pop(loop, None)
+
+    if client is not None:
+        await client.aclose()
+
+
+def close_session():
+    """Close the shared requests.Session and drop its pooled connections"""
+    global _session
+
+    with _session_lock:
+        session, _session = _session, None
+        _blocking_slots.clear()
+
+    if session is not None:
+        session.close()
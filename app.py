@@ -3,7 +3,9 @@ Streamlit Web Interface for Dify-LangGraph Agent System
 """
 import streamlit as st
 from agent_system import DifyLangGraphSystem
+from orchestrator import AgentsSelected, AgentStarted, AgentToken, AgentFinished, FinalResult
 import time
+import uuid
 
 st.set_page_config(
     page_title="Dify-LangGraph Agent System",
@@ -13,16 +15,26 @@ st.set_page_config(
 )
 
 
+@st.cache_resource
+def get_system() -> DifyLangGraphSystem:
+    """One system (and one HTTP connection pool) shared by all browser sessions"""
+    return DifyLangGraphSystem()
+
+
 def initialize_session_state():
     """Initialize session state variables"""
     if 'system' not in st.session_state:
-        st.session_state.system = DifyLangGraphSystem()
+        st.session_state.system = get_system()
     
     if 'messages' not in st.session_state:
         st.session_state.messages = []
     
     if 'query_count' not in st.session_state:
         st.session_state.query_count = 0
+    
+    # One Dify conversation per agent for the whole chat
+    if 'session_id' not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
 
 
 def render_sidebar():
@@ -47,6 +59,7 @@ def render_sidebar():
     if st.sidebar.button("🗑️ Clear Chat History"):
         st.session_state.messages = []
         st.session_state.query_count = 0
+        st.session_state.session_id = uuid.uuid4().hex
         st.rerun()
 
 
@@ -125,10 +138,36 @@ def process_query(prompt: str):
     with st.chat_message("user"):
         st.markdown(prompt)
     
-    # Process with system
+    # Process with system, showing each agent's answer as it streams in
     with st.chat_message("assistant"):
-        with st.spinner("🧠 Analyzing query and selecting agents..."):
-            result = st.session_state.system.process_query(prompt, verbose=False)
+        status = st.status("🧠 Analyzing query and selecting agents...")
+        live = st.empty()
+        panels = {}
+        texts = {}
+        result = None
+        
+        with live.container():
+            for event in st.session_state.system.process_query_stream(
+                prompt, session_id=st.session_state.session_id
+            ):
+                if isinstance(event, AgentsSelected):
+                    status.update(label=f"🤖 Running {len(event.agents)} agent(s): {', '.join(event.agents)}")
+                elif isinstance(event, AgentStarted):
+                    st.markdown(f"**{event.agent_name}**")
+                    panels[event.agent_key] = st.empty()
+                    texts[event.agent_key] = ""
+                elif isinstance(event, AgentToken):
+                    texts[event.agent_key] += event.text
+                    panels[event.agent_key].markdown(texts[event.agent_key] + "▌")
+                elif isinstance(event, AgentFinished):
+                    if event.agent_key in panels:
+                        panels[event.agent_key].markdown(texts[event.agent_key])
+                    status.write(f"{'✅' if event.success else '❌'} {event.agent_name}")
+                elif isinstance(event, FinalResult):
+                    result = st.session_state.system.to_dict(event.result)
+        
+        status.update(label="Done", state="complete" if result['success'] else "error")
+        live.empty()
         
         # Display response
         if result['success']:
@@ -136,6 +175,8 @@ def process_query(prompt: str):
             
             agents_display = result.get('agents_used_display', 'Unknown')
             st.success(f"🤖 **Agents Used:** {agents_display}")
+            if result.get('dropped_agents'):
+                st.warning(f"⏱️ **Dropped (time budget):** {', '.join(result['dropped_agents'])}")
             
             # Show detailed agent information
             with st.expander("📊 Agent Execution Details"):
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for orchestration overhead: compiled LangGraph graph vs the
+direct fast path in LangGraphBrain.process_query
+
+Agents and selection are replaced with instant stubs, so the measured time
+is what the orchestration itself costs per query. Also checks that both
+paths return the same result.
+
+Usage:
+    python benchmark_fast_path.py
+    python benchmark_fast_path.py --queries 2000
+"""
+import argparse
+import logging
+import time
+from typing import Any, Dict, List
+
+from agents import AgentResponse
+from orchestrator import LangGraphBrain
+
+PLANS: Dict[str, Dict[str, List[str]]] = {
+    "single agent": {"research": []},
+    "linear (3 agents)": {"research": [], "analysis": ["research"], "creative": ["research", "analysis"]},
+    "parallel (2 agents)": {"research": [], "creative": []},
+}
+
+
+class StubAgent:
+    """Answers instantly, with the interface the brain uses"""
+
+    def __init__(self, agent_key: str):
+        self.agent_key = agent_key
+        self.agent_name = f"{agent_key.title()} Agent"
+        self.agent_id = f"stub-{agent_key}"
+
+    def is_available(self) -> bool:
+        return True
+
+    def execute(self, query: str, conversation_id=None, context=None, deadline=None, on_token=None,
+                **kwargs) -> AgentResponse:
+        content = f"{self.agent_name} answer to {query}. " * 5
+        if on_token is not None:
+            on_token(content)
+        return AgentResponse(
+            content=content,
+            agent_name=self.agent_name,
+            success=True,
+            metadata={"conversation_id": None, "message_id": None, "agent_id": self.agent_id,
+                      "cached": False, "truncated": False}
+        )
+
+
+def build_brain(fast_path: bool) -> LangGraphBrain:
+    brain = LangGraphBrain(fast_path=fast_path, checkpoint_path=None)
+    brain.agents = {agent_key: StubAgent(agent_key) for agent_key in brain.agents}
+    return brain
+
+
+def comparable(result) -> Dict[str, Any]:
+    """Result fields that must match across paths (timings and IDs differ per run)"""
+    return {
+        "response": result.response,
+        "agents_used": result.agents_used,
+        "success": result.success,
+        "error": result.error,
+        "dropped_agents": result.dropped_agents,
+        "agent_details": [
+            {k: v for k, v in detail.items() if k != "timings"} for detail in result.agent_details
+        ],
+    }
+
+
+def bench(brain: LangGraphBrain, queries: int) -> float:
+    """Mean seconds per query"""
+    start = time.perf_counter()
+    for i in range(queries):
+        brain.process_query(f"query {i}")
+    return (time.perf_counter() - start) / queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark graph vs fast-path orchestration overhead")
+    parser.add_argument("--queries", type=int, default=500, help="Queries per plan and path")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    graph_brain = build_brain(fast_path=False)
+    fast_brain = build_brain(fast_path=True)
+
+    print(f"{'plan':<22} {'graph':>10} {'fast path':>10} {'saved':>10}")
+    for name, plan in PLANS.items():
+        for brain in (graph_brain, fast_brain):
+            brain.selector.select_plan = lambda query, plan=plan: dict(plan)
+
+        graph_result = graph_brain.process_query("check")
+        fast_result = fast_brain.process_query("check")
+        # Identical error results would compare equal while timing only the exception path
+        assert graph_result.success and fast_result.success, (name, graph_result.error, fast_result.error)
+        assert comparable(graph_result) == comparable(fast_result), name
+
+        # Warm up, then measure
+        bench(graph_brain, 20)
+        bench(fast_brain, 20)
+        graph = bench(graph_brain, args.queries)
+        fast = bench(fast_brain, args.queries)
+        print(f"{name:<22} {graph * 1e6:8.0f}us {fast * 1e6:8.0f}us {(graph - fast) * 1e6:8.0f}us")
+
+
+if __name__ == "__main__":
+    main()
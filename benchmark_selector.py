@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for keyword agent selection
+
+Compares the original per-keyword substring loop (`keyword in query` for
+every keyword of every agent) with orchestrator.matcher.KeywordMatcher, and times the
+embedding router's top-k (ROUTING_MODE=embedding), on the configured catalog
+and on synthetic catalogs of growing size.
+
+Usage:
+    python benchmark_selector.py
+    python benchmark_selector.py --agents 500 --keywords 20
+"""
+import argparse
+import random
+import string
+import time
+from typing import Dict, List
+
+from config import config
+from orchestrator.embedding_router import EmbeddingRouter
+from orchestrator.matcher import KeywordMatcher
+
+CONFIGURED = {
+    "research": config.research_agent.keywords,
+    "analysis": config.analysis_agent.keywords,
+    "creative": config.creative_agent.keywords,
+}
+
+QUERIES = [
+    "What are the latest trends in renewable energy?",
+    "Compare the pros and cons of remote work vs office work",
+    "Write a creative tagline for an AI-powered healthcare startup",
+    "Research AI in education, analyze its benefits, and create a proposal",
+    "Whatever happened to the database migration we discussed yesterday?",
+    "Investigate blockchain technology, evaluate its risks, and design a use case",
+]
+
+
+def legacy_scores(catalog: Dict[str, List[str]], query: str) -> Dict[str, int]:
+    """The original AgentSelector._keyword_based_selection scoring loop"""
+    query_lower = query.lower()
+    scores = {}
+    for agent_key, keywords in catalog.items():
+        score = sum(1 for keyword in keywords if keyword in query_lower)
+        if score > 0:
+            scores[agent_key] = score
+    return scores
+
+
+def synthetic_catalog(agents: int, keywords: int, rng: random.Random) -> Dict[str, List[str]]:
+    """Agents with random pronounceable-ish keywords"""
+    def word() -> str:
+        return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+    return {f"agent{i}": [word() for _ in range(keywords)] for i in range(agents)}
+
+
+def synthetic_queries(catalog: Dict[str, List[str]], count: int, rng: random.Random) -> List[str]:
+    """Queries mixing filler text with a few catalog keywords"""
+    vocabulary = [k for keywords in catalog.values() for k in keywords]
+    queries = []
+    for _ in range(count):
+        words = rng.choice(QUERIES).split() + rng.sample(vocabulary, k=min(3, len(vocabulary)))
+        rng.shuffle(words)
+        queries.append(" ".join(words))
+    return queries
+
+
+def bench(name: str, fn, queries: List[str], repeat: int) -> float:
+    """Best mean time per query over repeat runs, printed in microseconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            fn(query)
+        best = min(best, (time.perf_counter() - start) / len(queries))
+    print(f"  {name:<22} {best * 1e6:10.1f} us/query")
+    return best
+
+
+def run(label: str, catalog: Dict[str, List[str]], queries: List[str], repeat: int):
+    keyword_count = sum(len(k) for k in catalog.values())
+    print(f"{label}: {len(catalog)} agents, {keyword_count} keywords")
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(catalog)
+    print(f"  {'matcher build':<22} {(time.perf_counter() - start) * 1e3:10.1f} ms (once)")
+
+    legacy = bench("substring loop", lambda q: legacy_scores(catalog, q), queries, repeat)
+    compiled = bench("KeywordMatcher", matcher.match, queries, repeat)
+    print(f"  {'speedup':<22} {legacy / compiled:10.1f}x")
+
+    start = time.perf_counter()
+    router = EmbeddingRouter({agent_key: [" ".join(keywords)] for agent_key, keywords in catalog.items()})
+    print(f"  {'embedding index build':<22} {(time.perf_counter() - start) * 1e3:10.1f} ms (once)")
+    bench("EmbeddingRouter top-3", lambda q: router.top_k(q, 3), queries, repeat)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyword agent selection")
+    parser.add_argument("--agents", type=int, default=300, help="Agents in the large synthetic catalog")
+    parser.add_argument("--keywords", type=int, default=10, help="Keywords per synthetic agent")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    rng = random.Random(0)
+
+    matcher = KeywordMatcher(CONFIGURED)
+    print("Substring false hits removed on the configured catalog:")
+    for query in QUERIES:
+        legacy = legacy_scores(CONFIGURED, query)
+        compiled = {agent_key: match.score for agent_key, match in matcher.match(query).items()}
+        if legacy != compiled:
+            print(f"  {query!r}\n    loop: {legacy}  matcher: {compiled}")
+    print()
+
+    run("Configured catalog", CONFIGURED, QUERIES * 20, args.repeat)
+    for agents in (30, args.agents):
+        catalog = synthetic_catalog(agents, args.keywords, rng)
+        run("Synthetic catalog", catalog, synthetic_queries(catalog, args.queries, rng), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for Dify SSE stream parsing
+
+Compares the original line-by-line parser (decode every line, json.loads every
+event) with agents.sse.SSEParser using the stdlib and orjson backends.
+
+Usage:
+    python benchmark_sse.py                   # synthetic recorded-style stream
+    python benchmark_sse.py --file dump.txt   # raw bytes captured from Dify
+                                               # (e.g. debug_dify.py output)
+"""
+import argparse
+import json
+import time
+
+from agents.sse import SSEParser, get_json_loads
+
+
+def build_recorded_stream(tokens: int = 2000) -> bytes:
+    """Build a stream shaped like a real Dify agent reply"""
+    base = {
+        "conversation_id": "5f0f5e1c-3a57-4b2e-9f0e-1b8a1f3f2c11",
+        "message_id": "8b2c8e6a-1c3d-4f6e-9a7b-2d4c6e8f0a1b",
+        "task_id": "0c1d2e3f-4a5b-4c6d-8e9f-0a1b2c3d4e5f",
+        "id": "8b2c8e6a-1c3d-4f6e-9a7b-2d4c6e8f0a1b",
+        "created_at": 1718000000,
+    }
+    parts = []
+    for i in range(tokens):
+        if i % 50 == 0:
+            parts.append(b"event: ping\n\n")
+        if i % 200 == 0:
+            thought = dict(base, event="agent_thought", position=i // 200, thought="Searching " * 40,
+                           observation="result " * 80, tool="web_search", tool_input="{}")
+            parts.append(b"data: " + json.dumps(thought).encode() + b"\n\n")
+        if i % 500 == 0:
+            file_event = dict(base, event="message_file", type="image", belongs_to="assistant",
+                              url="https://example.com/file.png")
+            parts.append(b"data: " + json.dumps(file_event).encode() + b"\n\n")
+        message = dict(base, event="agent_message", answer=f"token{i} é ")
+        parts.append(b"data: " + json.dumps(message).encode() + b"\n\n")
+    end = dict(base, event="message_end", metadata={"usage": {"total_tokens": tokens}})
+    parts.append(b"data: " + json.dumps(end).encode() + b"\n\n")
+    return b"".join(parts)
+
+
+def split_chunks(stream: bytes, size: int = 1024) -> list:
+    """Split a stream into network-sized chunks"""
+    return [stream[i:i + size] for i in range(0, len(stream), size)]
+
+
+def iter_lines(chunks: list):
+    """Line splitting as done by requests.Response.iter_lines()"""
+    pending = None
+    for chunk in chunks:
+        if pending is not None:
+            chunk = pending + chunk
+        lines = chunk.splitlines()
+        if lines and lines[-1] and chunk and lines[-1][-1] == chunk[-1]:
+            pending = lines.pop()
+        else:
+            pending = None
+        yield from lines
+    if pending is not None:
+        yield pending
+
+
+def legacy_parse(chunks: list) -> str:
+    """The original BaseDifyAgent.execute loop"""
+    answer = ""
+    for line in iter_lines(chunks):
+        if line:
+            line_text = line.decode('utf-8')
+            if line_text.startswith('data: '):
+                try:
+                    data = json.loads(line_text[6:])
+                    event = data.get('event')
+                    if event in ('message', 'agent_message'):
+                        answer += data.get('answer', '')
+                except json.JSONDecodeError:
+                    continue
+    return answer
+
+
+def sse_parse(chunks: list, loads) -> str:
+    """Incremental byte parser with event pre-filtering"""
+    parser = SSEParser(loads=loads)
+    parts = []
+    for chunk in chunks:
+        for data in parser.feed(chunk):
+            if data.get('event') in ('message', 'agent_message'):
+                parts.append(data.get('answer', ''))
+    for data in parser.close():
+        if data.get('event') in ('message', 'agent_message'):
+            parts.append(data.get('answer', ''))
+    return "".join(parts)
+
+
+def bench(name: str, fn, chunks: list, repeat: int) -> float:
+    """Run fn(chunks) repeat times and print the best time"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chunks)
+        best = min(best, time.perf_counter() - start)
+    print(f"{name:<28} {best * 1000:8.2f} ms")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Dify SSE parsing")
+    parser.add_argument("--file", help="Raw SSE bytes recorded from Dify")
+    parser.add_argument("--tokens", type=int, default=2000, help="Tokens in the synthetic stream")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="Simulated network chunk size")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            stream = f.read()
+    else:
+        stream = build_recorded_stream(args.tokens)
+
+    chunks = split_chunks(stream, args.chunk_size)
+    print(f"Stream: {len(stream)} bytes in {len(chunks)} chunks\n")
+
+    expected = legacy_parse(chunks)
+    assert sse_parse(chunks, get_json_loads(prefer_fast=False)) == expected
+
+    baseline = bench("legacy line parser", legacy_parse, chunks, args.repeat)
+    stdlib = bench("SSEParser (json)", lambda c: sse_parse(c, get_json_loads(prefer_fast=False)),
+                   chunks, args.repeat)
+    print(f"{'':<28} {baseline / stdlib:8.2f}x")
+
+    fast_loads = get_json_loads()
+    if fast_loads is not get_json_loads(prefer_fast=False):
+        fast = bench("SSEParser (orjson)", lambda c: sse_parse(c, fast_loads), chunks, args.repeat)
+        print(f"{'':<28} {baseline / fast:8.2f}x")
+    else:
+        print("orjson not installed - skipping fast backend")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 from dotenv import load_dotenv
 import logging
@@ -9,6 +9,15 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class TimeoutConfig:
+    """Per-agent timeouts in seconds"""
+    connect: float = 5.0
+    first_byte: float = 30.0
+    inter_chunk: float = 20.0
+    total: float = 120.0
+
+
 @dataclass
 class AgentConfig:
     """Configuration for a Dify agent"""
@@ -16,6 +25,73 @@ class AgentConfig:
     name: str
     description: str
     keywords: list[str]
+    timeouts: TimeoutConfig = field(default_factory=TimeoutConfig)
+    context_tokens: int = 150
+    example_queries: list[str] = field(default_factory=list)
+
+
+@dataclass
+class HTTPConfig:
+    """Connection pool settings shared by every agent in the process"""
+    pool_connections: int = 10
+    max_per_host: int = 32
+    max_connections: int = 200
+    max_keepalive_connections: int = 50
+    keepalive_expiry: float = 60.0
+
+
+@dataclass
+class ResponseCacheConfig:
+    """Settings for caching agent answers"""
+    enabled: bool = True
+    max_size: int = 512
+    ttl: float = 3600.0
+    sqlite_path: Optional[str] = None
+
+
+@dataclass
+class ResilienceConfig:
+    """Retry and circuit breaker settings for agent calls"""
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 8.0
+    breaker_failure_threshold: int = 5
+    breaker_recovery_timeout: float = 30.0
+
+
+@dataclass
+class RoutingCacheConfig:
+    """Settings for caching LLM routing decisions"""
+    enabled: bool = True
+    max_size: int = 2048
+    ttl: float = 7 * 86400.0
+    sqlite_path: Optional[str] = None
+
+
+@dataclass
+class RouterConfig:
+    """Local router trained on logged LLM routing decisions"""
+    model_path: Optional[str] = None
+    log_path: Optional[str] = None
+    confidence: float = 0.85
+
+
+@dataclass
+class SessionConfig:
+    """Where Dify conversation IDs of chat sessions are kept"""
+    max_size: int = 1024
+    ttl: float = 86400.0
+    sqlite_path: Optional[str] = None
+
+
+@dataclass
+class TracingConfig:
+    """Where per-query traces are exported (traces are always collected)"""
+    enabled: bool = True
+    jsonl_path: Optional[str] = None
+    otlp_path: Optional[str] = None
+    otlp_endpoint: Optional[str] = None
+    service_name: str = "agent-builder"
 
 
 @dataclass
@@ -29,6 +105,44 @@ class SystemConfig:
     creative_agent: AgentConfig
     log_level: str = "INFO"
     flask_port: int = 5000
+    http: HTTPConfig = field(default_factory=HTTPConfig)
+    response_cache: ResponseCacheConfig = field(default_factory=ResponseCacheConfig)
+    resilience: ResilienceConfig = field(default_factory=ResilienceConfig)
+    tracing: TracingConfig = field(default_factory=TracingConfig)
+    sessions: SessionConfig = field(default_factory=SessionConfig)
+    routing_cache: RoutingCacheConfig = field(default_factory=RoutingCacheConfig)
+    router: RouterConfig = field(default_factory=RouterConfig)
+    coalesce_requests: bool = True
+    pipeline_agents: bool = False
+    speculative_selection: bool = False
+    checkpoint_path: Optional[str] = None
+    query_budget: Optional[float] = None
+    min_agent_budget: float = 2.0
+    fast_path: bool = True
+    routing_mode: str = "keyword"
+    embedding_min_similarity: float = 0.1
+    selection_budget: Optional[float] = 0.4
+    selection_hedge: bool = False
+
+
+def _load_timeouts(prefix: str) -> TimeoutConfig:
+    """Read {prefix}_*_TIMEOUT overrides, falling back to the AGENT_*_TIMEOUT defaults"""
+    defaults = TimeoutConfig()
+    
+    def read(name: str, default: float) -> float:
+        return float(os.getenv(f"{prefix}_{name}_TIMEOUT") or os.getenv(f"AGENT_{name}_TIMEOUT") or default)
+    
+    return TimeoutConfig(
+        connect=read("CONNECT", defaults.connect),
+        first_byte=read("FIRST_BYTE", defaults.first_byte),
+        inter_chunk=read("INTER_CHUNK", defaults.inter_chunk),
+        total=read("TOTAL", defaults.total)
+    )
+
+
+def _load_context_tokens(prefix: str) -> int:
+    """Token budget for upstream results handed to an agent ({prefix}_CONTEXT_TOKENS or CONTEXT_TOKENS)"""
+    return int(os.getenv(f"{prefix}_CONTEXT_TOKENS") or os.getenv("CONTEXT_TOKENS") or AgentConfig.context_tokens)
 
 
 def load_config() -> SystemConfig:
@@ -46,21 +160,51 @@ def load_config() -> SystemConfig:
         agent_id=os.getenv("RESEARCH_AGENT_ID", ""),
         name="Research Agent",
         description="Handles research, data gathering, and information retrieval",
-        keywords=["research", "find", "search", "what", "information", "data", "facts", "learn", "discover", "investigate"]
+        keywords=["research", "find", "search", "what", "information", "data", "facts", "learn", "discover", "investigate"],
+        timeouts=_load_timeouts("RESEARCH_AGENT"),
+        context_tokens=_load_context_tokens("RESEARCH_AGENT"),
+        example_queries=[
+            "What are the latest trends in renewable energy?",
+            "Tell me about the history of the internet",
+            "Look up recent studies on sleep and memory",
+            "Who invented the printing press?",
+            "Explain how solar panels work",
+            "Give me an overview of the current state of AI regulation"
+        ]
     )
     
     analysis_agent = AgentConfig(
         agent_id=os.getenv("ANALYSIS_AGENT_ID", ""),
         name="Analysis Agent",
         description="Performs analysis, evaluation, and decision-making tasks",
-        keywords=["analyze", "compare", "evaluate", "assess", "pros", "cons", "advantages", "disadvantages", "impact", "implications"]
+        keywords=["analyze", "compare", "evaluate", "assess", "pros", "cons", "advantages", "disadvantages", "impact", "implications"],
+        timeouts=_load_timeouts("ANALYSIS_AGENT"),
+        context_tokens=_load_context_tokens("ANALYSIS_AGENT"),
+        example_queries=[
+            "Compare the pros and cons of remote work vs office work",
+            "Which option is better for a small business, and why?",
+            "Weigh the risks and benefits of nuclear power",
+            "Should we migrate our database to the cloud?",
+            "Summarize the trade-offs between two pricing strategies",
+            "Review this plan and point out its weaknesses"
+        ]
     )
     
     creative_agent = AgentConfig(
         agent_id=os.getenv("CREATIVE_AGENT_ID", ""),
         name="Creative Agent",
         description="Handles creative tasks, content generation, and brainstorming",
-        keywords=["create", "write", "design", "brainstorm", "generate", "compose", "draft", "imagine", "innovate", "develop"]
+        keywords=["create", "write", "design", "brainstorm", "generate", "compose", "draft", "imagine", "innovate", "develop"],
+        timeouts=_load_timeouts("CREATIVE_AGENT"),
+        context_tokens=_load_context_tokens("CREATIVE_AGENT"),
+        example_queries=[
+            "Write a creative tagline for an AI-powered healthcare startup",
+            "Come up with names for a coffee shop",
+            "Write a short poem or limerick about autumn",
+            "Draft a product announcement email",
+            "Tell a story about a robot learning to paint",
+            "Suggest a slogan for a marketing campaign"
+        ]
     )
     
     if not research_agent.agent_id:
@@ -70,6 +214,56 @@ def load_config() -> SystemConfig:
     if not creative_agent.agent_id:
         logger.warning("CREATIVE_AGENT_ID not set - Creative Agent will not be available")
     
+    http = HTTPConfig(
+        pool_connections=int(os.getenv("HTTP_POOL_CONNECTIONS", "10")),
+        max_per_host=int(os.getenv("HTTP_MAX_PER_HOST", "32")),
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "200")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "50")),
+        keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+    )
+    
+    response_cache = ResponseCacheConfig(
+        enabled=os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true",
+        max_size=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        sqlite_path=os.getenv("RESPONSE_CACHE_PATH") or None
+    )
+    
+    resilience = ResilienceConfig(
+        retry_max_attempts=int(os.getenv("RETRY_MAX_ATTEMPTS", "3")),
+        retry_base_delay=float(os.getenv("RETRY_BASE_DELAY", "0.5")),
+        retry_max_delay=float(os.getenv("RETRY_MAX_DELAY", "8")),
+        breaker_failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+        breaker_recovery_timeout=float(os.getenv("BREAKER_RECOVERY_TIMEOUT", "30"))
+    )
+    
+    tracing = TracingConfig(
+        enabled=os.getenv("TRACING_ENABLED", "true").lower() == "true",
+        jsonl_path=os.getenv("TRACE_JSONL_PATH") or None,
+        otlp_path=os.getenv("TRACE_OTLP_PATH") or None,
+        otlp_endpoint=os.getenv("TRACE_OTLP_ENDPOINT") or None,
+        service_name=os.getenv("TRACE_SERVICE_NAME", "agent-builder")
+    )
+    
+    routing_cache = RoutingCacheConfig(
+        enabled=os.getenv("ROUTING_CACHE_ENABLED", "true").lower() == "true",
+        max_size=int(os.getenv("ROUTING_CACHE_SIZE", "2048")),
+        ttl=float(os.getenv("ROUTING_CACHE_TTL", str(7 * 86400))),
+        sqlite_path=os.getenv("ROUTING_CACHE_PATH") or None
+    )
+    
+    router = RouterConfig(
+        model_path=os.getenv("ROUTER_MODEL_PATH") or None,
+        log_path=os.getenv("ROUTER_LOG_PATH") or None,
+        confidence=float(os.getenv("ROUTER_CONFIDENCE", "0.85"))
+    )
+    
+    sessions = SessionConfig(
+        max_size=int(os.getenv("SESSION_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("SESSION_TTL", "86400")),
+        sqlite_path=os.getenv("SESSION_STORE_PATH") or None
+    )
+    
     return SystemConfig(
         openai_api_key=openai_key,
         dify_api_key=dify_key,
@@ -78,7 +272,25 @@ def load_config() -> SystemConfig:
         analysis_agent=analysis_agent,
         creative_agent=creative_agent,
         log_level=os.getenv("LOG_LEVEL", "INFO"),
-        flask_port=int(os.getenv("FLASK_PORT", "5000"))
+        flask_port=int(os.getenv("FLASK_PORT", "5000")),
+        http=http,
+        response_cache=response_cache,
+        resilience=resilience,
+        tracing=tracing,
+        sessions=sessions,
+        routing_cache=routing_cache,
+        router=router,
+        coalesce_requests=os.getenv("COALESCE_REQUESTS", "true").lower() == "true",
+        pipeline_agents=os.getenv("PIPELINE_AGENTS", "false").lower() == "true",
+        speculative_selection=os.getenv("SPECULATIVE_SELECTION", "false").lower() == "true",
+        checkpoint_path=os.getenv("CHECKPOINT_PATH") or None,
+        query_budget=float(os.getenv("QUERY_BUDGET")) if os.getenv("QUERY_BUDGET") else None,
+        min_agent_budget=float(os.getenv("MIN_AGENT_BUDGET", "2")),
+        fast_path=os.getenv("FAST_PATH", "true").lower() == "true",
+        routing_mode=os.getenv("ROUTING_MODE", "keyword").lower(),
+        embedding_min_similarity=float(os.getenv("EMBEDDING_MIN_SIMILARITY", "0.1")),
+        selection_budget=float(os.getenv("SELECTION_BUDGET", "0.4")) if os.getenv("SELECTION_BUDGET", "0.4") else None,
+        selection_hedge=os.getenv("SELECTION_HEDGE", "false").lower() == "true"
     )
 
 
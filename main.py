@@ -3,7 +3,10 @@
 Main CLI application for Dify-LangGraph Agent System
 """
 import sys
+import uuid
+from typing import Dict, List, Optional
 from agent_system import DifyLangGraphSystem
+from orchestrator import AgentsSelected, AgentToken, AgentFinished, FinalResult
 
 
 def print_banner():
@@ -26,6 +29,7 @@ def print_help():
 Commands:
   - Type your question or request
   - 'agents' - Show available agents
+  - 'new' - Start a new conversation
   - 'help' - Show this help message
   - 'exit' or 'quit' - Exit the application
 
@@ -38,12 +42,89 @@ Examples:
     print(help_text)
 
 
+def stream_query(system: DifyLangGraphSystem, query: str, session_id: Optional[str] = None) -> bool:
+    """
+    Process a query, printing agent output as it arrives
+    
+    One agent is shown live at a time; output of agents running in parallel
+    is held back and printed when the current one finishes.
+    
+    Args:
+        system: The agent system
+        query: User query
+        session_id: Chat session whose Dify conversations the agents continue
+    
+    Returns:
+        Whether the query succeeded
+    """
+    print(f"\n{'='*60}")
+    print(f"Query: {query}")
+    print(f"{'='*60}\n")
+    
+    names = system.brain.selector.agents_info
+    active = None
+    held: Dict[str, List[str]] = {}
+    finished: List[str] = []
+    
+    def show(agent_key: str):
+        print(f"\n## {names[agent_key]['name']}\n", flush=True)
+        print("".join(held.pop(agent_key, [])), end="", flush=True)
+    
+    for event in system.process_query_stream(query, session_id=session_id):
+        if isinstance(event, AgentsSelected):
+            print(f"🧠 Selected: {', '.join(names[a]['name'] for a in event.agents)}")
+        
+        elif isinstance(event, AgentToken):
+            if active is None:
+                active = event.agent_key
+                show(active)
+            if event.agent_key == active:
+                print(event.text, end="", flush=True)
+            else:
+                held.setdefault(event.agent_key, []).append(event.text)
+        
+        elif isinstance(event, AgentFinished):
+            if not event.success:
+                print(f"\n⚠️  {event.agent_name} failed: {event.error}")
+            if event.agent_key != active:
+                finished.append(event.agent_key)
+                continue
+            print()
+            # Catch up on agents that ran alongside this one
+            active = None
+            while finished:
+                agent_key = finished.pop(0)
+                if agent_key in held:
+                    show(agent_key)
+                    print()
+            if held:
+                active = next(iter(held))
+                show(active)
+        
+        elif isinstance(event, FinalResult):
+            result = event.result
+            print(f"\n{'─'*60}\n")
+            if result.success:
+                print(f"🤖 Agents Used: {' → '.join(result.agents_used)}")
+                if result.dropped_agents:
+                    print(f"⏱️  Dropped (time budget): {', '.join(result.dropped_agents)}")
+                print(f"\n{'='*60}\n")
+            else:
+                print(f"❌ Error: {result.error}\n")
+            return result.success
+    
+    return False
+
+
 def interactive_mode(system: DifyLangGraphSystem):
     """Run interactive CLI mode"""
     print_banner()
     print("\nWelcome! Ask me anything and I'll route your query to the best agent(s).")
     print("Type 'help' for commands or 'exit' to quit.\n")
     
+    # Follow-up questions continue the same Dify conversations until 'new'
+    session_id = uuid.uuid4().hex
+    
     while True:
         try:
             # Get user input
@@ -65,11 +146,13 @@ def interactive_mode(system: DifyLangGraphSystem):
                 system.print_agent_info()
                 continue
             
-            # Process query
-            result = system.process_query(user_input, verbose=True)
+            elif user_input.lower() == 'new':
+                session_id = uuid.uuid4().hex
+                print("\n🆕 Started a new conversation\n")
+                continue
             
-            if not result['success']:
-                print(f"\n❌ Error: {result.get('error', 'Unknown error')}\n")
+            # Process query
+            stream_query(system, user_input, session_id)
         
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!\n")
@@ -81,9 +164,7 @@ def interactive_mode(system: DifyLangGraphSystem):
 
 def single_query_mode(system: DifyLangGraphSystem, query: str):
     """Process a single query and exit"""
-    result = system.process_query(query, verbose=True)
-    
-    if result['success']:
+    if stream_query(system, query):
         sys.exit(0)
     else:
         sys.exit(1)
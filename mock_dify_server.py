@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Dify chat API, for offline testing and benchmarking
+
+Implements POST /chat-messages (streaming and blocking) and GET /parameters
+with configurable time-to-first-byte, per-token delay, answer length, error
+injection and 429 rate limiting.
+
+Usage:
+    python mock_dify_server.py --port 8001 --token-delay 0.02 --ttfb 0.3
+    DIFY_BASE_URL=http://127.0.0.1:8001/v1 python main.py
+
+From Python:
+    with mock_dify_agent(token_delay=0.01) as (agent, server):
+        response = agent.execute("hello")
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set
+
+
+@dataclass
+class MockDifyConfig:
+    """Behaviour of the mock server"""
+    ttfb: float = 0.0
+    token_delay: float = 0.0
+    answer_tokens: int = 50
+    token_text: str = "token"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: Optional[float] = 1.0
+    # The first N chat requests get a 429 / 500 whatever the rates say
+    rate_limit_first: int = 0
+    error_first: int = 0
+    stream_error_rate: float = 0.0
+    agent_mode: bool = False
+    send_message_end: bool = True
+    ping_every: int = 0
+    api_key: Optional[str] = None
+    seed: Optional[int] = None
+
+
+@dataclass
+class MockDifyStats:
+    """What the mock server has seen"""
+    requests: int = 0
+    streams: int = 0
+    status_counts: Dict[int, int] = field(default_factory=dict)
+    # conversation_id of each chat request, None when it started a new conversation
+    conversation_ids: List[Optional[str]] = field(default_factory=list)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "MockDifyServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/parameters"):
+            if self._reject_unauthorized():
+                return
+            self._send_json(200, {
+                "opening_statement": "",
+                "suggested_questions": [],
+                "speech_to_text": {"enabled": False},
+                "retriever_resource": {"enabled": False},
+                "user_input_form": [],
+                "file_upload": {"image": {"enabled": False}},
+            })
+        else:
+            self._send_json(404, {"code": "not_found", "message": "Not found", "status": 404})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+
+        if not self.path.rstrip("/").endswith("/chat-messages"):
+            self._send_json(404, {"code": "not_found", "message": "Not found", "status": 404})
+            return
+        if self._reject_unauthorized():
+            return
+
+        try:
+            payload = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"code": "invalid_param", "message": "Invalid JSON", "status": 400})
+            return
+        if not payload.get("query"):
+            self._send_json(400, {"code": "invalid_param", "message": "query is required", "status": 400})
+            return
+
+        config = self.server.config
+        rng = self.server.rng
+
+        conversation_id = payload.get("conversation_id") or None
+        with self.server.lock:
+            self.server.stats.requests += 1
+            request_number = self.server.stats.requests
+            self.server.stats.conversation_ids.append(conversation_id)
+            unknown_conversation = conversation_id is not None and conversation_id not in self.server.conversations
+            roll_rate_limit = rng.random()
+            roll_error = rng.random()
+            roll_stream_error = rng.random()
+
+        if unknown_conversation:
+            # What Dify answers for a deleted or expired conversation
+            self._send_json(404, {"code": "not_found", "message": "Conversation Not Exists.", "status": 404})
+            return
+        if request_number <= config.rate_limit_first or roll_rate_limit < config.rate_limit_rate:
+            headers = {"Retry-After": f"{config.retry_after:g}"} if config.retry_after is not None else {}
+            self._send_json(429, {"code": "too_many_requests", "message": "Rate limit exceeded",
+                                  "status": 429}, headers)
+            return
+        if request_number <= config.rate_limit_first + config.error_first or roll_error < config.error_rate:
+            self._send_json(500, {"code": "internal_server_error", "message": "Injected failure", "status": 500})
+            return
+
+        if config.ttfb:
+            time.sleep(config.ttfb)
+
+        ids = {
+            "task_id": str(uuid.uuid4()),
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id or str(uuid.uuid4()),
+        }
+        with self.server.lock:
+            self.server.conversations.add(ids["conversation_id"])
+        ids["message_id"] = ids["id"]
+        tokens = [f"{config.token_text}{i} " for i in range(config.answer_tokens)]
+        fail_stream = roll_stream_error < config.stream_error_rate
+
+        if payload.get("response_mode") == "blocking":
+            time.sleep(config.token_delay * len(tokens))
+            if fail_stream:
+                self._send_json(500, {"code": "completion_request_error", "message": "Injected failure",
+                                      "status": 500})
+                return
+            self._send_json(200, dict(ids, event="message", mode="chat", answer="".join(tokens),
+                                      metadata={"usage": {"completion_tokens": len(tokens)}},
+                                      created_at=int(time.time())))
+            return
+
+        self._stream(ids, tokens, fail_stream)
+
+    def _stream(self, ids: Dict[str, str], tokens: list, fail_stream: bool):
+        config = self.server.config
+        with self.server.lock:
+            self.server.stats.streams += 1
+            self.server.stats.status_counts[200] = self.server.stats.status_counts.get(200, 0) + 1
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        event_name = "agent_message" if config.agent_mode else "message"
+        try:
+            if config.agent_mode:
+                self._write_event(dict(ids, event="agent_thought", position=1, thought="", observation="",
+                                       tool="", tool_input="", created_at=int(time.time())))
+            for i, token in enumerate(tokens):
+                if fail_stream and i == len(tokens) // 2:
+                    self._write_event(dict(ids, event="error", status=500, code="completion_request_error",
+                                           message="Injected stream failure"))
+                    self._write_chunk(b"")
+                    return
+                if config.ping_every and i % config.ping_every == 0:
+                    self._write_chunk(b"event: ping\n\n")
+                self._write_event(dict(ids, event=event_name, answer=token, created_at=int(time.time())))
+                if config.token_delay:
+                    time.sleep(config.token_delay)
+            if config.send_message_end:
+                self._write_event(dict(ids, event="message_end",
+                                       metadata={"usage": {"completion_tokens": len(tokens)}}))
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away (timeout or cancellation)
+            pass
+
+    def _write_event(self, data: dict):
+        self._write_chunk(b"data: " + json.dumps(data).encode("utf-8") + b"\n\n")
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _reject_unauthorized(self) -> bool:
+        expected = self.server.config.api_key
+        if expected and self.headers.get("Authorization") != f"Bearer {expected}":
+            self._send_json(401, {"code": "unauthorized", "message": "Invalid API key", "status": 401})
+            return True
+        return False
+
+    def _send_json(self, status: int, body: dict, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode("utf-8")
+        with self.server.lock:
+            counts = self.server.stats.status_counts
+            counts[status] = counts.get(status, 0) + 1
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class MockDifyServer(ThreadingHTTPServer):
+    """Threaded mock Dify API server"""
+
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, config: Optional[MockDifyConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.config = config or MockDifyConfig()
+        self.stats = MockDifyStats()
+        # Conversations this server has started; others are rejected like unknown ones in Dify
+        self.conversations: Set[str] = set()
+        self.lock = threading.Lock()
+        self.rng = random.Random(self.config.seed)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to use as DIFY_BASE_URL"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle_error(self, request, client_address):
+        # Clients dropping pooled keep-alive connections is routine here
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+    def start(self) -> "MockDifyServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-dify", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+@contextmanager
+def running_mock_dify(**overrides):
+    """
+    Run a mock Dify server on a free local port for the duration of the block
+
+    Args:
+        **overrides: MockDifyConfig fields
+
+    Yields:
+        The running MockDifyServer
+    """
+    server = MockDifyServer(MockDifyConfig(**overrides)).start()
+    try:
+        yield server
+    finally:
+        server.stop()
+
+
+@contextmanager
+def mock_dify_agent(use_cache: bool = False, coalesce: bool = False, **overrides):
+    """
+    BaseDifyAgent pointed at a fresh mock server
+
+    The response cache and request coalescing are off by default so every
+    call reaches the server.
+
+    Args:
+        use_cache: Keep the process-wide response cache on the agent
+        coalesce: Keep single-flight coalescing on the agent
+        **overrides: MockDifyConfig fields
+
+    Yields:
+        (agent, server)
+    """
+    from agents import BaseDifyAgent
+
+    with running_mock_dify(**overrides) as server:
+        agent = BaseDifyAgent(
+            agent_id="mock-agent",
+            agent_name="Mock Agent",
+            dify_api_key=server.config.api_key or "mock-key",
+            dify_base_url=server.url
+        )
+        if not use_cache:
+            agent.cache = None
+        agent.coalesce = coalesce
+        yield agent, server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local mock Dify API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--ttfb", type=float, default=0.0, help="Seconds before the first byte")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between tokens")
+    parser.add_argument("--tokens", type=int, default=50, help="Tokens per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds on 429")
+    parser.add_argument("--stream-error-rate", type=float, default=0.0, help="Fraction of streams failing midway")
+    parser.add_argument("--agent-mode", action="store_true", help="Emit agent_message/agent_thought events")
+    parser.add_argument("--api-key", help="Require this bearer token")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    config = MockDifyConfig(
+        ttfb=args.ttfb,
+        token_delay=args.token_delay,
+        answer_tokens=args.tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        stream_error_rate=args.stream_error_rate,
+        agent_mode=args.agent_mode,
+        api_key=args.api_key,
+        seed=args.seed
+    )
+    server = MockDifyServer(config, host=args.host, port=args.port)
+    print(f"Mock Dify API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
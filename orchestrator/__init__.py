@@ -1,4 +1,8 @@
 from .brain import LangGraphBrain, OrchestratorResult
+from .events import AgentsSelected, AgentStarted, AgentToken, AgentFinished, FinalResult, OrchestratorEvent
 from .selector import AgentSelector
 
-__all__ = ['LangGraphBrain', 'OrchestratorResult', 'AgentSelector']
+__all__ = [
+    'LangGraphBrain', 'OrchestratorResult', 'AgentSelector',
+    'AgentsSelected', 'AgentStarted', 'AgentToken', 'AgentFinished', 'FinalResult', 'OrchestratorEvent'
+]
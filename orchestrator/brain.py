@@ -1,25 +1,76 @@
+import contextvars
 import logging
-from typing import Dict, Any, List, Optional
-from dataclasses import dataclass
+import operator
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, Any, Iterator, List, Optional, Union
+from dataclasses import dataclass, field
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Overwrite, Send
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
-from typing_extensions import TypedDict
+from typing_extensions import Annotated, TypedDict
 
 from agents import ResearchAgent, AnalysisAgent, CreativeAgent, AgentResponse
+from agents.timeouts import deadline_after, remaining
+from config import config
+from tracing import Span, get_tracer, use_span
+from .compaction import ContextCompactor
+from .events import AgentsSelected, AgentStarted, AgentToken, AgentFinished, FinalResult, OrchestratorEvent
+from .pipeline import run_pipeline
 from .selector import AgentSelector
+from .sessions import get_session_store
+from .speculation import Speculation, SpeculationStats
 
 logger = logging.getLogger(__name__)
 
+# Per-agent concurrency slots for the batch currently running in this context
+_agent_slots: ContextVar[Optional[Dict[str, threading.BoundedSemaphore]]] = ContextVar("agent_slots", default=None)
+
+# Event sink for nodes run by the fast path, where there is no LangGraph stream writer
+_direct_writer: ContextVar[Optional[Callable[[Any], None]]] = ContextVar("direct_writer", default=None)
+
 
 class AgentState(TypedDict):
     """State for the agent orchestration graph"""
+    run_id: str
+    session_id: Optional[str]
     query: str
     selected_agents: List[str]
-    current_agent_index: int
-    agent_responses: List[Dict[str, Any]]
+    plan: Dict[str, List[str]]
+    agent_responses: Annotated[List[Dict[str, Any]], operator.add]
+    skipped_agents: Annotated[List[str], operator.add]
+    dropped_agents: List[str]
     final_response: str
     conversation_history: List[BaseMessage]
     context: Dict[str, Any]
+    deadline: Optional[float]
+
+
+class AgentTask(TypedDict):
+    """Input of one execute_agent branch"""
+    run_id: str
+    session_id: Optional[str]
+    agent_key: str
+    query: str
+    context: Dict[str, Any]
+    deadline: Optional[float]
+
+
+class PipelineTask(TypedDict):
+    """Input of the execute_pipeline node"""
+    run_id: str
+    session_id: Optional[str]
+    plan: Dict[str, List[str]]
+    # Content of agents outside plan that plan agents depend on and that already succeeded
+    upstream: Dict[str, str]
+    query: str
+    context: Dict[str, Any]
+    deadline: Optional[float]
 
 
 @dataclass
@@ -30,6 +81,9 @@ class OrchestratorResult:
     agent_details: List[Dict[str, Any]]
     success: bool
     error: Optional[str] = None
+    trace_id: Optional[str] = None
+    run_id: Optional[str] = None
+    dropped_agents: List[str] = field(default_factory=list)
 
 
 class LangGraphBrain:
@@ -38,8 +92,56 @@ class LangGraphBrain:
     Intelligently routes queries to appropriate Dify agents
     """
     
-    def __init__(self):
+    TRUNCATED_NOTE = "\n\n_(Response truncated: time limit reached)_"
+    DROPPED_NOTE = "\n\n_(Time budget reached: dropped {agents})_"
+    
+    # Seconds of the query budget kept back for aggregation
+    AGGREGATION_RESERVE = 0.2
+    
+    # AgentState keys merged with operator.add rather than replaced
+    REDUCED_KEYS = ("agent_responses", "skipped_agents")
+    
+    # How much of each upstream answer a pipelined agent waits for before starting;
+    # roughly twice the default context budget, so compaction has sentences to choose from
+    PREVIOUS_RESULT_CHARS = 1200
+    
+    def __init__(
+        self,
+        pipelined: Optional[bool] = None,
+        speculative: Optional[bool] = None,
+        checkpoint_path: Optional[str] = None,
+        query_budget: Optional[float] = None,
+        fast_path: Optional[bool] = None
+    ):
+        """
+        Args:
+            pipelined: Start dependent agents once their upstream agents have
+                streamed PREVIOUS_RESULT_CHARS characters rather than when they
+                finish (defaults to config.pipeline_agents)
+            speculative: Start the most likely first agent while LLM selection
+                is in flight (defaults to config.speculative_selection)
+            checkpoint_path: SQLite file for run checkpoints, which makes runs
+                resumable by run ID (defaults to config.checkpoint_path)
+            query_budget: Time budget in seconds for queries that do not set
+                their own (defaults to config.query_budget; None is unbounded)
+            fast_path: Let process_query call the nodes directly instead of
+                going through the compiled graph (defaults to config.fast_path;
+                not used when checkpointing, which needs the graph)
+        """
         self.selector = AgentSelector()
+        self.tracer = get_tracer()
+        self.pipelined = config.pipeline_agents if pipelined is None else pipelined
+        self.speculative = config.speculative_selection if speculative is None else speculative
+        self.query_budget = config.query_budget if query_budget is None else query_budget
+        self.min_agent_budget = config.min_agent_budget
+        self.fast_path = config.fast_path if fast_path is None else fast_path
+        self.speculation_stats = SpeculationStats()
+        self.compactor = ContextCompactor()
+        self.sessions = get_session_store()
+        
+        # Confirmed speculative runs waiting to be adopted, by run_id
+        self._speculations: Dict[str, Speculation] = {}
+        self._speculation_lock = threading.Lock()
         
         # Initialize agents
         self.agents = {
@@ -48,154 +150,455 @@ class LangGraphBrain:
             "creative": CreativeAgent()
         }
         
+        # Token budget for the upstream results each agent receives
+        self.context_budgets = {
+            "research": config.research_agent.context_tokens,
+            "analysis": config.analysis_agent.context_tokens,
+            "creative": config.creative_agent.context_tokens
+        }
+        
         # Build the graph
+        self.checkpointer = self._open_checkpointer(checkpoint_path or config.checkpoint_path)
         self.graph = self._build_graph()
         
         logger.info("LangGraph Brain initialized with 3 agents")
     
     def _build_graph(self) -> StateGraph:
-        """Build the LangGraph orchestration graph"""
+        """
+        Build the LangGraph orchestration graph
+        
+        Ready agents (all dependencies finished) are dispatched together as
+        parallel execute_agent branches; the join node waits for the branch
+        set to finish and dispatches whatever became ready next.
+        """
         
         workflow = StateGraph(AgentState)
         
         # Add nodes
         workflow.add_node("select_agents", self._select_agents_node)
         workflow.add_node("execute_agent", self._execute_agent_node)
+        workflow.add_node("execute_pipeline", self._execute_pipeline_node)
+        workflow.add_node("join", self._join_node)
         workflow.add_node("aggregate_results", self._aggregate_results_node)
         
         # Define edges
         workflow.add_edge(START, "select_agents")
-        workflow.add_edge("select_agents", "execute_agent")
         workflow.add_conditional_edges(
-            "execute_agent",
-            self._should_continue,
-            {
-                "continue": "execute_agent",
-                "aggregate": "aggregate_results"
-            }
+            "select_agents",
+            self._dispatch_ready_agents,
+            ["execute_agent", "execute_pipeline", "aggregate_results"]
+        )
+        workflow.add_edge("execute_agent", "join")
+        workflow.add_edge("execute_pipeline", "join")
+        workflow.add_conditional_edges(
+            "join",
+            self._dispatch_ready_agents,
+            ["execute_agent", "execute_pipeline", "aggregate_results"]
         )
         workflow.add_edge("aggregate_results", END)
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
+    
+    @staticmethod
+    def _stream_writer() -> Callable[[Any], None]:
+        """Where nodes publish progress events: the graph's stream, or the fast path's sink"""
+        return _direct_writer.get() or get_stream_writer()
     
-    def _select_agents_node(self, state: AgentState) -> AgentState:
-        """Node: Select which agents to use"""
+    @staticmethod
+    def _open_checkpointer(path: Optional[str]):
+        """SQLite checkpoint store, or None when checkpointing is off"""
+        if not path:
+            return None
+        
+        from langgraph.checkpoint.sqlite import SqliteSaver
+        
+        logger.info(f"Checkpointing runs to {path}")
+        return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+    
+    def _run_config(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """Graph config that checkpoints under the run ID"""
+        if self.checkpointer is None:
+            return None
+        return {"configurable": {"thread_id": run_id}}
+    
+    def _select_agents_node(self, state: AgentState) -> Dict[str, Any]:
+        """Node: Select which agents to use and how they depend on each other"""
         query = state["query"]
         
         logger.info("Selecting agents for query...")
-        selected_agents = self.selector.select_agents(query)
+        with self.tracer.span("select_agents") as span:
+            speculation = self._start_speculation(state) if self.speculative else None
+            plan = self.selector.select_plan(query)
+            
+            logger.info(f"Selected agents: {plan}")
+            if span is not None:
+                span.set(agents=list(plan), parallel=len(plan) > 1 and not any(plan.values()))
+            if speculation is not None:
+                self._settle_speculation(state["run_id"], speculation, plan)
+        self._stream_writer()(AgentsSelected(agents=list(plan), plan=plan))
+        
+        return {"selected_agents": list(plan), "plan": plan}
+    
+    def _start_speculation(self, state: AgentState) -> Optional[Speculation]:
+        """Start the top keyword candidate if selection is about to wait on the LLM"""
+        agent_key = self.selector.speculation_candidate(state["query"])
+        agent = self.agents.get(agent_key) if agent_key else None
+        if agent is None or not agent.is_available():
+            return None
+        # A cancelled guess would leave a stray turn in the session's Dify conversation
+        if self.sessions.get(state.get("session_id"), agent.agent_id):
+            return None
+        
+        return Speculation(
+            agent_key,
+            agent,
+            state["query"],
+            dict(state.get("context") or {}),
+            self._agent_deadline(state.get("deadline")),
+            slot=(_agent_slots.get() or {}).get(agent_key),
+            span=self.tracer.start_span(f"agent.{agent_key}", agent_key=agent_key, speculative=True),
+            # A session's first turn must open its own conversation, not reuse a cached answer
+            bypass_cache=bool(state.get("session_id"))
+        ).start()
+    
+    def _settle_speculation(self, run_id: str, speculation: Speculation, plan: Dict[str, List[str]]):
+        """Keep the speculative run if the plan starts with that agent and no upstream input, else cancel it"""
+        if plan.get(speculation.agent_key) == []:
+            self.speculation_stats.hits += 1
+            logger.info(f"Speculation hit: {speculation.agent_key}")
+            with self._speculation_lock:
+                self._speculations[run_id] = speculation
+        else:
+            self.speculation_stats.misses += 1
+            logger.info(f"Speculation miss: {speculation.agent_key} not a starting agent in {plan}")
+            speculation.cancel(self.speculation_stats)
+    
+    def _take_speculation(self, run_id: str, agent_key: str) -> Optional[Speculation]:
+        """Claim this run's confirmed speculative stream for agent_key"""
+        with self._speculation_lock:
+            speculation = self._speculations.get(run_id)
+            if speculation is None or speculation.agent_key != agent_key:
+                return None
+            return self._speculations.pop(run_id)
+    
+    def _discard_speculation(self, run_id: str):
+        """Cancel a confirmed speculation that was never adopted (the run failed early)"""
+        with self._speculation_lock:
+            speculation = self._speculations.pop(run_id, None)
+        if speculation is not None:
+            speculation.cancel()
+    
+    def _dispatch_ready_agents(self, state: AgentState) -> Union[str, List[Send]]:
+        """Start every agent whose dependencies have finished, or aggregate when none are left"""
+        plan = state["plan"]
+        responses = {r["agent_key"]: r for r in state["agent_responses"]}
+        finished = set(responses) | set(state["skipped_agents"])
+        
+        ready = [
+            agent_key for agent_key, dependencies in plan.items()
+            if agent_key not in finished and all(d in finished for d in dependencies)
+        ]
+        
+        if not ready:
+            return "aggregate_results"
+        
+        # Out of budget: answer with what has finished rather than start agents that cannot
+        if finished and not self._has_budget(state.get("deadline")):
+            logger.warning(f"Time budget nearly exhausted, dropping {[k for k in plan if k not in finished]}")
+            return "aggregate_results"
+        
+        # Hand the whole remaining plan to one pipelined run when it has dependencies
+        remaining = {k: v for k, v in plan.items() if k not in finished}
+        if self.pipelined and any(remaining.values()):
+            # Dependencies that finished earlier (e.g. before a resume) are not re-run, only handed over
+            upstream = {
+                d: responses[d]["content"]
+                for dependencies in remaining.values() for d in dependencies
+                if d in responses and responses[d]["success"]
+            }
+            return [Send("execute_pipeline", {
+                "run_id": state["run_id"],
+                "session_id": state.get("session_id"),
+                "plan": remaining,
+                "upstream": upstream,
+                "query": state["query"],
+                "context": dict(state.get("context") or {}),
+                "deadline": state.get("deadline")
+            })]
+        
+        if len(ready) > 1:
+            logger.info(f"Running in parallel: {ready}")
         
-        logger.info(f"Selected agents: {selected_agents}")
+        tasks = []
+        for agent_key in ready:
+            context = dict(state.get("context") or {})
+            
+            # Hand over the output of the agents this one depends on
+            previous = [responses[d] for d in plan[agent_key] if d in responses and responses[d]["success"]]
+            if previous:
+                context["previous_results"] = self._previous_results(
+                    agent_key, {resp["agent_key"]: resp["content"] for resp in previous}
+                )
+            
+            tasks.append(Send("execute_agent", {
+                "run_id": state["run_id"],
+                "session_id": state.get("session_id"),
+                "agent_key": agent_key,
+                "query": state["query"],
+                "context": context,
+                "deadline": state.get("deadline")
+            }))
         
-        state["selected_agents"] = selected_agents
-        state["current_agent_index"] = 0
-        state["agent_responses"] = []
+        return tasks
+    
+    def _has_budget(self, deadline: Optional[float]) -> bool:
+        """Whether enough of the query budget is left to start another agent"""
+        left = remaining(deadline)
+        return left is None or left >= self.min_agent_budget
+    
+    def _agent_deadline(self, deadline: Optional[float]) -> Optional[float]:
+        """Agent call deadline: the query deadline less the time reserved for aggregation"""
+        return deadline - self.AGGREGATION_RESERVE if deadline is not None else None
+    
+    def _previous_results(self, agent_key: str, upstream: Dict[str, str]) -> List[Dict[str, str]]:
+        """
+        previous_results context entries for agent_key, built from upstream agent key -> content
         
-        return state
+        Upstream answers are compacted to their key sentences so that together
+        they fit the receiving agent's context token budget.
+        """
+        with self.tracer.span("compact_context", agent_key=agent_key) as span:
+            compacted = self.compactor.compact_all(upstream, self.context_budgets[agent_key])
+            if span is not None:
+                span.set(input_chars=sum(map(len, upstream.values())),
+                         output_chars=sum(map(len, compacted.values())))
+        return [
+            {
+                "agent": self.agents[upstream_key].agent_name,
+                "response": content
+            }
+            for upstream_key, content in compacted.items()
+        ]
+    
+    def _execute_agent_node(self, task: AgentTask) -> Dict[str, Any]:
+        """Node: Execute one agent"""
+        record = self._run_agent(task["run_id"], task["agent_key"], task["query"], task["context"],
+                                 task["deadline"], self._stream_writer(), session_id=task.get("session_id"))
+        if record is None:
+            return {"skipped_agents": [task["agent_key"]]}
+        return {"agent_responses": [record]}
     
-    def _execute_agent_node(self, state: AgentState) -> AgentState:
-        """Node: Execute the current agent"""
-        selected_agents = state["selected_agents"]
-        current_index = state["current_agent_index"]
-        agent_responses = state["agent_responses"]
+    def _execute_pipeline_node(self, task: PipelineTask) -> Dict[str, Any]:
+        """Node: Execute a dependency plan with downstream agents starting on upstream prefixes"""
+        emit = self._stream_writer()
+        plan = task["plan"]
+        dropped = []
         
-        if current_index >= len(selected_agents):
-            return state
+        def run_agent(agent_key: str, upstream: Dict[str, str], on_token: Callable[[str], None]) -> Optional[Dict[str, Any]]:
+            # Downstream agents wait on their upstream prefix; the budget may be gone by then
+            if plan[agent_key] and not self._has_budget(task["deadline"]):
+                logger.warning(f"Time budget nearly exhausted, dropping {agent_key}")
+                dropped.append(agent_key)
+                return None
+            context = dict(task["context"])
+            if upstream:
+                context["previous_results"] = self._previous_results(agent_key, upstream)
+            return self._run_agent(task["run_id"], agent_key, task["query"], context, task["deadline"],
+                                   emit, on_token, session_id=task.get("session_id"))
+        
+        records = run_pipeline(task["plan"], run_agent, self.PREVIOUS_RESULT_CHARS, task.get("upstream"))
         
-        agent_key = selected_agents[current_index]
+        return {
+            "agent_responses": [r for r in records if r is not None],
+            "skipped_agents": [k for k, r in zip(task["plan"], records) if r is None and k not in dropped]
+        }
+    
+    def _run_agent(
+        self,
+        run_id: str,
+        agent_key: str,
+        query: str,
+        context: Dict[str, Any],
+        deadline: Optional[float],
+        emit: Callable[[Any], None],
+        on_token: Optional[Callable[[str], None]] = None,
+        session_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Execute one agent, publishing progress events; None if it had to be skipped
+        
+        Within a session the agent continues its Dify conversation from earlier turns.
+        """
         agent = self.agents.get(agent_key)
         
         if not agent or not agent.is_available():
             logger.warning(f"Agent {agent_key} not available, skipping")
-            state["current_agent_index"] += 1
-            return state
+            emit(AgentFinished(
+                agent_key=agent_key,
+                agent_name=agent.agent_name if agent else agent_key,
+                success=False,
+                error="Agent not available"
+            ))
+            return None
         
-        # Prepare query with context from previous agents
-        query = state["query"]
-        context = state.get("context", {})
-        
-        # Add previous agent responses as context
-        if agent_responses:
-            context["previous_results"] = [
-                {
-                    "agent": resp["agent_name"],
-                    "response": resp["content"][:500]  # Limit context size
-                }
-                for resp in agent_responses
-            ]
-        
-        # Execute agent
-        logger.info(f"Executing {agent.agent_name}...")
-        response = agent.execute(query, context=context)
-        
-        # Store response
-        agent_responses.append({
+        # Adopt the speculative run already streaming this agent, if any
+        speculation = self._take_speculation(run_id, agent_key)
+        span = speculation.span if speculation is not None else None
+        span = span or self.tracer.start_span(f"agent.{agent_key}", agent_key=agent_key)
+        # Without an active trace, time the call on a detached span
+        span = span or Span(name=f"agent.{agent_key}", trace_id="", span_id="")
+        
+        def forward(text: str):
+            if "tokens" not in span.attributes:
+                span.set(first_token_ms=span.elapsed_ms(), tokens=0)
+            span.attributes["tokens"] += 1
+            emit(AgentToken(agent_key=agent_key, text=text))
+            if on_token is not None:
+                on_token(text)
+        
+        conversation_id = self.sessions.get(session_id, agent.agent_id)
+        span.set(conversation_reused=conversation_id is not None)
+        
+        emit(AgentStarted(agent_key=agent_key, agent_name=agent.agent_name))
+        if speculation is not None:
+            logger.info(f"Adopting speculative {agent.agent_name}...")
+            response = agent.collect_response(speculation.events(), on_token=forward)
+        else:
+            logger.info(f"Executing {agent.agent_name}...")
+            slots = _agent_slots.get()
+            # A session's turns are its own: no cached answers, no stream shared with another user
+            in_session = bool(session_id)
+            with use_span(span), (slots or {}).get(agent_key) or nullcontext():
+                response = agent.execute(query, conversation_id=conversation_id, context=context,
+                                         bypass_cache=in_session, deadline=self._agent_deadline(deadline),
+                                         on_token=forward, coalesce=False if in_session else None)
+        
+        metadata = response.metadata or {}
+        if response.success and not metadata.get("cached"):
+            self.sessions.set(session_id, agent.agent_id, metadata.get("conversation_id"))
+        elif conversation_id is not None and metadata.get("conversation_rejected"):
+            # Expired or deleted on the Dify side; start afresh next turn. Other failures keep the history
+            logger.warning(f"Dify no longer knows {agent.agent_name} conversation {conversation_id}, forgetting it")
+            self.sessions.forget(session_id, agent.agent_id)
+
+        span.set(
+            total_ms=span.elapsed_ms(),
+            success=response.success,
+            cached=bool(metadata.get("cached")),
+            truncated=bool(metadata.get("truncated"))
+        )
+        self.tracer.end_span(span, response.error)
+        
+        emit(AgentFinished(
+            agent_key=agent_key,
+            agent_name=response.agent_name,
+            success=response.success,
+            error=response.error,
+            truncated=bool((response.metadata or {}).get("truncated"))
+        ))
+        
+        return {
+            "agent_key": agent_key,
             "agent_name": response.agent_name,
             "content": response.content,
             "success": response.success,
             "metadata": response.metadata,
-            "error": response.error
-        })
-        
-        state["agent_responses"] = agent_responses
-        state["current_agent_index"] = current_index + 1
-        
-        return state
+            "error": response.error,
+            # Cut off by the query budget before producing anything; other failures are just failures
+            "dropped": not response.success and metadata.get("timed_out", False) and not self._has_budget(deadline),
+            "timings": {
+                key: span.attributes.get(key)
+                for key in ("first_byte_ms", "first_token_ms", "total_ms", "bytes", "tokens")
+            }
+        }
     
-    def _should_continue(self, state: AgentState) -> str:
-        """Decide whether to continue executing agents or aggregate results"""
-        current_index = state["current_agent_index"]
-        selected_agents = state["selected_agents"]
-        
-        if current_index >= len(selected_agents):
-            return "aggregate"
-        return "continue"
+    def _join_node(self, state: AgentState) -> Dict[str, Any]:
+        """Node: Synchronization point after a set of parallel agents"""
+        return {}
     
-    def _aggregate_results_node(self, state: AgentState) -> AgentState:
+    def _aggregate_results_node(self, state: AgentState) -> Dict[str, Any]:
         """Node: Aggregate results from all agents"""
-        agent_responses = state["agent_responses"]
-        
+        with self.tracer.span("aggregate_results") as span:
+            update = self._aggregate(state)
+            if span is not None:
+                span.set(response_chars=len(update["final_response"]))
+            return update
+    
+    def _aggregate(self, state: AgentState) -> Dict[str, Any]:
+        """Combine the agent responses into the final answer, noting agents dropped for time"""
+        final_response = self._combine(self._ordered_responses(state))
+        dropped = self._dropped_agents(state)
+        if dropped:
+            names = ", ".join(self._agent_name(agent_key) for agent_key in dropped)
+            final_response += self.DROPPED_NOTE.format(agents=names)
+        return {"final_response": final_response, "dropped_agents": dropped}
+    
+    @staticmethod
+    def _dropped_agents(state: AgentState) -> List[str]:
+        """Planned agents that never ran, or failed, because the time budget ran out"""
+        responses = {r["agent_key"]: r for r in state["agent_responses"]}
+        return [
+            agent_key for agent_key in state["plan"]
+            if agent_key not in state["skipped_agents"]
+            and (agent_key not in responses or responses[agent_key].get("dropped"))
+        ]
+    
+    def _agent_name(self, agent_key: str) -> str:
+        agent = self.agents.get(agent_key)
+        return agent.agent_name if agent else agent_key
+    
+    def _combine(self, agent_responses: List[Dict[str, Any]]) -> str:
+        """Join the agent responses into one answer"""
         if not agent_responses:
-            state["final_response"] = "No agents were able to process the query."
-            return state
+            return "No agents were able to process the query."
         
         # If single agent, return its response directly
         if len(agent_responses) == 1:
             response = agent_responses[0]
             if response["success"]:
-                state["final_response"] = response["content"]
+                return self._content_with_notes(response)
             else:
-                state["final_response"] = f"Error: {response.get('error', 'Unknown error')}"
-            return state
+                return f"Error: {response.get('error', 'Unknown error')}"
         
         # Multiple agents - combine their responses
         successful_responses = [r for r in agent_responses if r["success"]]
         
         if not successful_responses:
             errors = [r.get("error", "Unknown") for r in agent_responses]
-            state["final_response"] = f"All agents failed. Errors: {', '.join(errors)}"
-            return state
+            return f"All agents failed. Errors: {', '.join(errors)}"
         
         # Create a structured response combining all agent outputs
         combined_response = []
         
         for i, response in enumerate(successful_responses, 1):
             agent_name = response["agent_name"]
-            content = response["content"]
+            content = self._content_with_notes(response)
             
             if len(successful_responses) > 1:
                 combined_response.append(f"## {agent_name} Response:\n{content}\n")
             else:
                 combined_response.append(content)
         
-        state["final_response"] = "\n".join(combined_response)
-        
-        return state
+        return "\n".join(combined_response)
+    
+    def _ordered_responses(self, state: AgentState) -> List[Dict[str, Any]]:
+        """Agent responses in plan order, however the parallel branches finished"""
+        order = {agent_key: i for i, agent_key in enumerate(state["selected_agents"])}
+        return sorted(state["agent_responses"], key=lambda r: order.get(r["agent_key"], len(order)))
+    
+    def _content_with_notes(self, response: Dict[str, Any]) -> str:
+        """Agent content, annotated if it was cut short"""
+        content = response["content"]
+        if (response.get("metadata") or {}).get("truncated"):
+            content += self.TRUNCATED_NOTE
+        return content
     
     def process_query(
         self, 
         query: str, 
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None
     ) -> OrchestratorResult:
         """
         Process a user query through the agent system
@@ -203,6 +606,11 @@ class LangGraphBrain:
         Args:
             query: User query
             context: Optional additional context
+            timeout: Optional overall time budget in seconds, shared by all agents
+                (defaults to query_budget); agents that cannot start in time are
+                dropped and the answer is built from those that finished
+            session_id: Optional chat session; each agent continues the Dify
+                conversation it had in earlier turns of the session
             
         Returns:
             OrchestratorResult with response and agent information
@@ -210,46 +618,320 @@ class LangGraphBrain:
         try:
             logger.info(f"Processing query: {query[:100]}...")
             
-            # Initialize state
-            initial_state: AgentState = {
-                "query": query,
-                "selected_agents": [],
-                "current_agent_index": 0,
-                "agent_responses": [],
-                "final_response": "",
-                "conversation_history": [HumanMessage(content=query)],
-                "context": context or {}
-            }
+            with self.tracer.trace("process_query", query_chars=len(query)) as root:
+                # Run the graph
+                initial_state = self._initial_state(query, context, timeout, session_id)
+                run_id = initial_state["run_id"]
+                try:
+                    if self.fast_path and self.checkpointer is None:
+                        final_state = self._run_direct(initial_state)
+                    else:
+                        final_state = self.graph.invoke(initial_state, self._run_config(run_id))
+                except Exception as e:
+                    logger.error(f"Error in orchestrator: {str(e)}", exc_info=True)
+                    root.error = str(e)
+                    return self._error_result(e, root.trace_id, self._resumable(run_id))
+                finally:
+                    self._discard_speculation(run_id)
+                
+                return self._traced_result(root, self._to_result(final_state), self._resumable(run_id))
             
-            # Run the graph
-            final_state = self.graph.invoke(initial_state)
+        except Exception as e:
+            logger.error(f"Error in orchestrator: {str(e)}", exc_info=True)
+            return self._error_result(e)
+    
+    def process_query_stream(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        session_id: Optional[str] = None
+    ) -> Iterator[OrchestratorEvent]:
+        """
+        Process a user query, yielding progress and answer tokens as they happen
+        
+        Args:
+            query: User query
+            context: Optional additional context
+            timeout: Optional overall time budget in seconds, shared by all agents
+                (defaults to query_budget)
+            session_id: Optional chat session whose Dify conversations to continue
             
-            # Extract results
-            agent_responses = final_state["agent_responses"]
-            agents_used = [r["agent_name"] for r in agent_responses if r["success"]]
+        Yields:
+            AgentsSelected, then AgentStarted / AgentToken / AgentFinished per
+            agent (interleaved when agents run in parallel), and finally one
+            FinalResult
+        """
+        logger.info(f"Streaming query: {query[:100]}...")
+        
+        with self.tracer.trace("process_query", query_chars=len(query), streaming=True) as root:
+            run_id = None
+            try:
+                final_state = None
+                initial_state = self._initial_state(query, context, timeout, session_id)
+                run_id = initial_state["run_id"]
+                try:
+                    for mode, chunk in self.graph.stream(
+                        initial_state,
+                        self._run_config(run_id),
+                        stream_mode=["custom", "values"]
+                    ):
+                        if mode == "custom":
+                            yield chunk
+                        else:
+                            final_state = chunk
+                finally:
+                    self._discard_speculation(run_id)
+                
+                result = self._traced_result(root, self._to_result(final_state), self._resumable(run_id))
+                
+            except Exception as e:
+                logger.error(f"Error in orchestrator: {str(e)}", exc_info=True)
+                root.error = str(e)
+                result = self._error_result(e, root.trace_id, self._resumable(run_id))
+        
+        yield FinalResult(result=result)
+    
+    def _run_direct(self, state: AgentState, emit: Optional[Callable[[Any], None]] = None) -> AgentState:
+        """
+        Run the graph's nodes in order without LangGraph, for uncheckpointed queries
+        
+        Takes the same steps as the compiled graph (select, dispatch ready
+        agents, join, aggregate) and merges node updates the same way, so the
+        final state is identical, minus the per-step channel bookkeeping.
+        Branches dispatched together still run concurrently.
+        
+        Args:
+            state: Initial state from _initial_state
+            emit: Optional sink for progress events (dropped by default)
             
-            if not agents_used:
-                return OrchestratorResult(
-                    response="Unable to process query - no agents available",
-                    agents_used=[],
-                    agent_details=[],
-                    success=False,
-                    error="No agents available"
-                )
+        Returns:
+            The final state
+        """
+        token = _direct_writer.set(emit or (lambda event: None))
+        try:
+            state = dict(state)
+            self._apply_update(state, self._select_agents_node(state))
             
-            return OrchestratorResult(
-                response=final_state["final_response"],
-                agents_used=agents_used,
-                agent_details=agent_responses,
-                success=True
-            )
+            while True:
+                route = self._dispatch_ready_agents(state)
+                if route == "aggregate_results":
+                    break
+                
+                nodes = {"execute_agent": self._execute_agent_node, "execute_pipeline": self._execute_pipeline_node}
+                if len(route) == 1:
+                    updates = [nodes[route[0].node](route[0].arg)]
+                else:
+                    with ThreadPoolExecutor(max_workers=len(route), thread_name_prefix="fast-path") as executor:
+                        futures = [
+                            executor.submit(contextvars.copy_context().run, nodes[send.node], send.arg)
+                            for send in route
+                        ]
+                        updates = [future.result() for future in futures]
+                for update in updates:
+                    self._apply_update(state, update)
             
-        except Exception as e:
-            logger.error(f"Error in orchestrator: {str(e)}", exc_info=True)
+            self._apply_update(state, self._aggregate_results_node(state))
+            return state
+        finally:
+            _direct_writer.reset(token)
+    
+    def _apply_update(self, state: Dict[str, Any], update: Dict[str, Any]):
+        """Merge a node's update into state the way the graph's channels do"""
+        for key, value in update.items():
+            state[key] = state.get(key, []) + value if key in self.REDUCED_KEYS else value
+    
+    def _initial_state(
+        self,
+        query: str,
+        context: Optional[Dict[str, Any]],
+        timeout: Optional[float],
+        session_id: Optional[str] = None
+    ) -> AgentState:
+        """Graph input for a new query"""
+        return {
+            "run_id": str(uuid.uuid4()),
+            "session_id": session_id,
+            "query": query,
+            "selected_agents": [],
+            "plan": {},
+            "agent_responses": [],
+            "skipped_agents": [],
+            "dropped_agents": [],
+            "final_response": "",
+            "conversation_history": [HumanMessage(content=query)],
+            "context": context or {},
+            "deadline": self._budget_deadline(timeout)
+        }
+    
+    def _budget_deadline(self, timeout: Optional[float]) -> Optional[float]:
+        """Deadline for a query's budget, falling back to the default budget"""
+        return deadline_after(timeout if timeout is not None else self.query_budget)
+    
+    def _to_result(self, final_state: AgentState) -> OrchestratorResult:
+        """Turn the final graph state into an OrchestratorResult"""
+        agent_responses = self._ordered_responses(final_state)
+        agents_used = [r["agent_name"] for r in agent_responses if r["success"]]
+        dropped = [self._agent_name(agent_key) for agent_key in final_state.get("dropped_agents") or []]
+        
+        if not agents_used:
             return OrchestratorResult(
-                response="An error occurred while processing your query",
+                response="Unable to process query - no agents available",
                 agents_used=[],
                 agent_details=[],
                 success=False,
-                error=str(e)
+                error="Time budget exhausted before any agent finished" if dropped else "No agents available",
+                dropped_agents=dropped
             )
+        
+        return OrchestratorResult(
+            response=final_state["final_response"],
+            agents_used=agents_used,
+            agent_details=agent_responses,
+            success=True,
+            dropped_agents=dropped
+        )
+    
+    def _resumable(self, run_id: Optional[str]) -> Optional[str]:
+        """The run ID to hand back to callers, if the run can be resumed"""
+        return run_id if self.checkpointer is not None else None
+    
+    @staticmethod
+    def _traced_result(root: Span, result: OrchestratorResult, run_id: Optional[str] = None) -> OrchestratorResult:
+        """Record the outcome on the trace root and attach the trace and run IDs"""
+        root.set(agents=[d["agent_key"] for d in result.agent_details], success=result.success,
+                 dropped=result.dropped_agents)
+        result.trace_id = root.trace_id
+        result.run_id = run_id
+        return result
+    
+    @staticmethod
+    def _error_result(
+        error: Exception,
+        trace_id: Optional[str] = None,
+        run_id: Optional[str] = None
+    ) -> OrchestratorResult:
+        """OrchestratorResult for a query that raised"""
+        return OrchestratorResult(
+            response="An error occurred while processing your query",
+            agents_used=[],
+            agent_details=[],
+            success=False,
+            error=str(error),
+            trace_id=trace_id,
+            run_id=run_id
+        )
+    
+    def resume(self, run_id: str, timeout: Optional[float] = None) -> OrchestratorResult:
+        """
+        Finish a checkpointed run, re-running only the agents that did not complete
+        
+        Agents that failed, timed out, were skipped or never ran are executed
+        again, together with the agents that depend on them (their input
+        changes); successful upstream answers are reused from the checkpoint.
+        A run interrupted mid-graph simply continues from its last checkpoint.
+        
+        Args:
+            run_id: Run ID returned by process_query
+            timeout: Optional time budget in seconds for the resumed part
+            
+        Returns:
+            OrchestratorResult for the whole run
+        """
+        if self.checkpointer is None:
+            return self._error_result(RuntimeError("Checkpointing is disabled (set CHECKPOINT_PATH)"))
+        
+        run_config = self._run_config(run_id)
+        
+        with self.tracer.trace("resume", run_id=run_id) as root:
+            try:
+                snapshot = self.graph.get_state(run_config)
+                if not snapshot.values:
+                    raise ValueError(f"Unknown run: {run_id}")
+                
+                if snapshot.next:
+                    logger.info(f"Continuing interrupted run {run_id} at {list(snapshot.next)}")
+                    self.graph.update_state(run_config, {"deadline": self._budget_deadline(timeout)})
+                else:
+                    rerun = self._agents_to_rerun(snapshot.values)
+                    if not rerun:
+                        logger.info(f"Run {run_id} already complete")
+                        return self._traced_result(root, self._to_result(snapshot.values), run_id)
+                    
+                    logger.info(f"Resuming run {run_id}: re-running {rerun}")
+                    root.set(rerun=rerun)
+                    kept = [r for r in snapshot.values["agent_responses"] if r["agent_key"] not in rerun]
+                    self.graph.update_state(run_config, {
+                        "agent_responses": Overwrite(kept),
+                        "skipped_agents": Overwrite([]),
+                        "deadline": self._budget_deadline(timeout)
+                    }, as_node="join")
+                
+                final_state = self.graph.invoke(None, run_config)
+                return self._traced_result(root, self._to_result(final_state), run_id)
+                
+            except Exception as e:
+                logger.error(f"Error resuming run {run_id}: {str(e)}", exc_info=True)
+                root.error = str(e)
+                return self._error_result(e, root.trace_id, run_id)
+            finally:
+                self._discard_speculation(run_id)
+    
+    @staticmethod
+    def _agents_to_rerun(state: AgentState) -> List[str]:
+        """Agents without a complete answer, plus everything downstream of them"""
+        plan = state["plan"]
+        complete = {
+            r["agent_key"] for r in state["agent_responses"]
+            if r["success"] and not (r.get("metadata") or {}).get("truncated")
+        }
+        rerun = [agent_key for agent_key in plan if agent_key not in complete]
+        
+        # Plans are in execution order, so one pass picks up transitive dependents
+        for agent_key, dependencies in plan.items():
+            if agent_key not in rerun and any(d in rerun for d in dependencies):
+                rerun.append(agent_key)
+        return [agent_key for agent_key in plan if agent_key in rerun]
+    
+    def process_many(
+        self,
+        queries: List[str],
+        max_concurrency: int = 4,
+        per_agent_limit: Optional[Union[int, Dict[str, int]]] = None,
+        context: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> List[OrchestratorResult]:
+        """
+        Process a batch of queries on a bounded worker pool
+        
+        Args:
+            queries: Queries to process
+            max_concurrency: Number of queries in flight at once
+            per_agent_limit: Max concurrent calls per agent (one cap for all, or per agent key)
+            context: Optional additional context shared by every query
+            timeout: Optional time budget in seconds for each query
+            
+        Returns:
+            One OrchestratorResult per query, in input order
+        """
+        if isinstance(per_agent_limit, int):
+            per_agent_limit = {agent_key: per_agent_limit for agent_key in self.agents}
+        slots = {
+            agent_key: threading.BoundedSemaphore(limit)
+            for agent_key, limit in (per_agent_limit or {}).items()
+        }
+        
+        def run(query: str) -> OrchestratorResult:
+            token = _agent_slots.set(slots)
+            try:
+                return self.process_query(query, context, timeout=timeout)
+            except Exception as e:
+                logger.error(f"Batch item failed: {str(e)}", exc_info=True)
+                return self._error_result(e)
+            finally:
+                _agent_slots.reset(token)
+        
+        logger.info(f"Processing batch of {len(queries)} queries (concurrency={max_concurrency})")
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="batch") as executor:
+            return list(executor.map(run, queries))
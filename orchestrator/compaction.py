@@ -0,0 +1,157 @@
+"""
+Extractive compaction of upstream answers passed to downstream agents
+
+Instead of a fixed character prefix, each upstream answer is split into
+sentences, the sentences are ranked with TextRank over TF-IDF similarity,
+and the best ones are kept (in their original order) until the downstream
+agent's token budget is filled. No LLM call is involved.
+"""
+import hashlib
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+import numpy as np
+
+from agents.cache import CacheStats, LRUCache
+
+from .text import STOPWORDS
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends, blank lines and markdown list items
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(*#-])|\n\s*\n|\n(?=\s*(?:[-*•]|\d+[.)])\s)")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Rough English average, matching OpenAI's rule of thumb
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count without a tokenizer"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences and list items"""
+    return [s.strip() for s in _SENTENCE_BREAK.split(text) if s and s.strip()]
+
+
+def _terms(sentence: str) -> List[str]:
+    return [w for w in _WORD.findall(sentence.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def rank_sentences(sentences: List[str], damping: float = 0.85, iterations: int = 50) -> np.ndarray:
+    """
+    TextRank scores for sentences, using TF-IDF cosine similarity as edge weights
+
+    Args:
+        sentences: Sentences of one document
+        damping: PageRank damping factor
+        iterations: Maximum power iterations
+
+    Returns:
+        One score per sentence; higher is more central to the text
+    """
+    n = len(sentences)
+    if n <= 1:
+        return np.ones(n)
+
+    counts = [Counter(_terms(s)) for s in sentences]
+    vocabulary = {term: i for i, term in enumerate(sorted(set().union(*counts)))}
+    if not vocabulary:
+        return np.ones(n)
+
+    tf = np.zeros((n, len(vocabulary)))
+    for row, terms in enumerate(counts):
+        for term, count in terms.items():
+            tf[row, vocabulary[term]] = count
+
+    # Smoothed IDF, then L2-normalised rows so the dot product is cosine similarity
+    df = np.count_nonzero(tf, axis=0)
+    tfidf = tf * (np.log((1 + n) / (1 + df)) + 1)
+    norms = np.linalg.norm(tfidf, axis=1, keepdims=True)
+    tfidf = np.divide(tfidf, norms, out=np.zeros_like(tfidf), where=norms > 0)
+
+    similarity = tfidf @ tfidf.T
+    np.fill_diagonal(similarity, 0.0)
+
+    # Sentences sharing no terms with the rest link uniformly, as in PageRank
+    out_weight = similarity.sum(axis=1, keepdims=True)
+    transition = np.divide(similarity, out_weight, out=np.full_like(similarity, 1.0 / n), where=out_weight > 0)
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (transition.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            scores = updated
+            break
+        scores = updated
+
+    # Favour sentences that say something: filler ("Sure!", "Hope this helps") has few content terms
+    content_terms = np.array([sum(terms.values()) for terms in counts], dtype=float)
+    return scores * np.log1p(content_terms)
+
+
+def compact(text: str, token_budget: int) -> str:
+    """
+    Keep the most central sentences of text that fit in token_budget
+
+    Args:
+        text: Upstream agent answer
+        token_budget: Approximate number of tokens to keep
+
+    Returns:
+        The selected sentences in their original order, or text itself when
+        it already fits
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+
+    sentences = split_sentences(text)
+    scores = rank_sentences(sentences)
+
+    chosen = []
+    used = 0
+    # Highest score first; earlier sentences win ties
+    for i in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+        cost = estimate_tokens(sentences[i]) + 1
+        if scores[i] > 0 and used + cost <= token_budget:
+            chosen.append(i)
+            used += cost
+
+    if not chosen:
+        # Even the best sentence is too long; fall back to its prefix
+        best = sentences[int(np.argmax(scores))]
+        return best[:token_budget * CHARS_PER_TOKEN]
+
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+class ContextCompactor:
+    """Compacts upstream answers to a token budget, caching the result per answer and budget"""
+
+    def __init__(self, max_size: int = 256):
+        self._cache = LRUCache(max_size=max_size, ttl=None)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def compact(self, text: str, token_budget: int) -> str:
+        key = f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}:{token_budget}"
+        compacted = self._cache.get(key)
+        if compacted is None:
+            compacted = compact(text, token_budget)
+            self._cache.set(key, compacted)
+            logger.debug(f"Compacted context from ~{estimate_tokens(text)} to ~{estimate_tokens(compacted)} tokens")
+        return compacted
+
+    def compact_all(self, upstream: Dict[str, str], token_budget: int) -> Dict[str, str]:
+        """Compact several upstream answers, sharing token_budget between them"""
+        if not upstream:
+            return {}
+        share = max(1, token_budget // len(upstream))
+        return {key: self.compact(text, share) for key, text in upstream.items()}
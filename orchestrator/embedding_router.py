@@ -0,0 +1,138 @@
+"""
+Embedding-similarity routing over the agent catalog
+
+Each agent's description, its keywords and any example queries are embedded
+once, when the router is built, as TF-IDF weighted vectors of hashed
+character n-grams. A query is embedded the same way and compared with every
+row in a single matrix product, so wordings the keyword list misses
+("summarise the trade-offs", "a limerick about...") still land near the
+right agent, with no network call or model download.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from .text import STOPWORDS, WORD, stable_hash
+
+# Character n-gram lengths taken from each word (padded with < and >)
+CHAR_NGRAMS = (3, 4, 5)
+
+# A single word must be at least this similar to an agent to count as mentioning it
+WORD_SIMILARITY = 0.25
+
+
+def char_ngram_counts(text: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hashed bag of words and character n-grams of a text
+
+    Args:
+        text: Text to embed
+        dim: Number of hash buckets
+
+    Returns:
+        (bucket indices, counts), stopwords left out
+    """
+    features = []
+    for word in WORD.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        padded = f"<{word}>"
+        features.append(f"w:{word}")
+        for n in CHAR_NGRAMS:
+            features += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+    if not features:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    buckets = np.array([stable_hash(f) for f in features], dtype=np.int64) % dim
+    indices, counts = np.unique(buckets, return_counts=True)
+    return indices, counts.astype(float)
+
+
+class EmbeddingRouter:
+    """Cosine similarity between a query and precomputed agent document vectors"""
+
+    def __init__(self, documents: Dict[str, List[str]], dim: int = 2 ** 12):
+        """
+        Embed every agent document
+
+        Args:
+            documents: Agent key -> texts describing it (description,
+                keywords, example queries); agents without text are left out
+            dim: Number of hash buckets
+        """
+        self.dim = dim
+        self.agent_keys = [k for k, texts in documents.items() if any(t.strip() for t in texts)]
+        rows = [(i, t) for i, k in enumerate(self.agent_keys) for t in documents[k] if t.strip()]
+        counts = [char_ngram_counts(text, dim) for _, text in rows]
+
+        # n-grams shared by every agent's text say little about which agent fits
+        document_frequency = np.zeros(dim)
+        for indices, _ in counts:
+            document_frequency[indices] += 1
+        self.idf = np.log((1 + len(rows)) / (1 + document_frequency)) + 1
+
+        # One column per document; float32 keeps large catalogs compact
+        self.matrix = np.zeros((dim, len(rows)), dtype=np.float32)
+        for column, (indices, values) in enumerate(counts):
+            self.matrix[indices, column] = self._weigh(indices, values)
+
+        # Documents are grouped by agent, so each agent's columns start at one offset
+        row_agents = np.array([i for i, _ in rows], dtype=np.int64)
+        self._starts = np.searchsorted(row_agents, np.arange(len(self.agent_keys)))
+
+    def _weigh(self, indices: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        weights = counts * self.idf[indices]
+        norm = np.linalg.norm(weights)
+        return weights / norm if norm else weights
+
+    def scores(self, query: str) -> np.ndarray:
+        """Best cosine similarity of the query to each agent's documents, in agent_keys order"""
+        indices, counts = char_ngram_counts(query, self.dim)
+        if not len(indices) or not self.agent_keys:
+            return np.zeros(len(self.agent_keys))
+        similarities = self._weigh(indices, counts) @ self.matrix[indices]
+        return np.maximum.reduceat(similarities, self._starts)
+
+    def top_k(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """
+        The k agents most similar to a query
+
+        Args:
+            query: User query
+            k: Number of agents to return
+
+        Returns:
+            (agent key, similarity) pairs, most similar first
+        """
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.agent_keys[i], float(scores[i])) for i in top]
+
+    def locate(self, query: str, agent_keys: List[str]) -> Dict[str, Tuple[int, int]]:
+        """
+        Where the query first mentions each agent, for agents it does not name by keyword
+
+        Args:
+            query: User query
+            agent_keys: Agents to look for
+
+        Returns:
+            Agent key -> (start, end) of the first word that is closest to
+            that agent and at least WORD_SIMILARITY similar; agents never
+            mentioned are left out
+        """
+        wanted = {self.agent_keys.index(k): k for k in agent_keys if k in self.agent_keys}
+        found: Dict[str, Tuple[int, int]] = {}
+        for token in WORD.finditer(query.lower()):
+            if len(found) == len(wanted):
+                break
+            scores = self.scores(token.group())
+            best = int(np.argmax(scores)) if len(scores) else -1
+            agent_key = wanted.get(best)
+            if agent_key is not None and agent_key not in found and scores[best] >= WORD_SIMILARITY:
+                found[agent_key] = token.span()
+        return found
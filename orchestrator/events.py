@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .brain import OrchestratorResult
+
+
+@dataclass
+class AgentsSelected:
+    """The selector picked these agents (plan maps each to its dependencies)"""
+    agents: List[str]
+    plan: Dict[str, List[str]] = field(default_factory=dict)
+
+
+@dataclass
+class AgentStarted:
+    """An agent began working on the query"""
+    agent_key: str
+    agent_name: str
+
+
+@dataclass
+class AgentToken:
+    """A chunk of an agent's answer"""
+    agent_key: str
+    text: str
+
+
+@dataclass
+class AgentFinished:
+    """An agent completed, failed or was skipped"""
+    agent_key: str
+    agent_name: str
+    success: bool
+    error: Optional[str] = None
+    truncated: bool = False
+
+
+@dataclass
+class FinalResult:
+    """The aggregated answer; always the last event"""
+    result: "OrchestratorResult"
+
+
+OrchestratorEvent = Union[AgentsSelected, AgentStarted, AgentToken, AgentFinished, FinalResult]
@@ -0,0 +1,103 @@
+"""
+Keyword matching for agent selection
+
+Every keyword of every agent, with its common inflections, goes into one
+lookup table when the matcher is built. A query is then tokenized once and
+each run of words is looked up, so matching costs the same however many
+agents and keywords the catalog has. Matches are whole words: "what" does
+not hit "whatever", "data" does not hit "database".
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Set, Tuple
+
+from .text import WORD
+
+# Endings accepted after a keyword ("analyze" -> "analyzing", "research" -> "researched")
+SUFFIXES = ("s", "es", "ed", "ing", "ings", "er", "ers", "ion", "ions")
+
+
+def inflections(keyword: str) -> Set[str]:
+    """
+    Normalized forms of a keyword: its words joined by single spaces, with the
+    last word also suffixed (a final "e" is dropped before the suffix)
+    """
+    words = WORD.findall(keyword.lower())
+    if not words:
+        return set()
+    *head, last = words
+    stem = last[:-1] if last.endswith("e") else last
+    return {" ".join(head + [form]) for form in {last} | {stem + suffix for suffix in SUFFIXES}}
+
+
+@dataclass
+class AgentMatch:
+    """How a query matched one agent's keywords"""
+    score: int
+    start: int
+    end: int
+    keywords: List[str]
+
+
+class KeywordMatcher:
+    """Scores every agent against a query in a single pass over its words"""
+
+    def __init__(self, keywords_by_agent: Dict[str, Iterable[str]]):
+        # Normalized form -> (agent, keyword) pairs it counts for
+        self._owners: Dict[str, List[Tuple[str, str]]] = {}
+        # First words of all forms, to skip words that cannot start a match
+        self._first_words: Set[str] = set()
+        self._max_words = 1
+        for agent_key, keywords in keywords_by_agent.items():
+            for keyword in keywords:
+                for form in inflections(keyword):
+                    self._owners.setdefault(form, []).append((agent_key, keyword.lower()))
+                    self._first_words.add(form.split(" ", 1)[0])
+                    self._max_words = max(self._max_words, form.count(" ") + 1)
+
+    def match(self, query: str) -> Dict[str, AgentMatch]:
+        """
+        Match a query against every agent's keywords
+
+        Args:
+            query: User query
+
+        Returns:
+            Agent key -> AgentMatch for agents with at least one keyword in
+            the query; score counts distinct keywords, start/end locate the
+            first one in the lowercased query
+        """
+        lowered = query.lower()
+        words = WORD.findall(lowered)
+        first_words = self._first_words
+        if not any(word in first_words for word in words):
+            return {}
+
+        spans = [token.span() for token in WORD.finditer(lowered)]
+        matches: Dict[str, AgentMatch] = {}
+
+        i = 0
+        while i < len(words):
+            if words[i] not in first_words:
+                i += 1
+                continue
+
+            # Longest phrase starting here wins; matches do not overlap
+            for n in range(min(self._max_words, len(words) - i), 0, -1):
+                owners = self._owners.get(" ".join(words[i:i + n]) if n > 1 else words[i])
+                if owners:
+                    break
+            else:
+                i += 1
+                continue
+
+            start, end = spans[i][0], spans[i + n - 1][1]
+            for agent_key, keyword in owners:
+                found = matches.get(agent_key)
+                if found is None:
+                    matches[agent_key] = AgentMatch(1, start, end, [keyword])
+                elif keyword not in found.keywords:
+                    found.keywords.append(keyword)
+                    found.score += 1
+            i += n
+
+        return matches
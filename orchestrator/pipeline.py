@@ -0,0 +1,101 @@
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixGate:
+    """
+    Collects an upstream agent's streamed output and opens once downstream
+    agents can start: when prefix_chars characters have arrived, or when the
+    upstream agent finishes first
+    """
+
+    def __init__(self, prefix_chars: int):
+        self.prefix_chars = prefix_chars
+        self._chunks: List[str] = []
+        self._length = 0
+        self._failed = False
+        self._open = threading.Event()
+
+    def feed(self, text: str):
+        if self._open.is_set():
+            return
+        self._chunks.append(text)
+        self._length += len(text)
+        if self._length >= self.prefix_chars:
+            self._open.set()
+
+    def finish(self, content: Optional[str]):
+        """Upstream is done; content is None when it failed or was skipped"""
+        if not self._open.is_set():
+            if content is None:
+                self._failed = True
+            else:
+                self._chunks = [content]
+            self._open.set()
+
+    def wait(self) -> Optional[str]:
+        """Block until the gate opens; the upstream prefix, or None if upstream produced nothing usable"""
+        self._open.wait()
+        if self._failed:
+            return None
+        return "".join(self._chunks)[:self.prefix_chars]
+
+
+# run_agent(agent_key, upstream prefixes by agent key, on_token) -> response record, or None if skipped
+AgentRunner = Callable[[str, Dict[str, str], Callable[[str], None]], Optional[Dict]]
+
+
+def run_pipeline(
+    plan: Dict[str, List[str]],
+    run_agent: AgentRunner,
+    prefix_chars: int,
+    finished: Optional[Dict[str, str]] = None
+) -> List[Optional[Dict]]:
+    """
+    Run a dependency plan with each agent starting as soon as its upstream
+    agents have streamed prefix_chars characters, instead of when they finish
+
+    Args:
+        plan: Agent key -> keys of the agents whose output it needs
+        run_agent: Executes one agent and returns its response record
+        prefix_chars: How much upstream output a downstream agent receives
+        finished: Content of upstream agents outside the plan that already
+            succeeded (e.g. earlier in a resumed run)
+
+    Returns:
+        One record (or None for skipped agents) per plan entry, in plan order
+    """
+    gates = {}
+    for agent_key, content in (finished or {}).items():
+        gates[agent_key] = PrefixGate(prefix_chars)
+        gates[agent_key].finish(content)
+    gates.update((agent_key, PrefixGate(prefix_chars)) for agent_key in plan)
+
+    def run(agent_key: str) -> Optional[Dict]:
+        upstream = {}
+        for dependency in plan[agent_key]:
+            prefix = gates[dependency].wait() if dependency in gates else None
+            if prefix:
+                upstream[dependency] = prefix
+
+        if plan[agent_key]:
+            logger.info(f"Pipelining {agent_key} on {list(upstream)}")
+
+        record = None
+        try:
+            record = run_agent(agent_key, upstream, gates[agent_key].feed)
+        finally:
+            # Never leave dependents waiting, even if this agent raised
+            success = record is not None and record["success"]
+            gates[agent_key].finish(record["content"] if success else None)
+        return record
+
+    with ThreadPoolExecutor(max_workers=max(1, len(plan)), thread_name_prefix="pipeline") as executor:
+        # Each agent runs in a copy of the caller's context (graph config, batch slots)
+        futures = [executor.submit(contextvars.copy_context().run, run, agent_key) for agent_key in plan]
+        return [future.result() for future in futures]
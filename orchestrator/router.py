@@ -0,0 +1,211 @@
+"""
+Local statistical router trained on the LLM selector's past decisions
+
+Queries are turned into hashed n-gram features (words, word pairs and
+character trigrams), and a one-vs-rest logistic regression predicts, for
+each agent, the probability that the LLM would have picked it, plus whether
+the picked agents run in sequence or in parallel. Training data is the
+JSONL log of (query, plan) pairs written by the selector; see
+train_router.py.
+"""
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .text import WORD, stable_hash
+
+logger = logging.getLogger(__name__)
+
+# Output column predicting "the selected agents depend on each other"
+SEQUENTIAL = "__sequential__"
+
+
+def hashed_features(query: str, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sparse feature vector of a query
+
+    Args:
+        query: User query
+        dim: Number of hash buckets
+
+    Returns:
+        (bucket indices, values), L2-normalized; colliding features are summed
+    """
+    words = WORD.findall(query.lower())
+    features = [f"w:{w}" for w in words]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f"<{word}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    if not features:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    hashes = np.array([stable_hash(f) for f in features], dtype=np.int64)
+    # The hash's top bit gives each feature a sign, so collisions tend to cancel out
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+    indices, inverse = np.unique(hashes % dim, return_inverse=True)
+    values = np.zeros(len(indices))
+    np.add.at(values, inverse, signs)
+    norm = np.linalg.norm(values)
+    return indices, values / norm if norm else values
+
+
+class SparseRows:
+    """Rows of hashed features packed CSR-style for vectorized products"""
+
+    def __init__(self, rows: List[Tuple[np.ndarray, np.ndarray]]):
+        self.n_rows = len(rows)
+        self.indices = np.concatenate([r[0] for r in rows]) if rows else np.zeros(0, dtype=np.int64)
+        self.values = np.concatenate([r[1] for r in rows]) if rows else np.zeros(0)
+        self.row_of = np.repeat(np.arange(len(rows)), [len(r[0]) for r in rows])
+
+    def dot(self, weights: np.ndarray) -> np.ndarray:
+        """rows @ weights, for weights of shape (dim, outputs)"""
+        out = np.zeros((self.n_rows, weights.shape[1]))
+        np.add.at(out, self.row_of, weights[self.indices] * self.values[:, None])
+        return out
+
+    def tdot(self, gradient: np.ndarray, dim: int) -> np.ndarray:
+        """rows.T @ gradient, for gradient of shape (rows, outputs)"""
+        out = np.zeros((dim, gradient.shape[1]))
+        np.add.at(out, self.indices, gradient[self.row_of] * self.values[:, None])
+        return out
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(x, -30, 30)))
+
+
+def plan_labels(plan: Dict[str, List[str]], outputs: List[str]) -> np.ndarray:
+    """Target vector of a logged plan: one column per agent, plus SEQUENTIAL"""
+    target = np.array([agent_key in plan for agent_key in outputs], dtype=float)
+    target[outputs.index(SEQUENTIAL)] = float(any(plan.values()))
+    return target
+
+
+@dataclass
+class RouterPrediction:
+    """Per-agent probabilities for a query and how sure the router is"""
+    probabilities: Dict[str, float]
+    sequential: float
+    confidence: float
+
+    @property
+    def agents(self) -> List[str]:
+        """Agents predicted to be selected, most probable first"""
+        chosen = [k for k, p in self.probabilities.items() if p >= 0.5]
+        if not chosen:
+            chosen = [max(self.probabilities, key=self.probabilities.get)]
+        return sorted(chosen, key=lambda k: -self.probabilities[k])
+
+
+class LocalRouter:
+    """One-vs-rest logistic regression over hashed n-gram features"""
+
+    def __init__(self, agent_keys: List[str], dim: int = 2 ** 15):
+        self.outputs = list(agent_keys) + [SEQUENTIAL]
+        self.dim = dim
+        self.weights = np.zeros((dim, len(self.outputs)))
+        self.bias = np.zeros(len(self.outputs))
+
+    @property
+    def agent_keys(self) -> List[str]:
+        return self.outputs[:-1]
+
+    def fit(
+        self,
+        queries: List[str],
+        plans: List[Dict[str, List[str]]],
+        epochs: int = 300,
+        learning_rate: float = 2.0,
+        l2: float = 1e-4
+    ) -> "LocalRouter":
+        """
+        Train on logged LLM decisions with full-batch gradient descent
+
+        Args:
+            queries: Logged queries
+            plans: The plan the LLM chose for each query
+            epochs: Gradient steps
+            learning_rate: Step size
+            l2: Weight decay
+
+        Returns:
+            self
+        """
+        rows = SparseRows([hashed_features(q, self.dim) for q in queries])
+        targets = np.stack([plan_labels(p, self.outputs) for p in plans])
+        n = max(1, len(queries))
+
+        for _ in range(epochs):
+            error = _sigmoid(rows.dot(self.weights) + self.bias) - targets
+            self.weights -= learning_rate * (rows.tdot(error, self.dim) / n + l2 * self.weights)
+            self.bias -= learning_rate * error.mean(axis=0)
+        return self
+
+    def predict_proba(self, queries: List[str]) -> np.ndarray:
+        """Probabilities of shape (queries, agents + 1), columns in self.outputs order"""
+        rows = SparseRows([hashed_features(q, self.dim) for q in queries])
+        return _sigmoid(rows.dot(self.weights) + self.bias)
+
+    def predict(self, query: str) -> RouterPrediction:
+        indices, values = hashed_features(query, self.dim)
+        probabilities = _sigmoid(values @ self.weights[indices] + self.bias)
+        agents = dict(zip(self.agent_keys, probabilities[:-1].tolist()))
+
+        # Every agent decision must be clear-cut, and the ordering too when several agents are picked
+        decisions = list(probabilities[:-1])
+        if sum(p >= 0.5 for p in decisions) > 1:
+            decisions.append(probabilities[-1])
+        confidence = float(min(max(p, 1 - p) for p in decisions))
+        return RouterPrediction(agents, float(probabilities[-1]), confidence)
+
+    def save(self, path: str):
+        # Through a file object, so the model lands at path exactly (numpy appends .npz to bare names)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, weights=self.weights, bias=self.bias,
+                                outputs=np.array(self.outputs), dim=np.array(self.dim))
+
+    @classmethod
+    def load(cls, path: str) -> "LocalRouter":
+        with np.load(path) as data:
+            outputs = [str(o) for o in data["outputs"]]
+            router = cls(outputs[:-1], int(data["dim"]))
+            router.weights = data["weights"]
+            router.bias = data["bias"]
+        return router
+
+
+class DecisionLog:
+    """Appends the LLM selector's decisions to a JSONL file for training the router"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def record(self, query: str, plan: Dict[str, List[str]], latency_ms: Optional[float] = None):
+        entry = {"ts": time.time(), "query": query, "plan": [[k, v] for k, v in plan.items()],
+                 "latency_ms": latency_ms}
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not log routing decision: {e}")
+
+
+def read_decisions(path: str) -> Iterable[Dict[str, Any]]:
+    """Entries of a decision log, with plans as dicts; malformed lines are skipped"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                entry["plan"] = {agent_key: dependencies for agent_key, dependencies in entry["plan"]}
+                yield entry
+            except (ValueError, KeyError, TypeError):
+                continue
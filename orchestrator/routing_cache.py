@@ -0,0 +1,111 @@
+import hashlib
+import json
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from agents.cache import CacheStats, LRUCache, SQLiteCache, TieredCache
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_QUOTED = re.compile(r"\"[^\"]*\"|“[^”]*”|(?<!\w)'[^']+'(?!\w)")
+_NUMBER = re.compile(r"\d+(?:[.,:/]\d+)*")
+
+# Entry recording which agent catalog the cached plans were made for
+CATALOG_KEY = "__catalog__"
+
+
+def normalize_routing_query(query: str) -> str:
+    """
+    Routing key for a query: lower-cased and whitespace-collapsed, with quoted
+    text and numbers templated out, since they rarely change which agents
+    are needed ("compare "X" and "Y" in 2023" ~ "compare "A" and "B" in 2024")
+    """
+    query = _QUOTED.sub("<q>", query)
+    query = _NUMBER.sub("<num>", query)
+    return " ".join(query.split()).casefold()
+
+
+def catalog_fingerprint(agents_info: Dict[str, Dict[str, Any]], model: str = "") -> str:
+    """Hash of everything the routing decision depends on besides the query"""
+    canonical = json.dumps({"agents": agents_info, "model": model}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class RoutingCache:
+    """
+    Cache of LLM routing plans keyed on the normalized query
+
+    Plans are only valid for the agent catalog they were made for: when the
+    catalog fingerprint changes (agents, descriptions or keywords edited in
+    config.py, or a different selector model) the store is cleared.
+    """
+
+    def __init__(self, store, fingerprint: str):
+        self.store = store
+        self.fingerprint = fingerprint
+
+        # Keys include the fingerprint, so stale plans are never served; clearing reclaims their space
+        marker = store.get(CATALOG_KEY)
+        if marker is None or marker.get("fingerprint") != fingerprint:
+            if marker is not None:
+                logger.info("Agent catalog changed, clearing routing cache")
+                store.clear()
+            store.set(CATALOG_KEY, {"fingerprint": fingerprint})
+        # Count routing lookups only, not the marker check
+        store.stats = CacheStats()
+
+    def make_key(self, query: str) -> str:
+        raw = f"{self.fingerprint}\x1f{normalize_routing_query(query)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, query: str) -> Optional[Dict[str, List[str]]]:
+        entry = self.store.get(self.make_key(query))
+        if entry is None:
+            return None
+        # Stored as pairs, since JSON objects do not promise to keep plan order
+        return {agent_key: dependencies for agent_key, dependencies in entry["plan"]}
+
+    def set(self, query: str, plan: Dict[str, List[str]]):
+        self.store.set(self.make_key(query), {"plan": [[k, v] for k, v in plan.items()]})
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+
+_routing_cache: Optional[RoutingCache] = None
+_routing_cache_lock = threading.Lock()
+
+
+def get_routing_cache(fingerprint: str) -> Optional[RoutingCache]:
+    """
+    Get the process-wide routing cache built from config
+
+    Args:
+        fingerprint: catalog_fingerprint() of the selector's agents
+
+    Returns:
+        RoutingCache, or None when ROUTING_CACHE_ENABLED is false
+    """
+    global _routing_cache
+
+    settings = config.routing_cache
+    if not settings.enabled:
+        return None
+
+    with _routing_cache_lock:
+        if _routing_cache is None or _routing_cache.fingerprint != fingerprint:
+            persistent = None
+            if settings.sqlite_path:
+                persistent = SQLiteCache(settings.sqlite_path, ttl=settings.ttl, table="routing_plans")
+            _routing_cache = RoutingCache(
+                TieredCache(LRUCache(max_size=settings.max_size, ttl=settings.ttl), persistent),
+                fingerprint
+            )
+            logger.info(f"Routing cache enabled (size={settings.max_size}, ttl={settings.ttl}s, "
+                        f"sqlite={settings.sqlite_path or 'off'})")
+
+    return _routing_cache
@@ -1,17 +1,47 @@
 import logging
-from typing import List, Dict, Any
+import re
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Optional, Set, Tuple
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import SystemMessage, HumanMessage
 from config import config
+from tracing import annotate, get_tracer
+from .embedding_router import EmbeddingRouter
+from .matcher import KeywordMatcher
+from .router import DecisionLog, LocalRouter
+from .routing_cache import catalog_fingerprint, get_routing_cache
 
 logger = logging.getLogger(__name__)
 
+# Wording that says a later part of a query stands on its own
+# ("research X and *separately* write a poem", "... *in parallel* ...")
+INDEPENDENCE_CUES = re.compile(
+    r"\b(?:separately|independently|in parallel|at the same time|simultaneously|meanwhile|unrelated)\b"
+)
+
 
 class AgentSelector:
     """
     Intelligent agent selector that analyzes queries and determines which agent(s) to use
     """
     
+    # Keyword selection is trusted up to this many agents; beyond it the LLM decides
+    MAX_KEYWORD_AGENTS = 2
+    
+    # LLM latencies kept for the hedging delay, and how many are needed before hedging
+    LATENCY_WINDOW = 200
+    MIN_HEDGE_SAMPLES = 20
+    
+    # Selector LLM calls allowed in flight at once; beyond it selection falls back without asking
+    MAX_LLM_CALLS = 8
+    
+    # Log the selection path counts every this many selections
+    PATH_LOG_INTERVAL = 100
+    
     def __init__(self):
         self.llm = ChatOpenAI(
             model="gpt-4o-mini",
@@ -36,6 +66,65 @@ class AgentSelector:
                 "keywords": config.creative_agent.keywords
             }
         }
+        
+        self.matcher = KeywordMatcher({
+            agent_key: agent_info["keywords"] for agent_key, agent_info in self.agents_info.items()
+        })
+        
+        # ROUTING_MODE=embedding scores agents by similarity to their texts instead of keyword hits
+        self.routing_mode = config.routing_mode
+        if self.routing_mode not in ("keyword", "embedding"):
+            logger.warning(f"Unknown ROUTING_MODE {self.routing_mode!r}, using keyword routing")
+            self.routing_mode = "keyword"
+        self.embedding_router = self._build_embedding_router() if self.routing_mode == "embedding" else None
+        self.embedding_min_similarity = config.embedding_min_similarity
+        
+        # Past LLM decisions; invalidated when the catalog above changes
+        self.routing_cache = get_routing_cache(catalog_fingerprint(self.agents_info, self.llm.model_name))
+        self._local = threading.local()
+        
+        # Local model standing in for the LLM when it is confident, and the log it is trained from
+        self.router = self._load_router(config.router.model_path)
+        self.router_confidence = config.router.confidence
+        self.decision_log = DecisionLog(config.router.log_path) if config.router.log_path else None
+        
+        # LLM calls run in a pool so selection can give up on them after SELECTION_BUDGET
+        self.selection_budget = config.selection_budget
+        self.selection_hedge = config.selection_hedge
+        self._llm_pool = ThreadPoolExecutor(max_workers=self.MAX_LLM_CALLS, thread_name_prefix="llm-selection")
+        self._llm_slots = threading.BoundedSemaphore(self.MAX_LLM_CALLS)
+        self._llm_latencies: deque = deque(maxlen=self.LATENCY_WINDOW)
+        self._path_counts: Counter = Counter()
+        self._path_lock = threading.Lock()
+    
+    def _build_embedding_router(self) -> EmbeddingRouter:
+        """Embed each agent's description, keywords and example queries"""
+        example_queries = {
+            "research": config.research_agent.example_queries,
+            "analysis": config.analysis_agent.example_queries,
+            "creative": config.creative_agent.example_queries
+        }
+        return EmbeddingRouter({
+            agent_key: [agent_info["description"], " ".join(agent_info["keywords"])] + example_queries[agent_key]
+            for agent_key, agent_info in self.agents_info.items()
+        })
+    
+    def _load_router(self, path: Optional[str]) -> Optional[LocalRouter]:
+        """The trained router at path, if it exists and fits the current agents"""
+        if not path:
+            return None
+        try:
+            router = LocalRouter.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load router model {path}: {e}")
+            return None
+        
+        unknown = set(router.agent_keys) - set(self.agents_info)
+        if unknown:
+            logger.warning(f"Router model {path} predicts unknown agents {sorted(unknown)}, not using it")
+            return None
+        logger.info(f"Local router loaded from {path}")
+        return router
     
     def select_agents(self, query: str) -> List[str]:
         """
@@ -47,31 +136,156 @@ class AgentSelector:
         Returns:
             List of agent names to use (in order of execution)
         """
+        return list(self.select_plan(query))
+    
+    def select_plan(self, query: str) -> Dict[str, List[str]]:
+        """
+        Select agents for the query together with their dependencies
+        
+        Args:
+            query: User query
+            
+        Returns:
+            Execution plan mapping each selected agent to the agents whose
+            output it needs, in a valid execution order; agents with no
+            dependencies between them can run concurrently
+        """
         logger.info(f"Selecting agents for query: {query[:100]}...")
         
-        # First, try keyword-based selection for speed
-        keyword_agents = self._keyword_based_selection(query)
+        # First, try keyword (or embedding) selection for speed
+        candidates = self._fast_selection(query)
+        
+        # If it is confident (1 or 2 agents), use it
+        if len(candidates) <= self.MAX_KEYWORD_AGENTS:
+            plan = self._keyword_plan(query, candidates)
+            logger.info(f"{self.routing_mode.capitalize()}-based selection: {plan}")
+            self._took(self.routing_mode)
+            return plan
+        
+        # Reuse the LLM's earlier decision for the same (normalized) query
+        cached = self._cached_plan(query, consume=True)
+        if cached is not None:
+            logger.info(f"Cached routing decision: {cached}")
+            self._took("cache")
+            return cached
         
-        # If keyword selection is confident (1 or 2 agents), use it
-        if len(keyword_agents) <= 2:
-            logger.info(f"Keyword-based selection: {keyword_agents}")
-            return keyword_agents
+        # A confident local router answers without the LLM round trip
+        plan = self._router_plan(query)
+        if plan is not None:
+            logger.info(f"Router-based selection: {plan}")
+            self._took("router")
+            return plan
         
         # Otherwise, use LLM for more nuanced selection
-        llm_agents = self._llm_based_selection(query)
-        logger.info(f"LLM-based selection: {llm_agents}")
-        return llm_agents
+        plan = self._llm_based_selection(query)
+        logger.info(f"LLM-based selection: {plan}")
+        return plan
+    
+    def speculation_candidate(self, query: str) -> Optional[str]:
+        """
+        Most likely first agent for a query that will need LLM selection
+        
+        Args:
+            query: User query
+            
+        Returns:
+            The top keyword-scored agent, or None when keyword selection
+            alone will decide (nothing to overlap with)
+        """
+        candidates = self._fast_selection(query)
+        if len(candidates) <= self.MAX_KEYWORD_AGENTS or self._cached_plan(query) is not None:
+            return None
+        if self._router_plan(query) is not None:
+            return None
+        return candidates[0]
+    
+    def _cached_plan(self, query: str, consume: bool = False) -> Optional[Dict[str, List[str]]]:
+        """
+        Routing cache lookup, remembered per thread until consumed so that
+        speculation_candidate and select_plan count as one lookup
+        """
+        if self.routing_cache is None:
+            return None
+        
+        memo = getattr(self._local, "routing", None)
+        if memo is not None and memo[0] == query:
+            plan = memo[1]
+        else:
+            plan = self.routing_cache.get(query)
+        self._local.routing = None if consume else (query, plan)
+        return plan
+    
+    def _router_plan(self, query: str, min_confidence: Optional[float] = None) -> Optional[Dict[str, List[str]]]:
+        """
+        Plan from the local router, or None without a router or when it is unsure
+        
+        Predicted agents are ordered by where the query mentions them; when
+        the router predicts a sequence, each depends on those before it.
+        min_confidence defaults to ROUTER_CONFIDENCE.
+        """
+        if self.router is None:
+            return None
+        
+        prediction = self.router.predict(query)
+        annotate(router_confidence=round(prediction.confidence, 4))
+        threshold = self.router_confidence if min_confidence is None else min_confidence
+        if prediction.confidence < threshold:
+            return None
+        
+        positions = self._positions(query, prediction.agents)
+        ordered = sorted(prediction.agents, key=lambda agent_key: positions[agent_key][0])
+        sequential = prediction.sequential >= 0.5
+        return {agent_key: ordered[:i] if sequential else [] for i, agent_key in enumerate(ordered)}
+    
+    def routing_stats(self) -> Dict[str, Any]:
+        """Routing cache hit rate, how often each selection path won, and LLM latency"""
+        with self._path_lock:
+            paths = dict(self._path_counts)
+        latencies = list(self._llm_latencies)
+        return {
+            "cache": self.routing_cache.stats.to_dict() if self.routing_cache else None,
+            "paths": paths,
+            "selection_budget_ms": self.selection_budget * 1000 if self.selection_budget else None,
+            "llm_p95_ms": round(self._p95(latencies), 1) if len(latencies) >= 2 else None
+        }
+    
+    def _took(self, path: str):
+        """Record which path decided a selection, on the trace and in the counts"""
+        annotate(selection_path=path)
+        self._count(path)
+    
+    def _count(self, path: str):
+        with self._path_lock:
+            self._path_counts[path] += 1
+            total = sum(self._path_counts.values())
+            summary = dict(self._path_counts) if total % self.PATH_LOG_INTERVAL == 0 else None
+        if summary:
+            logger.info(f"Selection paths after {total} events: {summary}")
+    
+    def _fast_selection(self, query: str) -> List[str]:
+        """Agents picked without the LLM, by ROUTING_MODE, best first"""
+        if self.embedding_router is not None:
+            return self._embedding_based_selection(query)
+        return self._keyword_based_selection(query)
+    
+    def _embedding_based_selection(self, query: str) -> List[str]:
+        """Agents whose description, keywords or example queries are most similar to the query"""
+        # One more than keyword selection trusts, so ambiguous queries still reach the LLM
+        ranked = self.embedding_router.top_k(query, self.MAX_KEYWORD_AGENTS + 1)
+        best = ranked[0][1] if ranked else 0.0
+        annotate(embedding_similarity=round(best, 4))
+        selected = [
+            agent_key for agent_key, score in ranked
+            if score >= self.embedding_min_similarity and score >= best * 0.5  # Same cut as keyword scores
+        ]
+        
+        # Default to research if nothing is similar enough
+        return selected or ["research"]
     
     def _keyword_based_selection(self, query: str) -> List[str]:
         """Fast keyword-based agent selection"""
-        query_lower = query.lower()
         selected = []
-        scores = {}
-        
-        for agent_key, agent_info in self.agents_info.items():
-            score = sum(1 for keyword in agent_info["keywords"] if keyword in query_lower)
-            if score > 0:
-                scores[agent_key] = score
+        scores = {agent_key: match.score for agent_key, match in self.matcher.match(query).items()}
         
         # Sort by score and select top agents
         sorted_agents = sorted(scores.items(), key=lambda x: x[1], reverse=True)
@@ -89,7 +303,50 @@ class AgentSelector:
         
         return selected
     
-    def _llm_based_selection(self, query: str) -> List[str]:
+    def _keyword_plan(self, query: str, agents: List[str]) -> Dict[str, List[str]]:
+        """
+        Infer dependencies between keyword-selected agents
+        
+        Agents are ordered by where the query first mentions them, and each
+        depends on the agents mentioned before it ("research X and write a
+        pitch" needs the research), unless the text between the previous
+        mention and the next one says it stands on its own.
+        """
+        query_lower = query.lower()
+        positions = self._positions(query, agents)
+        
+        ordered = sorted(agents, key=lambda agent_key: positions[agent_key][0])
+        plan = {}
+        
+        for i, agent_key in enumerate(ordered):
+            if i == 0:
+                plan[agent_key] = []
+                continue
+            
+            segment_start = positions[ordered[i - 1]][1]
+            segment_end = positions[ordered[i + 1]][0] if i + 1 < len(ordered) else len(query_lower)
+            
+            if INDEPENDENCE_CUES.search(query_lower[segment_start:segment_end]):
+                plan[agent_key] = []
+            else:
+                plan[agent_key] = ordered[:i]
+        
+        return plan
+    
+    def _positions(self, query: str, agents: List[str]) -> Dict[str, tuple]:
+        """(start, end) of where the query first mentions each agent; unmentioned agents sort last"""
+        matches = self.matcher.match(query)
+        positions = {agent_key: (match.start, match.end) for agent_key, match in matches.items()}
+        
+        # Agents picked by embedding similarity may be described rather than named by keyword
+        unnamed = [agent_key for agent_key in agents if agent_key not in positions]
+        if unnamed and self.embedding_router is not None:
+            positions.update(self.embedding_router.locate(query, unnamed))
+        
+        end = len(query.lower())
+        return {agent_key: positions.get(agent_key, (end, end)) for agent_key in agents}
+    
+    def _llm_based_selection(self, query: str) -> Dict[str, List[str]]:
         """LLM-based agent selection for complex queries"""
         
         system_prompt = f"""You are an intelligent agent selector. Analyze the user's query and determine which agent(s) should handle it.
@@ -101,50 +358,222 @@ Available Agents:
 
 Rules:
 - Select ONE agent for simple, focused tasks
-- Select MULTIPLE agents (in sequence) for complex tasks that require different capabilities
-- Order matters: agents will execute in the order you specify
+- Select MULTIPLE agents for complex tasks that require different capabilities
+- Separate agents with "," when the later agent needs the earlier agent's output
+- Join agents with "+" when they can work independently at the same time
 - Common patterns:
   * Research → Analysis (for data-driven decisions)
   * Research → Creative (for informed content creation)
   * Analysis → Creative (for evaluated proposals)
   * Research → Analysis → Creative (for comprehensive projects)
 
-Respond with ONLY the agent names in order, separated by commas. Examples:
+Respond with ONLY the agent names. Examples:
 - "research"
 - "analysis"
 - "research,analysis"
-- "research,analysis,creative"
+- "research+creative"
+- "research+analysis,creative"
 
 Query: {query}
 
 Selected agents:"""
 
+        messages = [
+            SystemMessage(content=system_prompt),
+            HumanMessage(content=query)
+        ]
+        
+        # The first valid answer, even one arriving after the budget, is cached and logged
+        recorded = threading.Lock()
+        late = threading.Event()
+        sent: List[Future] = []
+        over_budget: Set[Future] = set()
+        
+        def remember(future: Future):
+            self._llm_slots.release()
+            if future.cancelled() or future.exception() is not None:
+                return
+            if future not in over_budget:
+                self._llm_latencies.append(future.result()[1])
+            record(future)
+        
+        def record(future: Future):
+            agent_string, latency_ms = future.result()
+            plan = self._parse_plan(agent_string)
+            if not plan or not recorded.acquire(blocking=False):
+                return
+            if self.routing_cache is not None:
+                self.routing_cache.set(query, plan)
+            if self.decision_log is not None:
+                self.decision_log.record(query, plan, latency_ms)
+            if late.is_set():
+                logger.info(f"Late LLM selection cached for: {query[:100]}")
+                self._count("llm_late")
+        
+        def ask() -> Optional[Future]:
+            # Calls past the budget keep running, so cap them rather than queue new ones behind
+            if not self._llm_slots.acquire(blocking=False):
+                logger.warning("Selector LLM calls all busy, not sending another")
+                return None
+            future = self._llm_pool.submit(self._ask_llm, messages)
+            sent.append(future)
+            future.add_done_callback(remember)
+            return future
+        
+        span = get_tracer().start_span("llm_selection", model=self.llm.model_name)
         try:
-            messages = [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=query)
-            ]
-            
-            response = self.llm.invoke(messages)
-            agent_string = response.content.strip().lower()
-            
-            # Parse the response
-            agents = [a.strip() for a in agent_string.split(',')]
+            winner, outcome = self._await_llm(ask)
+        except Exception as e:
+            get_tracer().end_span(span, str(e))
+            logger.error(f"LLM selection failed: {e}, falling back to {self.routing_mode} selection")
+            self._took(f"llm_failed_{self.routing_mode}_fallback")
+            return self._keyword_plan(query, self._fast_selection(query))
+        
+        fallback = "router" if self.router else self.routing_mode
+        if outcome == "busy":
+            # Nothing was sent, so there is no latency to record and this is not a timeout
+            if span is not None:
+                span.attributes["busy"] = True
+            get_tracer().end_span(span)
+            logger.warning(f"Selector LLM saturated, using the {fallback} plan")
+            self._took("llm_busy_fallback")
+            return self._fallback_plan(query)
+        
+        if winner is None:
+            late.set()
+            # Calls that missed the budget count at the budget, or the hedging p95 would only see fast calls
+            for future in sent:
+                if not future.done() or future.cancelled():
+                    over_budget.add(future)
+                    self._llm_latencies.append(self.selection_budget * 1000)
+            if span is not None:
+                span.attributes["timed_out"] = True
+            get_tracer().end_span(span)
+            logger.warning(f"LLM selection exceeded {self.selection_budget * 1000:.0f} ms, "
+                           f"using the {fallback} plan")
+            self._took("llm_timeout_fallback")
+            return self._fallback_plan(query)
+        
+        if span is not None:
+            span.attributes["hedged"] = outcome == "llm_hedge"
+        get_tracer().end_span(span)
+        # Done callbacks may still be running; cache the winner now so an immediate repeat hits
+        record(winner)
+        agent_string, _ = winner.result()
+        plan = self._parse_plan(agent_string)
+        self._took(outcome)
+        
+        if not plan:
+            logger.warning(f"LLM returned invalid agents: {agent_string}, defaulting to research")
+            return {"research": []}
+        return plan
+    
+    def _ask_llm(self, messages: List[Any]) -> Tuple[str, float]:
+        """One selector call: (normalized answer, latency in ms)"""
+        started = time.perf_counter()
+        response = self.llm.invoke(messages)
+        latency_ms = (time.perf_counter() - started) * 1000
+        return response.content.strip().strip('"').lower(), latency_ms
+    
+    def _await_llm(self, ask) -> Tuple[Optional[Future], str]:
+        """
+        Wait for the selector LLM within SELECTION_BUDGET
+        
+        With SELECTION_HEDGE, a second identical request goes out once the
+        first has taken longer than the p95 of recent calls, and whichever
+        answers first wins. When the budget is up, requests not started yet
+        are cancelled and running ones are left to finish in the background.
+        
+        Args:
+            ask: Starts one LLM request and returns its future, or None when
+                no more requests may be in flight
             
-            # Validate agents
-            valid_agents = [a for a in agents if a in self.agents_info]
+        Returns:
+            (future of the first successful request, "llm" or "llm_hedge"
+            for which request it was), or (None, "timeout") when the budget
+            ran out, or (None, "busy") when no request could be sent
             
-            if not valid_agents:
-                logger.warning(f"LLM returned invalid agents: {agent_string}, defaulting to research")
-                return ["research"]
+        Raises:
+            The last request's error when every request failed
+        """
+        started = time.monotonic()
+        deadline = started + self.selection_budget if self.selection_budget else None
+        hedge_delay = self._hedge_delay()
+        hedge_at = started + hedge_delay if hedge_delay is not None else None
+        
+        first = ask()
+        if first is None:
+            return None, "busy"
+        pending = {first}
+        hedge: Optional[Future] = None
+        error: Optional[BaseException] = None
+        
+        while pending:
+            checkpoints = [t for t in (deadline, hedge_at if hedge is None else None) if t is not None]
+            timeout = max(0.0, min(checkpoints) - time.monotonic()) if checkpoints else None
+            done, pending = wait(pending, timeout, return_when=FIRST_COMPLETED)
             
-            return valid_agents
+            for future in done:
+                if future.exception() is None:
+                    return future, "llm_hedge" if future is hedge else "llm"
+                error = future.exception()
             
-        except Exception as e:
-            logger.error(f"LLM selection failed: {e}, falling back to keyword selection")
-            return self._keyword_based_selection(query)
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                for future in pending:
+                    future.cancel()
+                return None, "timeout"
+            if hedge is None and hedge_at is not None and now >= hedge_at and pending:
+                logger.info(f"LLM selection slower than p95 ({hedge_delay * 1000:.0f} ms), sending hedged request")
+                hedge = ask()
+                if hedge is None:
+                    hedge_at = None
+                else:
+                    pending.add(hedge)
+        
+        raise error
+    
+    def _hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging: the p95 LLM latency, if hedging can help within the budget"""
+        latencies = list(self._llm_latencies)
+        if not self.selection_hedge or len(latencies) < self.MIN_HEDGE_SAMPLES:
+            return None
+        delay = self._p95(latencies) / 1000
+        if self.selection_budget and delay >= self.selection_budget:
+            return None
+        return delay
+    
+    @staticmethod
+    def _p95(values: List[float]) -> float:
+        return statistics.quantiles(values, n=20)[-1]
+    
+    def _fallback_plan(self, query: str) -> Dict[str, List[str]]:
+        """Plan used when the LLM misses its budget: the router's best guess, else keyword/embedding"""
+        plan = self._router_plan(query, min_confidence=0.0)
+        if plan is not None:
+            return plan
+        return self._keyword_plan(query, self._fast_selection(query))
+    
+    def _parse_plan(self, agent_string: str) -> Dict[str, List[str]]:
+        """
+        Parse "a+b,c" into a plan: "+" groups run together, each ","-separated
+        stage depends on every agent in the stages before it
+        """
+        plan = {}
+        earlier: List[str] = []
+        
+        for stage in agent_string.split(','):
+            stage_agents = []
+            for agent_key in (a.strip() for a in stage.split('+')):
+                if agent_key in self.agents_info and agent_key not in plan and agent_key not in stage_agents:
+                    stage_agents.append(agent_key)
+            for agent_key in stage_agents:
+                plan[agent_key] = list(earlier)
+            earlier.extend(stage_agents)
+        
+        return plan
     
-    def explain_selection(self, agents: List[str]) -> str:
+    def explain_selection(self, agents: List[str], plan: Optional[Dict[str, List[str]]] = None) -> str:
         """Generate explanation for why these agents were selected"""
         if len(agents) == 1:
             agent_info = self.agents_info[agents[0]]
@@ -153,6 +582,15 @@ Selected agents:"""
             explanations = []
             for i, agent_key in enumerate(agents, 1):
                 agent_info = self.agents_info[agent_key]
-                explanations.append(f"{i}. {agent_info['name']}")
+                dependencies = (plan or {}).get(agent_key)
+                if dependencies:
+                    names = ", ".join(self.agents_info[d]["name"] for d in dependencies)
+                    explanations.append(f"{i}. {agent_info['name']} (uses {names})")
+                elif plan is not None:
+                    explanations.append(f"{i}. {agent_info['name']} (independent)")
+                else:
+                    explanations.append(f"{i}. {agent_info['name']}")
             
-            return f"Using multiple agents in sequence:\n" + "\n".join(explanations)
+            if plan is not None and not any(plan.values()):
+                return "Using multiple agents in parallel:\n" + "\n".join(explanations)
+            return "Using multiple agents in sequence:\n" + "\n".join(explanations)
@@ -0,0 +1,73 @@
+import logging
+import threading
+from typing import Optional
+
+from agents.cache import CacheStats, LRUCache, SQLiteCache, TieredCache
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    Dify conversation IDs per (session, agent), so that later turns of a
+    session continue the agent's existing Dify conversation instead of
+    starting a new one
+
+    The backing store is pluggable like ResponseCache's: LRUCache,
+    SQLiteCache or TieredCache.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    @staticmethod
+    def make_key(session_id: str, agent_id: str) -> str:
+        return f"{session_id}\x1f{agent_id}"
+
+    def get(self, session_id: Optional[str], agent_id: str) -> Optional[str]:
+        if not session_id:
+            return None
+        entry = self.store.get(self.make_key(session_id, agent_id))
+        return entry["conversation_id"] if entry else None
+
+    def set(self, session_id: Optional[str], agent_id: str, conversation_id: Optional[str]):
+        if session_id and conversation_id:
+            self.store.set(self.make_key(session_id, agent_id), {"conversation_id": conversation_id})
+
+    def forget(self, session_id: Optional[str], agent_id: str):
+        """Drop a mapping, e.g. after Dify rejected the conversation"""
+        if session_id:
+            self.store.delete(self.make_key(session_id, agent_id))
+
+    @property
+    def stats(self) -> CacheStats:
+        return self.store.stats
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """
+    Get the process-wide session store built from config
+
+    Returns:
+        SessionStore backed by an LRU, plus SQLite when SESSION_STORE_PATH is set
+    """
+    global _session_store
+
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                settings = config.sessions
+                persistent = None
+                if settings.sqlite_path:
+                    persistent = SQLiteCache(settings.sqlite_path, ttl=settings.ttl, table="sessions")
+                _session_store = SessionStore(TieredCache(
+                    LRUCache(max_size=settings.max_size, ttl=settings.ttl),
+                    persistent
+                ))
+
+    return _session_store
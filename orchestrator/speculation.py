@@ -0,0 +1,108 @@
+import contextvars
+import logging
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+from agents import BaseDifyAgent, StreamEvent, TokenDelta
+from agents.coalescing import EventReplay
+from tracing import Span, Tracer, use_span
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SpeculationStats:
+    """Outcomes of speculative agent starts"""
+    hits: int = 0
+    misses: int = 0
+    wasted_tokens: int = 0
+    wasted_chars: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "wasted_tokens": self.wasted_tokens,
+            "wasted_chars": self.wasted_chars
+        }
+
+
+class Speculation:
+    """
+    An agent started before selection has confirmed it
+
+    Events are recorded rather than published; if the guess is confirmed the
+    execute step adopts the run by replaying and then following the stream,
+    otherwise it is cancelled and its output counted as waste.
+    """
+
+    def __init__(
+        self,
+        agent_key: str,
+        agent: BaseDifyAgent,
+        query: str,
+        context: Dict[str, Any],
+        deadline: Optional[float],
+        slot: Optional[threading.BoundedSemaphore] = None,
+        span: Optional[Span] = None,
+        bypass_cache: bool = False
+    ):
+        self.agent_key = agent_key
+        self.agent = agent
+        self.span = span
+        self.replay = EventReplay()
+        self._cancelled = threading.Event()
+        self._args = (query, context, deadline, bypass_cache)
+        self._slot = slot
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._run,),
+            name=f"speculate-{agent_key}",
+            daemon=True
+        )
+
+    def start(self) -> "Speculation":
+        logger.info(f"Speculatively starting {self.agent.agent_name}")
+        self._thread.start()
+        return self
+
+    def _run(self):
+        query, context, deadline, bypass_cache = self._args
+        try:
+            with use_span(self.span), self._slot or nullcontext():
+                # Not coalesced: identical real calls must not follow a run that may be cancelled
+                events = self.agent.execute_stream(
+                    query, context=context, bypass_cache=bypass_cache, deadline=deadline, coalesce=False
+                )
+                for event in events:
+                    if self._cancelled.is_set():
+                        break
+                    self.replay.publish(event)
+        except Exception as e:
+            logger.error(f"Speculative {self.agent.agent_name} failed: {e}")
+        finally:
+            self.replay.finish()
+
+    def events(self) -> Iterator[StreamEvent]:
+        """Recorded events so far, then the rest as they arrive"""
+        return self.replay.follow()
+
+    def cancel(self, stats: Optional[SpeculationStats] = None):
+        """Stop the run and count what it produced; the connection closes once its next chunk arrives"""
+        self._cancelled.set()
+        with self.replay.cond:
+            tokens = [e for e in self.replay.events if isinstance(e, TokenDelta)]
+        if stats is not None:
+            stats.wasted_tokens += len(tokens)
+            stats.wasted_chars += sum(len(e.text) for e in tokens)
+        if self.span is not None:
+            self.span.set(cancelled=True, wasted_tokens=len(tokens))
+            Tracer.end_span(self.span)
@@ -0,0 +1,25 @@
+"""
+Tokenization and hashing shared by the keyword matcher and the routers
+
+Keeping them in one place means a word is the same thing to every part of
+agent selection, and a hashed feature lands in the same bucket in every
+process that builds or loads a model.
+"""
+import re
+import zlib
+
+# A word for matching and routing purposes
+WORD = re.compile(r"\w+")
+
+# Common words, and the chat filler around answers, that say nothing about the topic
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can could did do does for from had has have how i if in "
+    "into is it its may me more most my not of on or our should so such than that the their them then "
+    "there these they this those to was we were what when which while who will with would you your "
+    "certainly details feel free glad happy help helps here hope know let like ll overview sure".split()
+)
+
+
+def stable_hash(feature: str) -> int:
+    """CRC32 of a feature string; stable across processes, unlike hash()"""
+    return zlib.crc32(feature.encode("utf-8"))
@@ -0,0 +1,42 @@
+"""
+Shared fixtures; every test runs against mock_dify_server, never a live Dify
+"""
+import os
+
+# config refuses to load without these; the values are never sent anywhere real
+os.environ.setdefault("OPENAI_API_KEY", "test-openai-key")
+os.environ.setdefault("DIFY_API_KEY", "test-dify-key")
+for name in ("RESEARCH_AGENT_ID", "ANALYSIS_AGENT_ID", "CREATIVE_AGENT_ID"):
+    os.environ.setdefault(name, name.lower())
+os.environ.setdefault("DIFY_BASE_URL", "http://127.0.0.1:9/v1")
+
+import pytest
+
+from mock_dify_server import running_mock_dify
+
+
+@pytest.fixture
+def make_brain():
+    """Build LangGraphBrains (with any constructor arguments) whose agents all talk to one mock server"""
+    from agents.cache import LRUCache, ResponseCache
+    from orchestrator.brain import LangGraphBrain
+
+    with running_mock_dify(token_delay=0.01, answer_tokens=5) as server:
+        def build(**kwargs):
+            kwargs.setdefault("speculative", False)
+            brain = LangGraphBrain(**kwargs)
+            for agent in brain.agents.values():
+                agent.dify_base_url = server.url
+                agent.retry_policy.max_attempts = 1
+                # A fresh cache per test; the process-wide one would leak answers between tests
+                agent.cache = ResponseCache(LRUCache())
+            brain.mock = server
+            return brain
+
+        yield build
+
+
+@pytest.fixture
+def brain(make_brain):
+    """LangGraphBrain whose agents all talk to one mock server (the server is brain.mock)"""
+    return make_brain()
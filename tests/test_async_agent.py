@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+from agents.streaming import MessageEnd, StreamError, TokenDelta
+from agents.transport import get_async_client
+from mock_dify_server import mock_dify_agent
+
+
+def test_async_answer_matches_sync():
+    with mock_dify_agent(answer_tokens=5) as (agent, server):
+        sync = agent.execute("same question")
+        result = asyncio.run(agent.aexecute("same question"))
+
+        assert result.success
+        assert result.content == sync.content == "".join(f"token{i} " for i in range(5))
+        assert result.metadata["conversation_id"]
+        assert server.stats.streams == 2
+
+
+def test_async_stream_yields_tokens_then_end():
+    async def collect():
+        return [event async for event in agent.aexecute_stream("stream me")]
+
+    with mock_dify_agent(answer_tokens=3, token_delay=0.01) as (agent, _):
+        events = asyncio.run(collect())
+
+    assert [type(e) for e in events] == [TokenDelta] * 3 + [MessageEnd]
+    assert not events[-1].truncated
+
+
+def test_concurrent_calls_share_one_client_without_threads():
+    async def main():
+        clients = set()
+
+        async def one(i):
+            clients.add(id(get_async_client()))
+            return await agent.aexecute(f"query {i}")
+
+        started = time.monotonic()
+        results = await asyncio.gather(*(one(i) for i in range(20)))
+        return results, clients, time.monotonic() - started
+
+    with mock_dify_agent(answer_tokens=5, token_delay=0.05) as (agent, server):
+        results, clients, elapsed = asyncio.run(main())
+
+    assert all(r.success for r in results)
+    assert len(clients) == 1
+    # 20 streams of ~0.25 s each overlap on one event loop
+    assert elapsed < 2.0
+    assert server.stats.streams == 20
+
+
+def test_async_http_error_is_a_stream_error():
+    async def collect():
+        return [event async for event in agent.aexecute_stream("fails")]
+
+    with mock_dify_agent(error_rate=1.0) as (agent, _):
+        agent.retry_policy.max_attempts = 1
+        events = asyncio.run(collect())
+        result = asyncio.run(agent.aexecute("fails too"))
+
+    assert len(events) == 1 and isinstance(events[0], StreamError)
+    assert not result.success and result.error
@@ -0,0 +1,80 @@
+import threading
+import time
+
+from mock_dify_server import mock_dify_agent
+
+
+def _count_concurrency(agent):
+    """Wrap agent.execute to record the most calls it had in flight at once"""
+    execute = agent.execute
+    lock = threading.Lock()
+    state = {"now": 0, "peak": 0}
+
+    def counted(*args, **kwargs):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        try:
+            return execute(*args, **kwargs)
+        finally:
+            with lock:
+                state["now"] -= 1
+
+    agent.execute = counted
+    return state
+
+
+def test_results_come_back_in_input_order(brain):
+    two_agents = " and separately compare the options"
+    queries = [f"research the history of tea number {i}" + (two_agents if i % 2 else "") for i in range(6)]
+    brain.mock.config.ttfb = 0.05
+    results = brain.process_many(queries, max_concurrency=3)
+
+    assert [r.success for r in results] == [True] * 6
+    assert [len(r.agents_used) for r in results] == [1, 2, 1, 2, 1, 2]
+
+
+def test_per_agent_limit_caps_concurrent_calls(brain):
+    brain.mock.config.ttfb = 0.1
+    state = _count_concurrency(brain.agents["research"])
+    queries = [f"research the history of coffee number {i}" for i in range(4)]
+    results = brain.process_many(queries, max_concurrency=4, per_agent_limit={"research": 1})
+
+    assert all(r.success for r in results)
+    assert state["peak"] == 1
+
+
+def test_failing_item_does_not_fail_the_batch(brain):
+    process_query = brain.process_query
+
+    def flaky(query, *args, **kwargs):
+        if "broken" in query:
+            raise RuntimeError("item exploded")
+        return process_query(query, *args, **kwargs)
+
+    brain.process_query = flaky
+    results = brain.process_many(["research tea", "broken research", "research coffee"], max_concurrency=2)
+
+    assert [r.success for r in results] == [True, False, True]
+    assert "item exploded" in results[1].error
+
+
+def test_agent_batch_runs_on_one_loop_in_input_order():
+    with mock_dify_agent(ttfb=0.2, answer_tokens=2) as (agent, server):
+        started = time.monotonic()
+        responses = agent.execute_many([f"query {i}" for i in range(10)], max_concurrency=5)
+        elapsed = time.monotonic() - started
+
+    assert [r.success for r in responses] == [True] * 10
+    assert server.stats.streams == 10
+    # Two waves of five calls
+    assert 0.4 <= elapsed < 1.0
+
+
+def test_agent_batch_reports_failures_per_item():
+    with mock_dify_agent(error_first=1, answer_tokens=2) as (agent, server):
+        agent.retry_policy.max_attempts = 1
+        responses = agent.execute_many(["first", "second", "third"], max_concurrency=1)
+
+    assert [r.success for r in responses] == [False, True, True]
+    assert responses[0].error
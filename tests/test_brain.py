@@ -0,0 +1,96 @@
+import threading
+
+from agents.cache import LRUCache, SQLiteCache, TieredCache
+from agents.timeouts import deadline_after
+from orchestrator.sessions import SessionStore
+
+
+def _run(brain, query, deadline=None, session_id=None, agent_key="research"):
+    return brain._run_agent(f"run-{session_id}-{query}", agent_key, query, {}, deadline, lambda event: None,
+                            session_id=session_id)
+
+
+def test_http_error_near_budget_is_not_dropped(brain):
+    brain.mock.config.error_rate = 1.0
+    record = _run(brain, "failing call", deadline=deadline_after(0.3))
+
+    assert not record["success"]
+    assert not record["dropped"]
+
+
+def test_timeout_at_budget_is_dropped(brain):
+    brain.mock.config.ttfb = 2.0
+    record = _run(brain, "hanging call", deadline=deadline_after(0.3))
+
+    assert not record["success"]
+    assert record["dropped"]
+
+
+def test_sessions_with_same_opening_get_own_conversations(brain):
+    brain.mock.config.ttfb = 0.1
+    agent = brain.agents["research"]
+    threads = [threading.Thread(target=_run, args=(brain, "same opening"), kwargs={"session_id": s})
+               for s in ("alice", "bob")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    alice = brain.sessions.get("alice", agent.agent_id)
+    bob = brain.sessions.get("bob", agent.agent_id)
+    assert alice and bob and alice != bob
+    assert brain.mock.stats.streams == 2
+
+
+def test_cached_answer_does_not_start_a_session(brain):
+    agent = brain.agents["research"]
+    assert agent.cache is not None
+    agent.execute("cached opening")
+
+    record = _run(brain, "cached opening", session_id="carol")
+
+    assert not record["metadata"]["cached"]
+    assert brain.sessions.get("carol", agent.agent_id) == record["metadata"]["conversation_id"]
+    assert brain.mock.stats.streams == 2
+
+
+def test_second_turn_continues_the_conversation(brain):
+    agent = brain.agents["research"]
+    first = _run(brain, "first turn", session_id="dave")
+    second = _run(brain, "second turn", session_id="dave")
+
+    assert first["success"] and second["success"]
+    assert brain.mock.stats.conversation_ids == [None, first["metadata"]["conversation_id"]]
+    assert brain.sessions.get("dave", agent.agent_id) == first["metadata"]["conversation_id"]
+
+
+def test_transient_failure_keeps_the_conversation(brain):
+    conversation_id = _run(brain, "first turn", session_id="erin")["metadata"]["conversation_id"]
+
+    brain.mock.config.error_rate = 1.0
+    assert not _run(brain, "failing turn", session_id="erin")["success"]
+    brain.mock.config.error_rate = 0.0
+    assert _run(brain, "third turn", session_id="erin")["success"]
+
+    assert brain.mock.stats.conversation_ids == [None, conversation_id, conversation_id]
+
+
+def test_rejected_conversation_is_forgotten(brain):
+    agent = brain.agents["research"]
+    brain.sessions.set("frank", agent.agent_id, "expired-conversation")
+
+    record = _run(brain, "after expiry", session_id="frank")
+    assert not record["success"] and record["metadata"]["conversation_rejected"]
+    assert brain.sessions.get("frank", agent.agent_id) is None
+
+    assert _run(brain, "fresh start", session_id="frank")["success"]
+    assert brain.mock.stats.conversation_ids == ["expired-conversation", None]
+
+
+def test_sqlite_sessions_survive_a_new_store(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    SessionStore(TieredCache(LRUCache(), SQLiteCache(path, table="sessions"))).set("gina", "agent", "conv-1")
+
+    reopened = SessionStore(TieredCache(LRUCache(), SQLiteCache(path, table="sessions")))
+    assert reopened.get("gina", "agent") == "conv-1"
+    assert reopened.get("gina", "other agent") is None
@@ -0,0 +1,63 @@
+import time
+
+from agents.cache import LRUCache, ResponseCache, SQLiteCache, TieredCache
+from mock_dify_server import mock_dify_agent
+
+
+def _agent_cache():
+    return ResponseCache(LRUCache(max_size=8, ttl=60))
+
+
+def test_lru_entries_expire_and_evict():
+    cache = LRUCache(max_size=2, ttl=0.05)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+
+    assert cache.get("a") is None
+    assert cache.stats.evictions == 1
+    time.sleep(0.06)
+    assert cache.get("b") is None
+    assert cache.stats.expirations == 1
+
+
+def test_promoted_entries_keep_their_expiry(tmp_path):
+    persistent = SQLiteCache(str(tmp_path / "cache.db"), ttl=60)
+    persistent.set("key", {"content": "old"}, ttl=0.1)
+    cache = TieredCache(LRUCache(max_size=8, ttl=60), persistent)
+
+    assert cache.get("key") == {"content": "old"}
+    time.sleep(0.15)
+    assert cache.get("key") is None
+
+
+def test_repeated_query_is_served_from_cache():
+    with mock_dify_agent(answer_tokens=3) as (agent, server):
+        agent.cache = _agent_cache()
+        first = agent.execute("What is  caching?")
+        second = agent.execute("what is caching?")
+
+        assert second.metadata["cached"]
+        assert second.content == first.content
+        assert server.stats.streams == 1
+
+
+def test_answers_without_message_end_are_not_cached():
+    with mock_dify_agent(answer_tokens=3, send_message_end=False) as (agent, server):
+        agent.cache = _agent_cache()
+        first = agent.execute("cut off")
+        second = agent.execute("cut off")
+
+        assert first.success and first.content
+        assert not second.metadata["cached"]
+        assert server.stats.streams == 2
+
+
+def test_answers_in_a_conversation_are_not_cached():
+    with mock_dify_agent(answer_tokens=3) as (agent, server):
+        agent.cache = _agent_cache()
+        first = agent.execute("follow-up")
+        agent.execute("follow-up", conversation_id=first.metadata["conversation_id"])
+
+        assert len(agent.cache.store) == 1
+        assert server.stats.streams == 2
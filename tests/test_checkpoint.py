@@ -0,0 +1,62 @@
+import pytest
+
+from mock_dify_server import running_mock_dify
+
+DEPENDENT_QUERY = "research the history of tea and then analyze it"
+
+
+def _fail_then_record(brain, agent_key, dead_url):
+    """Point agent_key at a dead server and record the context of every later call"""
+    agent = brain.agents[agent_key]
+    live_url, agent.dify_base_url = agent.dify_base_url, dead_url
+    contexts = []
+    execute = agent.execute
+
+    def recording(query, **kwargs):
+        contexts.append(kwargs.get("context"))
+        return execute(query, **kwargs)
+
+    agent.execute = recording
+    return live_url, contexts
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_resume_reruns_only_the_failed_agent(make_brain, tmp_path, pipelined):
+    brain = make_brain(checkpoint_path=str(tmp_path / "runs.db"), pipelined=pipelined)
+    with running_mock_dify() as dead:
+        dead_url = dead.url
+    live_url, contexts = _fail_then_record(brain, "analysis", dead_url)
+
+    first = brain.process_query(DEPENDENT_QUERY)
+    assert first.run_id
+    assert [d["success"] for d in first.agent_details] == [True, False]
+
+    brain.agents["analysis"].dify_base_url = live_url
+    streams = brain.mock.stats.streams
+    resumed = brain.resume(first.run_id)
+
+    assert resumed.success
+    assert [d["success"] for d in resumed.agent_details] == [True, True]
+    assert resumed.agent_details[0] == first.agent_details[0]
+    assert brain.mock.stats.streams == streams + 1
+    # The re-run agent still gets the kept upstream answer
+    upstream = contexts[-1]["previous_results"]
+    assert [entry["agent"] for entry in upstream] == [brain.agents["research"].agent_name]
+    assert upstream[0]["response"]
+
+
+def test_complete_run_is_not_rerun(make_brain, tmp_path):
+    brain = make_brain(checkpoint_path=str(tmp_path / "runs.db"))
+    first = brain.process_query(DEPENDENT_QUERY)
+    streams = brain.mock.stats.streams
+
+    resumed = brain.resume(first.run_id)
+
+    assert resumed.response == first.response
+    assert brain.mock.stats.streams == streams
+
+
+def test_unknown_run_is_an_error(make_brain, tmp_path):
+    brain = make_brain(checkpoint_path=str(tmp_path / "runs.db"))
+
+    assert not brain.resume("no-such-run").success
@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+
+from agents.coalescing import AsyncSingleFlight, SingleFlight
+from agents.streaming import MessageEnd, StreamError, TokenDelta
+from agents.timeouts import deadline_after
+from mock_dify_server import mock_dify_agent
+
+
+def _last(events):
+    return list(events)[-1]
+
+
+def _later(delay, target, *args):
+    result = {}
+
+    def run():
+        time.sleep(delay)
+        result["value"] = target(*args)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, result
+
+
+def test_follower_finishes_after_leader_stops_reading():
+    with mock_dify_agent(coalesce=True, ttfb=0.1, token_delay=0.05, answer_tokens=10) as (agent, server):
+        thread, follower = _later(0.05, lambda: _last(agent.execute_stream("abandoned leader")))
+        leader = agent.execute_stream("abandoned leader")
+        assert isinstance(next(leader), TokenDelta)
+        leader.close()
+        thread.join()
+
+        assert isinstance(follower["value"], MessageEnd)
+        assert not follower["value"].truncated
+        assert server.stats.streams == 1
+
+
+def test_async_follower_finishes_after_leader_stops_reading():
+    async def main():
+        async def follow():
+            await asyncio.sleep(0.05)
+            return [e async for e in agent.aexecute_stream("abandoned async leader")][-1]
+
+        task = asyncio.create_task(follow())
+        leader = agent.aexecute_stream("abandoned async leader")
+        assert isinstance(await leader.__anext__(), TokenDelta)
+        await leader.aclose()
+        return await task
+
+    with mock_dify_agent(coalesce=True, ttfb=0.1, token_delay=0.05, answer_tokens=10) as (agent, server):
+        assert isinstance(asyncio.run(main()), MessageEnd)
+        assert server.stats.streams == 1
+
+
+def test_long_deadline_does_not_join_short_one():
+    with mock_dify_agent(coalesce=True, ttfb=0.1, token_delay=0.05, answer_tokens=10) as (agent, server):
+        thread, patient = _later(
+            0.05, lambda: _last(agent.execute_stream("deadlines", deadline=deadline_after(5)))
+        )
+        hurried = _last(agent.execute_stream("deadlines", deadline=deadline_after(0.3)))
+        thread.join()
+
+        assert hurried.truncated
+        assert isinstance(patient["value"], MessageEnd)
+        assert not patient["value"].truncated
+        assert server.stats.streams == 2
+
+
+def test_users_do_not_share_streams():
+    with mock_dify_agent(coalesce=True, ttfb=0.1, token_delay=0.02) as (agent, server):
+        thread, bob = _later(0.02, lambda: _last(agent.execute_stream("same words", user_id="bob")))
+        alice = _last(agent.execute_stream("same words", user_id="alice"))
+        thread.join()
+
+        assert alice.conversation_id != bob["value"].conversation_id
+        assert server.stats.streams == 2
+
+
+def test_abandoned_flight_without_followers_stops_upstream():
+    closed = threading.Event()
+
+    def produce():
+        try:
+            while True:
+                yield TokenDelta(text="x")
+        finally:
+            closed.set()
+
+    flight = SingleFlight()
+    stream = flight.stream("key", produce)
+    next(stream)
+    stream.close()
+
+    assert closed.is_set()
+    assert flight.stats.handoffs == 0
+    # A new caller starts afresh rather than joining the dead flight
+    assert isinstance(next(flight.stream("key", lambda: iter([StreamError(error="new")]))), StreamError)
+
+
+def test_async_short_budget_caller_joins_long_flight():
+    async def main():
+        flight = AsyncSingleFlight()
+        gate = asyncio.Event()
+
+        async def produce():
+            yield TokenDelta(text="partial ")
+            await gate.wait()
+            yield MessageEnd(conversation_id="shared")
+
+        async def collect(deadline):
+            started = time.monotonic()
+            events = [e async for e in flight.stream("key", produce, deadline)]
+            return events, time.monotonic() - started
+
+        leader = asyncio.create_task(collect(deadline_after(5)))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(collect(deadline_after(0.3)))
+        await asyncio.sleep(1.0)
+        gate.set()
+        return await asyncio.gather(leader, follower), flight.stats
+
+    ((leader, _), (follower, waited)), stats = asyncio.run(main())
+    assert (stats.leaders, stats.joined) == (1, 1)
+    # The follower gives up at its own deadline instead of waiting for the leader's stream
+    assert waited < 0.6
+    assert follower == [TokenDelta(text="partial "), MessageEnd(truncated=True)]
+    assert leader[-1] == MessageEnd(conversation_id="shared")
+
+
+def test_short_budget_follower_stops_at_its_deadline():
+    flight = SingleFlight()
+    gate = threading.Event()
+
+    def produce():
+        yield TokenDelta(text="partial ")
+        gate.wait()
+        yield MessageEnd(conversation_id="shared")
+
+    thread, leader = _later(0, lambda: list(flight.stream("key", produce, deadline_after(5))))
+    time.sleep(0.05)
+    started = time.monotonic()
+    follower = list(flight.stream("key", produce, deadline_after(0.3)))
+    waited = time.monotonic() - started
+    gate.set()
+    thread.join()
+
+    assert waited < 0.6
+    assert follower == [TokenDelta(text="partial "), MessageEnd(truncated=True)]
+    assert leader["value"][-1] == MessageEnd(conversation_id="shared")
+
+
+def test_follower_without_tokens_times_out():
+    flight = SingleFlight()
+    gate = threading.Event()
+
+    def produce():
+        gate.wait()
+        yield MessageEnd()
+
+    thread, _ = _later(0, lambda: list(flight.stream("key", produce, deadline_after(5))))
+    time.sleep(0.05)
+    (event,) = list(flight.stream("key", produce, deadline_after(0.2)))
+    gate.set()
+    thread.join()
+
+    assert isinstance(event, StreamError) and event.timed_out and not event.retryable
+
+
+def test_cancelled_async_leader_keeps_the_stream_for_followers():
+    async def main():
+        flight = AsyncSingleFlight()
+
+        async def produce():
+            for i in range(5):
+                await asyncio.sleep(0.05)
+                yield TokenDelta(text=f"t{i} ")
+            yield MessageEnd(conversation_id="shared")
+
+        async def collect():
+            return [e async for e in flight.stream("key", produce, deadline_after(5))]
+
+        leader = asyncio.create_task(collect())
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(collect())
+        await asyncio.sleep(0.12)
+        leader.cancel()
+        return await follower, leader, flight.stats
+
+    events, leader, stats = asyncio.run(main())
+    assert leader.cancelled()
+    assert "".join(e.text for e in events if isinstance(e, TokenDelta)) == "t0 t1 t2 t3 t4 "
+    assert events[-1] == MessageEnd(conversation_id="shared")
+    assert stats.handoffs == 1
@@ -0,0 +1,64 @@
+from orchestrator.compaction import ContextCompactor, compact, estimate_tokens, split_sentences
+
+ANSWER = (
+    "Sure! Here is an overview. "
+    "Tea was first cultivated in southwest China thousands of years ago. "
+    "Chinese tea culture spread to Japan with Buddhist monks in the ninth century. "
+    "Dutch traders brought tea from China to Europe in the seventeenth century. "
+    "British demand for Chinese tea led to plantations in India and Ceylon. "
+    "Hope this helps!"
+)
+
+
+def test_text_within_budget_is_unchanged():
+    assert compact(ANSWER, estimate_tokens(ANSWER)) == ANSWER
+
+
+def test_long_text_keeps_central_sentences_in_order():
+    sentences = split_sentences(ANSWER)
+    compacted = compact(ANSWER, 40)
+
+    assert estimate_tokens(compacted) <= 40
+    kept = split_sentences(compacted)
+    assert kept and all(s in sentences for s in kept)
+    assert kept == sorted(kept, key=sentences.index)
+    assert "Hope this helps!" not in kept and "Sure!" not in kept
+
+
+def test_list_items_are_sentences():
+    text = "Options:\n- green tea\n- black tea\n\nBoth contain caffeine. Green has less."
+    assert split_sentences(text) == ["Options:", "- green tea", "- black tea", "Both contain caffeine.", "Green has less."]
+
+
+def test_oversized_sentence_falls_back_to_its_prefix():
+    sentence = "Tea " * 200 + "is popular."
+    assert compact(sentence, 10) == sentence[:40]
+
+
+def test_compact_all_shares_the_budget():
+    compactor = ContextCompactor()
+    compacted = compactor.compact_all({"research": ANSWER, "analysis": ANSWER}, 60)
+
+    assert set(compacted) == {"research", "analysis"}
+    assert all(estimate_tokens(text) <= 30 for text in compacted.values())
+    # The same answer at the same budget is compacted once
+    assert compactor.stats.hits == 1
+
+
+def test_downstream_agent_gets_upstream_answer_within_its_budget(make_brain):
+    brain = make_brain(pipelined=False)
+    brain.mock.config.answer_tokens = 200
+    brain.mock.config.token_delay = 0.0
+    brain.context_budgets["analysis"] = 50
+    previous = {}
+    execute = brain.agents["analysis"].execute
+
+    def recorded(query, *args, context=None, **kwargs):
+        previous.update(results=(context or {}).get("previous_results"))
+        return execute(query, *args, context=context, **kwargs)
+
+    brain.agents["analysis"].execute = recorded
+    assert brain.process_query("research the history of tea and then analyze it").success
+
+    (handed_over,) = previous["results"]
+    assert 0 < estimate_tokens(handed_over["response"]) <= 50
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from orchestrator.embedding_router import EmbeddingRouter, char_ngram_counts
+
+
+@pytest.fixture
+def router():
+    return EmbeddingRouter({
+        "research": ["Finds facts and sources on a topic", "research investigate history find"],
+        "analysis": ["Compares options and evaluates trade-offs", "analyze compare evaluate"],
+        "creative": ["Writes poems and stories", "write poem story creative"],
+        "empty": ["  "],
+    })
+
+
+def test_agents_without_text_are_left_out(router):
+    assert router.agent_keys == ["research", "analysis", "creative"]
+
+
+@pytest.mark.parametrize("query, agent_key", [
+    ("investigating the history of tea", "research"),
+    ("summarise the trade-offs between them", "analysis"),
+    ("write me a poem", "creative"),
+])
+def test_wordings_outside_the_keywords_reach_the_right_agent(router, query, agent_key):
+    (best, score), *rest = router.top_k(query, 3)
+    assert best == agent_key
+    assert all(score > other for _, other in rest)
+
+
+def test_stopword_only_queries_match_nothing(router):
+    assert char_ngram_counts("the and of", 64)[0].size == 0
+    assert not router.scores("the and of").any()
+
+
+def test_embedding_ignores_case():
+    first = char_ngram_counts("history of tea", 2 ** 12)
+    second = char_ngram_counts("History of TEA", 2 ** 12)
+    assert np.array_equal(first[0], second[0]) and np.array_equal(first[1], second[1])
+
+
+def test_locate_finds_the_word_closest_to_each_agent(router):
+    query = "dig up the history of tea, then write poems"
+    found = router.locate(query, ["research", "creative"])
+    assert {k: query[start:end] for k, (start, end) in found.items()} == {
+        "research": "history", "creative": "write",
+    }
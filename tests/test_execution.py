@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from orchestrator.pipeline import run_pipeline
+from orchestrator.selector import AgentSelector
+
+
+def _record_calls(brain):
+    """Wrap every agent's execute to log (agent key, start, end, context) per call"""
+    calls = []
+    lock = threading.Lock()
+
+    def wrap(agent_key, execute):
+        def recorded(query, *args, context=None, **kwargs):
+            start = time.monotonic()
+            try:
+                return execute(query, *args, context=context, **kwargs)
+            finally:
+                with lock:
+                    calls.append({"agent_key": agent_key, "start": start, "end": time.monotonic(),
+                                  "context": context or {}})
+        return recorded
+
+    for agent_key, agent in brain.agents.items():
+        agent.execute = wrap(agent_key, agent.execute)
+    return calls
+
+
+@pytest.mark.parametrize("agent_string, plan", [
+    ("research", {"research": []}),
+    ("research+analysis", {"research": [], "analysis": []}),
+    ("research,analysis", {"research": [], "analysis": ["research"]}),
+    ("research+analysis,creative", {"research": [], "analysis": [], "creative": ["research", "analysis"]}),
+    ("research, nonsense, research", {"research": []}),
+])
+def test_llm_answers_parse_into_plans(agent_string, plan):
+    assert AgentSelector()._parse_plan(agent_string) == plan
+
+
+def test_independent_agents_run_at_the_same_time(make_brain):
+    brain = make_brain(pipelined=False)
+    brain.mock.config.ttfb = 0.3
+    calls = _record_calls(brain)
+    result = brain.process_query("research the history of tea and separately compare the options")
+
+    assert result.success
+    research, analysis = sorted(calls, key=lambda c: c["agent_key"], reverse=True)
+    assert research["start"] < analysis["end"] and analysis["start"] < research["end"]
+    assert "previous_results" not in research["context"]
+    assert "previous_results" not in analysis["context"]
+
+
+def test_dependent_agent_gets_upstream_answer(make_brain):
+    brain = make_brain(pipelined=False)
+    calls = _record_calls(brain)
+    result = brain.process_query("research the history of tea and then analyze it")
+
+    assert result.success
+    research, analysis = sorted(calls, key=lambda c: c["start"])
+    assert (research["agent_key"], analysis["agent_key"]) == ("research", "analysis")
+    assert analysis["start"] >= research["end"]
+    assert [p["agent"] for p in analysis["context"]["previous_results"]] == [brain.agents["research"].agent_name]
+
+
+def _streaming_runner(texts, delay, log):
+    """run_agent for run_pipeline that streams each agent's text one character per delay"""
+    def run_agent(agent_key, upstream, on_token):
+        log.append(("start", agent_key, dict(upstream)))
+        for char in texts[agent_key]:
+            time.sleep(delay)
+            on_token(char)
+        log.append(("end", agent_key))
+        return {"agent_key": agent_key, "success": texts[agent_key] != "", "content": texts[agent_key]}
+    return run_agent
+
+
+def test_downstream_starts_on_the_upstream_prefix():
+    log = []
+    texts = {"research": "0123456789", "analysis": "ab"}
+    run_pipeline({"research": [], "analysis": ["research"]}, _streaming_runner(texts, 0.02, log), 4)
+
+    starts = [entry for entry in log if entry[0] == "start"]
+    assert starts[1] == ("start", "analysis", {"research": "0123"})
+    assert log.index(starts[1]) < log.index(("end", "research"))
+
+
+def test_failed_upstream_hands_over_nothing():
+    log = []
+    texts = {"research": "", "analysis": "ab"}
+    records = run_pipeline({"research": [], "analysis": ["research"]}, _streaming_runner(texts, 0.0, log), 4)
+
+    assert ("start", "analysis", {}) in log
+    assert [r["success"] for r in records] == [False, True]
+
+
+def test_pipelined_brain_overlaps_dependent_agents(make_brain):
+    brain = make_brain(pipelined=True)
+    brain.PREVIOUS_RESULT_CHARS = 14  # Two of the mock's five tokens
+    brain.mock.config.token_delay = 0.1
+    calls = _record_calls(brain)
+    result = brain.process_query("research the history of tea and then analyze it")
+
+    assert result.success
+    research, analysis = sorted(calls, key=lambda c: c["start"])
+    assert (research["agent_key"], analysis["agent_key"]) == ("research", "analysis")
+    assert analysis["start"] < research["end"]
+    assert [p["agent"] for p in analysis["context"]["previous_results"]] == [brain.agents["research"].agent_name]
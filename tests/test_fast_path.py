@@ -0,0 +1,44 @@
+import pytest
+
+QUERIES = [
+    "research the history of tea",
+    "research the history of tea and separately compare the options",
+    "research the history of tea and then analyze it",
+]
+
+
+def _comparable(result):
+    # Conversation and message IDs are minted per call by the mock server
+    return {
+        "response": result.response,
+        "agents_used": result.agents_used,
+        "success": result.success,
+        "dropped_agents": result.dropped_agents,
+        "details": [(d["agent_key"], d["content"], d["success"]) for d in result.agent_details],
+    }
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_fast_path_matches_graph(make_brain, query):
+    graph_brain = make_brain(fast_path=False)
+    fast_brain = make_brain(fast_path=True)
+
+    def no_graph(*args, **kwargs):
+        raise AssertionError("fast path went through the compiled graph")
+
+    fast_brain.graph.invoke = no_graph
+
+    graph_result = graph_brain.process_query(query)
+    fast_result = fast_brain.process_query(query)
+
+    assert graph_result.success
+    assert _comparable(fast_result) == _comparable(graph_result)
+
+
+def test_checkpointed_brain_uses_the_graph(make_brain, tmp_path):
+    brain = make_brain(fast_path=True, checkpoint_path=str(tmp_path / "runs.db"))
+
+    result = brain.process_query(QUERIES[0])
+
+    assert result.success
+    assert brain.graph.get_state(brain._run_config(result.run_id)).values["final_response"] == result.response
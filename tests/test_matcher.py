@@ -0,0 +1,48 @@
+import pytest
+
+from orchestrator.matcher import AgentMatch, KeywordMatcher, inflections
+
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher({
+        "research": ["research", "what", "history"],
+        "analysis": ["analyze", "data", "compare"],
+        "creative": ["write", "story", "short story"],
+    })
+
+
+@pytest.mark.parametrize("query", ["whatever happened", "database migration", "rewrite it", "prehistory"])
+def test_keywords_match_whole_words_only(matcher, query):
+    assert matcher.match(query) == {}
+
+
+def test_inflections_match(matcher):
+    assert matcher.match("Analyzing the data")["analysis"] == AgentMatch(2, 0, 9, ["analyze", "data"])
+    assert matcher.match("researchers researched it")["research"].keywords == ["research"]
+
+
+def test_score_counts_distinct_keywords(matcher):
+    matches = matcher.match("compare the data, then compare more data")
+    assert matches["analysis"].score == 2
+
+
+def test_longest_phrase_wins(matcher):
+    query = "write me a short story"
+    found = matcher.match(query)["creative"]
+    assert found.keywords == ["write", "short story"]
+    assert query[found.start:found.end] == "write"
+
+
+def test_start_locates_the_first_keyword_per_agent(matcher):
+    query = "Tell me the history, then analyze it"
+    matches = matcher.match(query)
+    assert query[matches["research"].start:matches["research"].end] == "history"
+    assert query[matches["analysis"].start:matches["analysis"].end] == "analyze"
+
+
+def test_inflections_drop_final_e_and_keep_leading_words():
+    assert {"analyzing", "analyzed", "analyze"} <= inflections("analyze")
+    phrases = inflections("Short  Story")
+    assert "short story" in phrases and all(p.startswith("short ") for p in phrases)
+    assert inflections("  ") == set()
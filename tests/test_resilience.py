@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+import weakref
+
+from agents import transport
+from agents.resilience import CircuitBreaker, RetryPolicy
+from agents.streaming import TokenDelta
+from agents.timeouts import deadline_after
+from config import config
+from mock_dify_server import mock_dify_agent
+
+
+def test_deadline_timeouts_leave_the_breaker_alone():
+    with mock_dify_agent(ttfb=3.0) as (agent, server):
+        for _ in range(agent.breaker.failure_threshold):
+            response = agent.execute("hang", deadline=deadline_after(0.2))
+            assert response.metadata["timed_out"]
+
+        assert agent.breaker.state == CircuitBreaker.CLOSED
+        assert agent.is_available()
+
+
+def test_phase_timeouts_open_the_breaker():
+    with mock_dify_agent(ttfb=3.0) as (agent, server):
+        agent.timeouts.first_byte = 0.2
+        agent.retry_policy.max_attempts = 1
+        for _ in range(agent.breaker.failure_threshold):
+            response = agent.execute("hang")
+            assert response.metadata["timed_out"]
+
+        assert agent.breaker.is_open
+        assert not agent.is_available()
+
+
+def _half_open(agent):
+    agent.breaker.recovery_timeout = 0
+    for _ in range(agent.breaker.failure_threshold):
+        agent.breaker.record_failure()
+    assert agent.breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_abandoned_half_open_trial_is_released():
+    with mock_dify_agent(token_delay=0.02, answer_tokens=5) as (agent, server):
+        _half_open(agent)
+        stream = agent.execute_stream("abandoned trial")
+        assert isinstance(next(stream), TokenDelta)
+        stream.close()
+
+        assert agent.execute("next call").success
+        assert agent.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_async_half_open_trial_is_released():
+    async def main():
+        async def consume():
+            async for _ in agent.aexecute_stream("cancelled trial"):
+                pass
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return await agent.aexecute("next call")
+
+    with mock_dify_agent(token_delay=0.02, answer_tokens=10) as (agent, server):
+        _half_open(agent)
+        assert asyncio.run(main()).success
+
+
+def test_deadline_timeout_is_not_retried():
+    with mock_dify_agent(ttfb=3.0) as (agent, server):
+        started = time.monotonic()
+        agent.execute("hang", deadline=deadline_after(0.2))
+
+        assert time.monotonic() - started < 1.0
+        assert server.stats.requests == 1
+
+
+def test_calls_past_max_per_host_keep_their_deadline(monkeypatch):
+    monkeypatch.setattr(config.http, "max_per_host", 2)
+    monkeypatch.setattr(transport, "_session", None)
+    monkeypatch.setattr(transport, "_blocking_slots", {})
+
+    with mock_dify_agent(ttfb=2.0) as (agent, server):
+        agent.retry_policy.max_attempts = 1
+        elapsed = []
+
+        def call():
+            started = time.monotonic()
+            agent.execute("slow", deadline=deadline_after(0.5))
+            elapsed.append(time.monotonic() - started)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert max(elapsed) < 0.9
+
+
+def test_calls_past_max_per_host_wait_for_a_slot(monkeypatch):
+    monkeypatch.setattr(config.http, "max_per_host", 2)
+    monkeypatch.setattr(transport, "_session", None)
+    monkeypatch.setattr(transport, "_blocking_slots", {})
+
+    with mock_dify_agent(ttfb=0.3, answer_tokens=1) as (agent, server):
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(agent.execute("queued")))
+                   for _ in range(4)]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Two waves of two calls each
+        assert time.monotonic() - started >= 0.6
+        assert all(response.success for response in responses)
+
+
+def test_async_calls_past_max_per_host_keep_their_deadline(monkeypatch):
+    monkeypatch.setattr(config.http, "max_per_host", 1)
+    monkeypatch.setattr(transport, "_host_slots", weakref.WeakKeyDictionary())
+
+    async def call(query, budget):
+        started = time.monotonic()
+        response = await agent.aexecute(query, deadline=deadline_after(budget))
+        return response, time.monotonic() - started
+
+    async def main():
+        holder = asyncio.create_task(call("holds the slot", 5))
+        await asyncio.sleep(0.05)
+        waiting = await call("waits for the slot", 0.5)
+        return await holder, waiting
+
+    with mock_dify_agent(ttfb=1.5, answer_tokens=1) as (agent, server):
+        agent.retry_policy.max_attempts = 1
+        (holder, _), (waiting, waited) = asyncio.run(main())
+
+    assert holder.success
+    assert not waiting.success and "time budget exhausted" in waiting.error
+    assert waited < 0.8
+    assert server.stats.requests == 1
+
+
+def test_rate_limited_call_is_retried_and_succeeds():
+    with mock_dify_agent(rate_limit_first=2, retry_after=None, answer_tokens=3) as (agent, server):
+        agent.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.01)
+        response = agent.execute("busy server")
+
+        assert response.success and response.content == "token0 token1 token2 "
+        assert server.stats.requests == 3
+        assert agent.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_server_error_is_retried_and_succeeds():
+    with mock_dify_agent(error_first=1, answer_tokens=3) as (agent, server):
+        agent.retry_policy = RetryPolicy(max_attempts=2, base_delay=0.01)
+        response = asyncio.run(agent.aexecute("flaky server"))
+
+        assert response.success
+        assert server.stats.requests == 2
+
+
+def test_retry_after_is_honoured():
+    with mock_dify_agent(rate_limit_first=1, retry_after=0.4) as (agent, server):
+        agent.retry_policy = RetryPolicy(max_attempts=2, base_delay=0.01)
+        started = time.monotonic()
+        response = agent.execute("slow down")
+
+        assert response.success
+        assert time.monotonic() - started >= 0.4
+        assert server.stats.requests == 2
+
+
+def test_retry_after_past_max_delay_waits_max_delay():
+    policy = RetryPolicy(max_attempts=3, max_delay=2.0)
+
+    assert policy.delay_for(1, retry_after=0.5) == 0.5
+    assert policy.delay_for(1, retry_after=120.0) == 2.0
+    assert policy.delay_for(3, retry_after=0.5) is None
+
+
+def test_server_errors_open_the_breaker():
+    with mock_dify_agent(error_rate=1.0) as (agent, server):
+        agent.retry_policy.max_attempts = 1
+        for _ in range(agent.breaker.failure_threshold):
+            assert not agent.execute("down").success
+
+        assert agent.breaker.is_open
+        response = agent.execute("down")
+        assert "Circuit open" in response.error
+        assert server.stats.requests == agent.breaker.failure_threshold
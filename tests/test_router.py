@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from orchestrator.router import DecisionLog, LocalRouter, read_decisions
+from orchestrator.selector import AgentSelector
+
+TOPICS = ["tea", "coffee", "rome", "jazz", "solar power", "chess", "bees", "volcanoes", "the internet", "trains"]
+
+
+@pytest.fixture(scope="module")
+def router():
+    queries, plans = [], []
+    for topic in TOPICS:
+        queries += [f"find facts about {topic}", f"compare the pros and cons of {topic}",
+                    f"write a poem about {topic}", f"find facts about {topic} then write a poem about it"]
+        plans += [{"research": []}, {"analysis": []}, {"creative": []},
+                  {"research": [], "creative": ["research"]}]
+    return LocalRouter(["research", "analysis", "creative"], dim=2 ** 12).fit(queries, plans)
+
+
+@pytest.mark.parametrize("query, agents, sequential", [
+    ("find facts about owls", ["research"], False),
+    ("compare the pros and cons of owls", ["analysis"], False),
+    ("write a poem about owls", ["creative"], False),
+    ("find facts about owls then write a poem about it", ["creative", "research"], True),
+])
+def test_router_generalizes_to_unseen_topics(router, query, agents, sequential):
+    prediction = router.predict(query)
+
+    assert sorted(prediction.agents) == sorted(agents)
+    assert (prediction.sequential >= 0.5) == sequential
+    assert prediction.confidence > 0.8
+
+
+def test_untrained_router_is_unsure():
+    assert LocalRouter(["research", "analysis"], dim=2 ** 10).predict("anything at all").confidence == 0.5
+
+
+@pytest.mark.parametrize("name", ["router.npz", "router", "router.model"])
+def test_saved_router_predicts_the_same(router, tmp_path, name):
+    path = str(tmp_path / name)
+    router.save(path)
+    loaded = LocalRouter.load(path)
+    queries = ["find facts about owls", "write a poem about owls"]
+
+    assert [p.name for p in tmp_path.iterdir()] == [name]
+    assert loaded.agent_keys == router.agent_keys
+    assert np.allclose(loaded.predict_proba(queries), router.predict_proba(queries))
+
+
+def test_selector_orders_a_confident_sequential_plan(router):
+    selector = AgentSelector()
+    selector.router = router
+    selector.router_confidence = 0.8
+
+    assert selector._router_plan("find facts about owls then write a poem about it") == {
+        "research": [], "creative": ["research"]
+    }
+    assert selector._router_plan("compare the pros and cons of owls") == {"analysis": []}
+    assert selector._router_plan("compare the pros and cons of owls", min_confidence=1.0) is None
+
+
+def test_decision_log_round_trip_skips_bad_lines(tmp_path):
+    path = str(tmp_path / "decisions.jsonl")
+    log = DecisionLog(path)
+    log.record("find facts about tea", {"research": []}, 812.5)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("not json\n" + json.dumps({"query": "no plan"}) + "\n")
+    log.record("tea facts, then a poem", {"research": [], "creative": ["research"]})
+
+    entries = list(read_decisions(path))
+    assert [e["query"] for e in entries] == ["find facts about tea", "tea facts, then a poem"]
+    assert entries[0]["latency_ms"] == 812.5
+    assert list(entries[1]["plan"].items()) == [("research", []), ("creative", ["research"])]
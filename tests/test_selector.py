@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from agents.cache import LRUCache
+from orchestrator.routing_cache import RoutingCache, normalize_routing_query
+from orchestrator.selector import AgentSelector
+
+# Mentions all three agents, so keyword selection defers to the LLM
+THREE_AGENT_QUERY = "research the history of tea since 1900, analyze the data and write a poem"
+
+
+class _SlowLLM:
+    model_name = "slow-test-model"
+
+    def __init__(self, delay, answer="research"):
+        self.delay = delay
+        self.answer = answer
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        time.sleep(self.delay)
+        return type("Reply", (), {"content": self.answer})()
+
+
+@pytest.fixture
+def selector():
+    selector = AgentSelector()
+    selector.llm = _SlowLLM(0.5)
+    selector.selection_budget = 0.1
+    selector.routing_cache = None
+    selector.router = None
+    selector.decision_log = None
+    return selector
+
+
+def test_llm_calls_past_budget_are_bounded(selector):
+    threads = [threading.Thread(target=selector._llm_based_selection, args=(f"tell me about topic {i}",))
+               for i in range(3 * AgentSelector.MAX_LLM_CALLS)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - started < 0.5
+    assert selector.llm.calls == AgentSelector.MAX_LLM_CALLS
+
+
+def test_saturation_is_not_counted_as_timeout(selector):
+    for _ in range(AgentSelector.MAX_LLM_CALLS):
+        selector._llm_slots.acquire()
+
+    assert selector._llm_based_selection("a question while busy") == {"research": []}
+    assert selector.routing_stats()["paths"] == {"llm_busy_fallback": 1}
+    assert not selector._llm_latencies
+
+
+def test_timed_out_calls_count_in_latency_window(selector):
+    selector._llm_based_selection("one slow question")
+    time.sleep(0.6)
+
+    assert list(selector._llm_latencies) == [pytest.approx(100)]
+
+
+def test_routing_keys_ignore_quotes_numbers_and_spacing():
+    assert normalize_routing_query('Compare "X" and \'Y\' in  2023') == \
+        normalize_routing_query('compare "A" and \'B\' in 2024.5')
+    assert normalize_routing_query("compare tea") != normalize_routing_query("compare coffee")
+
+
+def test_cached_plans_keep_their_order():
+    cache = RoutingCache(LRUCache(), "catalog")
+    plan = {"research": [], "creative": [], "analysis": ["research", "creative"]}
+    cache.set("a query", plan)
+
+    assert list(cache.get("a query").items()) == list(plan.items())
+
+
+def test_catalog_change_clears_cached_plans():
+    store = LRUCache()
+    RoutingCache(store, "old catalog").set("a query", {"research": []})
+    cache = RoutingCache(store, "new catalog")
+
+    assert cache.get("a query") is None
+    assert len(store) == 1  # Only the catalog marker
+
+
+def test_repeated_query_skips_the_llm(selector):
+    selector.llm = _SlowLLM(0.0, answer="research+analysis,creative")
+    selector.selection_budget = 5.0
+    selector.routing_cache = RoutingCache(LRUCache(), "catalog")
+    expected = {"research": [], "analysis": [], "creative": ["research", "analysis"]}
+
+    assert selector.select_plan(THREE_AGENT_QUERY) == expected
+    assert selector.select_plan(THREE_AGENT_QUERY.replace("1900", "1850")) == expected
+    assert selector.select_plan("  " + THREE_AGENT_QUERY.upper()) == expected
+    assert selector.llm.calls == 1
+    assert selector.routing_stats()["paths"] == {"llm": 1, "cache": 2}
+
+
+@pytest.mark.parametrize("query, plan", [
+    ("Research the EV market and write a marketing pitch", {"research": [], "creative": ["research"]}),
+    ("Find data on remote work and compare the pros and cons", {"research": [], "analysis": ["research"]}),
+    ("Analyze our sales and draft a summary email", {"analysis": [], "creative": ["analysis"]}),
+    ("research the history of tea and then analyze it", {"research": [], "analysis": ["research"]}),
+    ("research the history of tea and separately compare the options", {"research": [], "analysis": []}),
+    ("research tea and, in parallel, write a poem", {"research": [], "creative": []}),
+])
+def test_keyword_plans_are_sequential_unless_told_otherwise(selector, query, plan):
+    assert selector.select_plan(query) == plan
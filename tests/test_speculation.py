@@ -0,0 +1,24 @@
+import threading
+import time
+
+from mock_dify_server import mock_dify_agent
+from orchestrator.speculation import Speculation, SpeculationStats
+
+
+def test_cancelled_guess_does_not_fail_identical_call():
+    with mock_dify_agent(coalesce=True, ttfb=0.1, token_delay=0.05, answer_tokens=10) as (agent, server):
+        speculation = Speculation("mock", agent, "guess", {}, None).start()
+        time.sleep(0.05)
+
+        result = {}
+        thread = threading.Thread(target=lambda: result.setdefault("response", agent.execute("guess", context={})))
+        thread.start()
+        time.sleep(0.2)
+        stats = SpeculationStats()
+        speculation.cancel(stats)
+        thread.join()
+
+        assert result["response"].success
+        assert not result["response"].metadata["truncated"]
+        assert stats.wasted_tokens > 0
+        assert server.stats.streams == 2
@@ -0,0 +1,67 @@
+import json
+import random
+
+from agents.sse import SSEParser, get_json_loads
+
+EVENTS = [
+    {"event": "message", "answer": "Hello", "conversation_id": "c1"},
+    {"event": "ping"},
+    {"conversation_id": "c1", "answer": " wörld \"quoted\"\n", "event": "agent_message"},
+    {"event": "workflow_started", "data": {"answer": "not a token"}},
+    {"event": "message", "answer": "☃ done"},
+    {"event": "message_end", "conversation_id": "c1", "message_id": "m1", "metadata": {"usage": {}}},
+]
+
+
+def _stream(newline: bytes = b"\n") -> bytes:
+    blocks = [b"data: " + json.dumps(e, ensure_ascii=False).encode("utf-8") for e in EVENTS]
+    blocks.insert(2, b": keep-alive comment")
+    return b"".join(block + newline * 2 for block in blocks)
+
+
+def _answer_view(events):
+    # Token events may come back reduced to event/answer or fully decoded
+    return [{"event": e["event"], "answer": e["answer"]} if "answer" in e else e for e in events]
+
+
+def _parse(data: bytes, sizes, loads=None):
+    parser = SSEParser(loads=loads)
+    events, offset = [], 0
+    for size in sizes:
+        events += parser.feed(data[offset:offset + size])
+        offset += size
+    events += parser.feed(data[offset:])
+    return _answer_view(events + parser.close())
+
+
+def _expected():
+    return _answer_view([e for e in EVENTS if e["event"] in ("message", "agent_message", "message_end")])
+
+
+def test_events_survive_any_chunking():
+    rng = random.Random(0)
+    for newline in (b"\n", b"\r\n", b"\r"):
+        data = _stream(newline)
+        for _ in range(100):
+            sizes = [rng.randint(1, 64) for _ in range(len(data) // 16)]
+            assert _parse(data, sizes) == _expected()
+
+
+def test_stdlib_backend_matches():
+    data = _stream()
+    assert _parse(data, [len(data)], loads=get_json_loads(prefer_fast=False)) == _expected()
+
+
+def test_keys_inside_nested_values_are_not_sniffed():
+    payloads = [
+        {"metadata": {"event": "ping"}, "event": "message_end", "id": "m1"},
+        {"event": "message", "metadata": {"answer": "nested"}, "answer": "top"},
+        {"id": 'say "event": "ping"', "event": "message", "answer": "escaped"},
+        {"data": [{"event": "ping"}], "event": "message", "answer": "listed"},
+    ]
+    data = b"".join(b"data: " + json.dumps(p).encode("utf-8") + b"\n\n" for p in payloads)
+
+    events = _parse(data, [len(data)])
+
+    assert [e["event"] for e in events] == ["message_end", "message", "message", "message"]
+    assert [e.get("answer") for e in events[1:]] == ["top", "escaped", "listed"]
@@ -0,0 +1,48 @@
+import time
+
+from orchestrator.events import AgentFinished, AgentsSelected, AgentStarted, AgentToken, FinalResult
+
+
+def test_single_agent_event_sequence(brain):
+    events = list(brain.process_query_stream("research the history of tea"))
+
+    assert [type(e) for e in events] == (
+        [AgentsSelected, AgentStarted] + [AgentToken] * 5 + [AgentFinished, FinalResult]
+    )
+    assert events[0].agents == ["research"]
+    assert all(e.agent_key == "research" for e in events[1:-1])
+    assert events[-2].success
+    streamed = "".join(e.text for e in events if isinstance(e, AgentToken))
+    assert streamed == "".join(f"token{i} " for i in range(5))
+    assert events[-1].result.success
+
+
+def test_tokens_arrive_before_the_answer_is_done(brain):
+    brain.mock.config.token_delay = 0.1
+    arrivals = {}
+    started = time.monotonic()
+    for event in brain.process_query_stream("research the history of coffee"):
+        arrivals.setdefault(type(event), time.monotonic() - started)
+
+    # Five tokens 0.1 s apart: the first is out well before the last
+    assert arrivals[AgentToken] < arrivals[FinalResult] - 0.3
+
+
+def test_parallel_agents_each_start_and_finish(brain):
+    events = list(brain.process_query_stream("research the history of tea and separately compare the options"))
+
+    assert isinstance(events[0], AgentsSelected)
+    assert events[0].plan == {"research": [], "analysis": []}
+    assert {e.agent_key for e in events if isinstance(e, AgentStarted)} == {"research", "analysis"}
+    assert {e.agent_key for e in events if isinstance(e, AgentFinished) and e.success} == {"research", "analysis"}
+    assert isinstance(events[-1], FinalResult) and events[-1].result.success
+
+
+def test_failed_agent_still_ends_with_final_result(brain):
+    brain.mock.config.error_rate = 1.0
+    events = list(brain.process_query_stream("research the history of rice"))
+
+    finished = [e for e in events if isinstance(e, AgentFinished)]
+    assert len(finished) == 1 and not finished[0].success and finished[0].error
+    assert isinstance(events[-1], FinalResult)
+    assert not any(isinstance(e, FinalResult) for e in events[:-1])
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from tracing import SpanExporter, Tracer, annotate
+
+
+class _RecordingExporter(SpanExporter):
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.traces = []
+
+    def export(self, spans):
+        time.sleep(self.delay)
+        self.traces.append(spans)
+
+
+def test_spans_nest_under_the_trace():
+    exporter = _RecordingExporter()
+    tracer = Tracer([exporter])
+
+    with tracer.trace("query") as root:
+        with tracer.span("step") as step:
+            annotate(bytes=10)
+        child = tracer.start_span("agent", parent=step)
+        tracer.end_span(child, "boom")
+
+    assert tracer.flush(1.0)
+    spans = {span.name: span for span in exporter.traces[0]}
+    assert spans["step"].parent_id == root.span_id
+    assert spans["agent"].parent_id == step.span_id
+    assert spans["step"].attributes == {"bytes": 10}
+    assert spans["agent"].error == "boom"
+    assert all(span.trace_id == root.trace_id for span in spans.values())
+
+
+def test_slow_export_stays_off_the_query():
+    exporter = _RecordingExporter(delay=0.5)
+    tracer = Tracer([exporter])
+
+    started = time.monotonic()
+    with tracer.trace("query"):
+        pass
+
+    assert time.monotonic() - started < 0.1
+    assert tracer.flush(2.0)
+    assert len(exporter.traces) == 1
+
+
+def test_full_export_queue_drops_traces(monkeypatch):
+    monkeypatch.setattr(Tracer, "MAX_PENDING", 1)
+    release = threading.Event()
+
+    class _Blocked(SpanExporter):
+        def export(self, spans):
+            release.wait()
+
+    tracer = Tracer([_Blocked()])
+    for _ in range(4):
+        with tracer.trace("query"):
+            pass
+    release.set()
+
+    assert tracer.dropped_traces >= 2
+    assert tracer.flush(1.0)
+
+
+def test_query_trace_covers_selection_agents_and_aggregation(brain):
+    exporter = _RecordingExporter()
+    brain.tracer = Tracer([exporter])
+
+    result = brain.process_query("research the history of tea and separately compare the options")
+
+    assert result.success
+    assert brain.tracer.flush(1.0)
+    (spans,) = exporter.traces
+    names = [span.name for span in spans]
+    assert names[0] == "process_query"
+    assert {"select_agents", "agent.research", "agent.analysis", "aggregate_results"} <= set(names)
+    agent = next(span for span in spans if span.name == "agent.research")
+    assert agent.attributes["http_status"] == 200
+    assert agent.attributes["tokens"] == 5
+    assert agent.attributes["bytes"] > 0
+
+
+def test_exporters_must_implement_export():
+    class _Incomplete(SpanExporter):
+        pass
+
+    with pytest.raises(TypeError):
+        _Incomplete()
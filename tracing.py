@@ -0,0 +1,340 @@
+"""
+Per-query tracing for the agent system
+
+A trace is a tree of spans (selection, each agent call, aggregation). The
+span being worked on is tracked in a context variable, so lower layers can
+attach measurements (bytes read, time to first byte) without being handed
+the span explicitly. Finished traces go to the configured exporters: a
+local JSONL file and/or OpenTelemetry OTLP/JSON. Exporting happens on a
+background thread, so file writes and collector round trips stay off the
+query's critical path (and off the event loop for async queries).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        if self.end_ns is None:
+            return None
+        return round((self.end_ns - self.start_ns) / 1e6, 3)
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the span started"""
+        return round((time.time_ns() - self.start_ns) / 1e6, 3)
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class SpanExporter(ABC):
+    """Receives every span of a trace once its root span ends"""
+
+    @abstractmethod
+    def export(self, spans: List[Span]):
+        """Export one finished trace; runs on the tracer's export thread"""
+
+
+class JSONLExporter(SpanExporter):
+    """Append one JSON object per span to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+class OTLPJSONExporter(SpanExporter):
+    """
+    Export traces as OTLP/JSON ExportTraceServiceRequest documents, appended
+    to a file and/or POSTed to an OTLP/HTTP collector (e.g. http://localhost:4318)
+    """
+
+    def __init__(self, path: Optional[str] = None, endpoint: Optional[str] = None,
+                 service_name: str = "agent-builder"):
+        self.path = path
+        self.endpoint = endpoint.rstrip("/") + "/v1/traces" if endpoint else None
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        if isinstance(value, (list, tuple)):
+            return {"arrayValue": {"values": [OTLPJSONExporter._value(v) for v in value]}}
+        return {"stringValue": str(value)}
+
+    def to_otlp(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "agent-builder.tracing"},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            "parentSpanId": span.parent_id or "",
+                            "name": span.name,
+                            "kind": 1,
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                            "attributes": [
+                                {"key": key, "value": self._value(value)}
+                                for key, value in span.attributes.items() if value is not None
+                            ],
+                            "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }
+
+    def export(self, spans: List[Span]):
+        document = self.to_otlp(spans)
+        if self.path:
+            with self._lock, open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(document) + "\n")
+        if self.endpoint:
+            try:
+                requests.post(self.endpoint, json=document, timeout=5).raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"OTLP export failed: {e}")
+
+
+class Tracer:
+    """Creates spans and hands finished traces to the exporters"""
+
+    # Finished traces waiting for the export thread; more are dropped rather than block queries
+    MAX_PENDING = 1000
+    # Seconds the interpreter waits at exit for pending traces to be exported
+    EXIT_FLUSH_TIMEOUT = 5.0
+
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None):
+        self.exporters = exporters or []
+        self.dropped_traces = 0
+        self._traces: Dict[str, List[Span]] = {}
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue" = queue.Queue(maxsize=self.MAX_PENDING)
+        self._worker: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _new_id(n_bytes: int) -> str:
+        return os.urandom(n_bytes).hex()
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """Start a new trace; its root span becomes the current span"""
+        root = Span(name=name, trace_id=self._new_id(16), span_id=self._new_id(8), attributes=attributes)
+        with self._lock:
+            self._traces[root.trace_id] = [root]
+
+        token = _current_span.set(root)
+        try:
+            yield root
+        except Exception as e:
+            root.error = str(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            root.end_ns = time.time_ns()
+            with self._lock:
+                spans = self._traces.pop(root.trace_id, [])
+            self._export(spans)
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Optional[Span]:
+        """
+        Open a child of parent (default: the current span) without making it current
+
+        Returns:
+            The span, or None when there is no trace to attach it to
+        """
+        parent = parent or _current_span.get()
+        if parent is None:
+            return None
+
+        span = Span(name=name, trace_id=parent.trace_id, span_id=self._new_id(8),
+                    parent_id=parent.span_id, attributes=attributes)
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is not None:
+                spans.append(span)
+        return span
+
+    @staticmethod
+    def end_span(span: Optional[Span], error: Optional[str] = None):
+        if span is not None and span.end_ns is None:
+            span.end_ns = time.time_ns()
+            span.error = span.error or error
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Child span that is current for the duration of the block"""
+        span = self.start_span(name, parent, **attributes)
+        with use_span(span):
+            try:
+                yield span
+            except Exception as e:
+                self.end_span(span, str(e))
+                raise
+            finally:
+                self.end_span(span)
+
+    def _export(self, spans: List[Span]):
+        """Queue a finished trace for the export thread"""
+        if not self.exporters:
+            return
+        self._start_worker()
+        try:
+            self._pending.put_nowait(spans)
+        except queue.Full:
+            self.dropped_traces += 1
+            logger.warning("Trace export queue full, dropping trace")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every trace finished so far has been exported
+
+        Args:
+            timeout: Longest wait in seconds (None = no limit)
+
+        Returns:
+            False if the timeout passed first
+        """
+        if self._worker is None:
+            return True
+        done = threading.Event()
+        self._pending.put(done)
+        return done.wait(timeout)
+
+    def _start_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._export_loop, name="trace-export", daemon=True)
+                self._worker.start()
+                atexit.register(self.flush, self.EXIT_FLUSH_TIMEOUT)
+
+    def _export_loop(self):
+        while True:
+            item = self._pending.get()
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            for exporter in self.exporters:
+                try:
+                    exporter.export(item)
+                except Exception as e:
+                    logger.warning(f"Trace export via {type(exporter).__name__} failed: {e}")
+
+
+@contextmanager
+def use_span(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """Make an existing span current for the duration of the block"""
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def annotate(**attributes: Any):
+    """Set attributes on the current span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def increment(name: str, amount: float = 1):
+    """Add to a numeric attribute of the current span, if any"""
+    span = _current_span.get()
+    if span is not None:
+        span.attributes[name] = span.attributes.get(name, 0) + amount
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """
+    Get the process-wide tracer built from config
+
+    Returns:
+        Tracer exporting to the configured JSONL file and/or OTLP targets
+    """
+    global _tracer
+
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                from config import config
+
+                settings = config.tracing
+                exporters: List[SpanExporter] = []
+                if settings.enabled and settings.jsonl_path:
+                    exporters.append(JSONLExporter(settings.jsonl_path))
+                if settings.enabled and (settings.otlp_path or settings.otlp_endpoint):
+                    exporters.append(OTLPJSONExporter(settings.otlp_path, settings.otlp_endpoint,
+                                                      settings.service_name))
+                _tracer = Tracer(exporters)
+
+    return _tracer
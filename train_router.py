@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Train the local router from logged LLM routing decisions
+
+Reads the JSONL decision log written by the selector (ROUTER_LOG_PATH),
+holds out part of it, trains orchestrator.router.LocalRouter on the rest and
+reports how often the router agrees with the LLM, how many queries it would
+answer at the confidence threshold, and its latency next to the LLM's.
+The model is then retrained on everything and saved for ROUTER_MODEL_PATH.
+
+Usage:
+    python train_router.py --log routing_log.jsonl --out router.npz
+    python train_router.py --log routing_log.jsonl --out router.npz --confidence 0.9
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from orchestrator.router import LocalRouter, RouterPrediction, read_decisions
+from orchestrator.routing_cache import normalize_routing_query
+
+AGENT_KEYS = ["research", "analysis", "creative"]
+
+
+def same_plan(prediction: RouterPrediction, plan: Dict[str, List[str]]) -> bool:
+    """Same agents, and the same sequential/parallel choice when there are several"""
+    if set(prediction.agents) != set(plan):
+        return False
+    return len(plan) <= 1 or (prediction.sequential >= 0.5) == any(plan.values())
+
+
+def evaluate(router: LocalRouter, queries: List[str], plans: List[Dict[str, List[str]]], confidence: float):
+    predictions = [router.predict(q) for q in queries]
+    agreed = [same_plan(p, plan) for p, plan in zip(predictions, plans)]
+    confident = [p.confidence >= confidence for p in predictions]
+    answered = [a for a, c in zip(agreed, confident) if c]
+
+    print(f"  plan agreement (all queries):   {np.mean(agreed):6.1%}")
+    for agent_key in router.agent_keys:
+        correct = [(p.probabilities[agent_key] >= 0.5) == (agent_key in plan) for p, plan in zip(predictions, plans)]
+        print(f"  {agent_key:<10} accuracy:           {np.mean(correct):6.1%}")
+    print(f"  answered at confidence {confidence}:  {np.mean(confident):6.1%} of queries")
+    if answered:
+        print(f"  agreement when answered:        {np.mean(answered):6.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the local router from logged LLM routing decisions")
+    parser.add_argument("--log", required=True, help="Decision log (JSONL) written via ROUTER_LOG_PATH")
+    parser.add_argument("--out", required=True, help="Where to save the model (.npz)")
+    parser.add_argument("--test-split", type=float, default=0.2, help="Fraction held out for evaluation")
+    parser.add_argument("--confidence", type=float, default=0.85, help="Threshold to report coverage at")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--dim", type=int, default=2 ** 15, help="Hashed feature buckets")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Latest decision per normalized query, so repeats cannot leak into the test split
+    entries = {}
+    for entry in read_decisions(args.log):
+        if entry["plan"] and set(entry["plan"]) <= set(AGENT_KEYS):
+            entries[normalize_routing_query(entry["query"])] = entry
+    entries = list(entries.values())
+    if len(entries) < 10:
+        raise SystemExit(f"Only {len(entries)} usable decisions in {args.log}; log more LLM selections first")
+
+    random.Random(args.seed).shuffle(entries)
+    split = int(len(entries) * (1 - args.test_split))
+    train, test = entries[:split], entries[split:]
+    print(f"{len(entries)} decisions: {len(train)} train, {len(test)} test\n")
+
+    start = time.perf_counter()
+    router = LocalRouter(AGENT_KEYS, args.dim).fit(
+        [e["query"] for e in train], [e["plan"] for e in train], epochs=args.epochs
+    )
+    print(f"Trained in {time.perf_counter() - start:.2f}s\n")
+
+    print("Held-out agreement with the LLM:")
+    evaluate(router, [e["query"] for e in test], [e["plan"] for e in test], args.confidence)
+
+    start = time.perf_counter()
+    for entry in test:
+        router.predict(entry["query"])
+    router_ms = (time.perf_counter() - start) * 1000 / max(1, len(test))
+    llm_ms = [e["latency_ms"] for e in entries if e.get("latency_ms") is not None]
+    print("\nLatency per query:")
+    print(f"  router: {router_ms:8.3f} ms")
+    if llm_ms:
+        print(f"  LLM:    {np.mean(llm_ms):8.1f} ms mean, {np.percentile(llm_ms, 95):.1f} ms p95 (from the log)")
+
+    router = LocalRouter(AGENT_KEYS, args.dim).fit(
+        [e["query"] for e in entries], [e["plan"] for e in entries], epochs=args.epochs
+    )
+    router.save(args.out)
+    print(f"\nSaved model trained on all {len(entries)} decisions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()